@@ -0,0 +1,4 @@
+"""
+Микро-бенчмарки горячих участков бота.
+Запуск из корня репозитория: python -m benchmarks.<имя_модуля>
+"""
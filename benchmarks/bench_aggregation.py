@@ -0,0 +1,109 @@
+"""
+Усреднение прогонов: groupby/transform по строковым ключам против общей
+обработки parsers.aggregation (целочисленные коды ключей и маски numpy).
+
+    python -m benchmarks.bench_aggregation [--rows 1000000]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from parsers.aggregation import aggregate_benchmarks
+from parsers.columns import BENCHMARK_COLUMNS, GROUP_COLUMNS
+from benchmarks.common import best_of, report
+
+
+def synthetic_runs(rows: int = 1_000_000, seed: int = 42) -> pd.DataFrame:
+    """Прогоны в канонической схеме: 28 дней, 4 приложения, время до секунды"""
+    rng = np.random.default_rng(seed)
+    applications = np.array(
+        ["Cyberpunk2077.exe", "eldenring.exe", "RDR2.exe", "Hogwarts.exe"], dtype=object
+    )
+    seconds = rng.integers(0, 24 * 3600, size=rows)
+    times = np.array(
+        [
+            f"{h:02d}:{m:02d}:{s:02d}"
+            for h in range(24)
+            for m in range(60)
+            for s in range(60)
+        ],
+        dtype=object,
+    )
+    average = rng.uniform(60, 140, size=rows)
+    return pd.DataFrame(
+        {
+            "Date": pd.Timestamp("2024-03-01")
+            + pd.to_timedelta(rng.integers(0, 28, size=rows), unit="D"),
+            "Time": times[seconds],
+            "Application": applications[rng.integers(0, len(applications), size=rows)],
+            "Frames": (average * 60).astype(int),
+            "TimeTaken": rng.uniform(55000, 65000, size=rows).round(),
+            "AverageFramerate": average,
+            "MinFramerate": average * 0.8,
+            "MaxFramerate": average * 1.2,
+            "Low1Percent": average * 0.7,
+            "Low01Percent": average * 0.6,
+        }
+    )
+
+
+def pandas_aggregate(
+    df: pd.DataFrame, numeric_columns=BENCHMARK_COLUMNS
+) -> pd.DataFrame:
+    """Прежний подход: копия таблицы, transform и groupby по строковым ключам"""
+    numeric_columns = [col for col in numeric_columns if col in df.columns]
+    df_filtered = df.copy()
+    mean_time_taken = df_filtered.groupby(GROUP_COLUMNS)["TimeTaken"].transform("mean")
+    df_filtered = df_filtered[df_filtered["TimeTaken"] >= mean_time_taken * 0.8]
+    df_filtered.loc[:, "Time"] = df_filtered["Time"].astype(str).str[:2] + " h"
+
+    if len(df_filtered) > 1:
+        z_scores = np.abs(
+            (df_filtered["TimeTaken"] - df_filtered["TimeTaken"].mean())
+            / df_filtered["TimeTaken"].std()
+        )
+        df_filtered = df_filtered[z_scores < 3]
+
+    if df_filtered.empty:
+        return df_filtered.copy()
+
+    mean_data = (
+        df_filtered.groupby(GROUP_COLUMNS, as_index=False)[numeric_columns]
+        .mean()
+        .round()
+    )
+    for col in numeric_columns:
+        mean_data[col] = mean_data[col].astype(
+            int if mean_data[col].notna().all() else "Int64"
+        )
+    mean_data["Time"] = mean_data["Time"].astype(str)
+    mean_data["Application"] = mean_data["Application"].astype(str)
+    return mean_data.sort_values(GROUP_COLUMNS, ascending=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = synthetic_runs(args.rows)
+    expected = pandas_aggregate(df).reset_index(drop=True)
+    baseline = best_of(lambda: pandas_aggregate(df))
+
+    # Строковые ключи как у парсеров и те же ключи категориальными колонками
+    categorical = df.astype({"Time": "category", "Application": "category"})
+    for title, frame in (
+        ("строковые ключи", df),
+        ("категориальные ключи", categorical),
+    ):
+        pd.testing.assert_frame_equal(expected, aggregate_benchmarks(frame))
+        report(
+            f"Усреднение {args.rows} прогонов, {title} ({len(expected)} групп)",
+            baseline,
+            best_of(lambda: aggregate_benchmarks(frame)),
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Память на разобранные прогоны: список словарей и DataFrame из него против
+CanonicalFrame (типизированные массивы) и DataFrame с категориальными ключами.
+
+    python -m benchmarks.bench_canonical_frame [--rows 1000000]
+"""
+
+import argparse
+import time
+import tracemalloc
+from datetime import date, timedelta
+from typing import Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+from parsers.aggregation import BENCHMARK_COLUMNS, aggregate_benchmarks, float_values
+from parsers.canonical import CanonicalFrame, day_number
+
+
+def synthetic_rows(
+    rows: int, block: int = 10_000, seed: int = 42
+) -> Iterator[Tuple[date, str, str, list]]:
+    """
+    Прогоны как их читает парсер: дата, время запуска, приложение, метрики.
+    Случайные значения готовятся порциями, чтобы не влиять на пиковую память.
+    """
+    rng = np.random.default_rng(seed)
+    applications = ["Cyberpunk2077.exe", "eldenring.exe", "RDR2.exe", "Hogwarts.exe"]
+    start = date(2024, 3, 1)
+    for offset in range(0, rows, block):
+        size = min(block, rows - offset)
+        days = rng.integers(0, 28, size=size).tolist()
+        seconds = rng.integers(0, 24 * 3600, size=size).tolist()
+        apps = rng.integers(0, len(applications), size=size).tolist()
+        average = rng.uniform(60, 140, size=size).round(1).tolist()
+        time_taken = rng.uniform(55000, 65000, size=size).round().tolist()
+        for i in range(size):
+            fps = average[i]
+            yield (
+                start + timedelta(days=days[i]),
+                f"{seconds[i] // 3600:02d}:{seconds[i] // 60 % 60:02d}"
+                f":{seconds[i] % 60:02d}",
+                applications[apps[i]],
+                [
+                    int(fps * 60),
+                    time_taken[i],
+                    fps,
+                    round(fps * 0.8, 1),
+                    round(fps * 1.2, 1),
+                    round(fps * 0.7, 1),
+                    round(fps * 0.6, 1),
+                ],
+            )
+
+
+def dict_frame(rows: int) -> pd.DataFrame:
+    """Прежний подход: словарь на каждый прогон и DataFrame из списка словарей"""
+    records = []
+    for run_date, run_time, application, values in synthetic_rows(rows):
+        record = {"Date": run_date, "Time": run_time, "Application": application}
+        record.update(zip(BENCHMARK_COLUMNS, values))
+        records.append(record)
+    return pd.DataFrame(records)
+
+
+def canonical_frame(rows: int) -> pd.DataFrame:
+    frame = CanonicalFrame()
+    for run_date, run_time, application, values in synthetic_rows(rows):
+        frame.append(day_number(run_date), run_time, application, values)
+    return frame.to_frame()
+
+
+def measure(func):
+    """Возвращает (результат, секунды, пиковая память в МБ)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    expected, dict_time, dict_peak = measure(lambda: dict_frame(args.rows))
+    actual, canonical_time, canonical_peak = measure(
+        lambda: canonical_frame(args.rows)
+    )
+
+    # Те же значения и тот же результат усреднения
+    for column in BENCHMARK_COLUMNS:
+        np.testing.assert_array_equal(
+            expected[column].to_numpy(dtype=float), float_values(actual[column])
+        )
+    # Даты в прежнем DataFrame - объекты date, в новом - datetime64
+    legacy = aggregate_benchmarks(expected)
+    legacy["Date"] = pd.to_datetime(legacy["Date"])
+    pd.testing.assert_frame_equal(legacy, aggregate_benchmarks(actual))
+
+    scale = 1_000_000 / args.rows
+    print(f"{args.rows} прогонов, МБ на миллион прогонов")
+    for title, df, elapsed, peak in (
+        ("список словарей", expected, dict_time, dict_peak),
+        ("CanonicalFrame", actual, canonical_time, canonical_peak),
+    ):
+        size = df.memory_usage(deep=True).sum() / 1e6
+        print(
+            f"  {title:16s} {elapsed * 1000:10.1f} мс  пик {peak * scale:8.1f}"
+            f"  DataFrame {size * scale:8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Пиковая память и время чтения CapFrameX: json.load против потокового CapFrameReader.
+
+    python -m benchmarks.bench_capframe_reader [--frames 1000000] [--runs 3]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from parsers.capframe_reader import CapFrameReader
+from benchmarks.common import write_capture
+
+
+def measure(func):
+    """Возвращает (секунды, пиковая память в МБ)"""
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_capture(
+            os.path.join(tmp, "capture.json"), frames_per_run=args.frames, runs=args.runs
+        )
+        size = os.path.getsize(path) / 1e6
+        arrays_size = args.frames * args.runs * 8 / 1e6
+
+        def load_json():
+            with open(path, "r", encoding="utf-8") as f:
+                json.load(f)
+
+        def load_stream():
+            reader = CapFrameReader(path)
+            return [run.get("TimeInSeconds") for run in reader.iter_runs()]
+
+        print(f"Файл: {size:.1f} МБ, массивы TimeInSeconds: {arrays_size:.1f} МБ")
+        for title, func in (("json.load", load_json), ("CapFrameReader", load_stream)):
+            elapsed, peak = measure(func)
+            print(f"  {title:15s} {elapsed * 1000:10.1f} мс  пик {peak:8.1f} МБ")
+
+
+if __name__ == "__main__":
+    main()
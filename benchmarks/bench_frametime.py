@@ -0,0 +1,65 @@
+"""
+Сравнение векторизованного расчета метрик кадров с прежней реализацией на списках.
+
+    python -m benchmarks.bench_frametime [--frames 1000000] [--runs 3]
+"""
+
+import argparse
+
+import numpy as np
+
+from parsers.frametime import frametime_stats, to_float_array
+from benchmarks.common import best_of, report, synthetic_capture
+
+
+def legacy_frametime_stats(runs):
+    """Прежний алгоритм CapFrameParser.parse_file: list.extend, sort и цикл по кадрам"""
+    all_time_values = []
+    for run in runs:
+        all_time_values.extend(run["CaptureData"]["TimeInSeconds"])
+    all_time_values.sort()
+
+    fps_values = []
+    for i in range(1, len(all_time_values)):
+        delta = all_time_values[i] - all_time_values[i - 1]
+        if delta > 0:
+            fps_values.append(1.0 / delta)
+
+    sorted_fps = sorted(fps_values)
+    return {
+        "AverageFramerate": sum(fps_values) / len(fps_values),
+        "MinFramerate": min(fps_values),
+        "MaxFramerate": max(fps_values),
+        "Low1Percent": sorted_fps[max(0, int(len(sorted_fps) * 0.01))],
+        "Low01Percent": sorted_fps[max(0, int(len(sorted_fps) * 0.001))],
+    }
+
+
+def vectorized_frametime_stats(runs):
+    """Новый путь: непрерывные массивы float64 и векторные операции"""
+    arrays = [to_float_array(run["CaptureData"]["TimeInSeconds"]) for run in runs]
+    return frametime_stats(np.sort(np.concatenate(arrays)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = synthetic_capture(frames_per_run=args.frames, runs=args.runs)["Runs"]
+
+    expected = legacy_frametime_stats(runs)
+    actual = vectorized_frametime_stats(runs)
+    for key, value in expected.items():
+        assert np.isclose(value, actual[key]), (key, value, actual[key])
+
+    report(
+        f"Метрики кадров ({args.runs} x {args.frames} кадров)",
+        best_of(lambda: legacy_frametime_stats(runs)),
+        best_of(lambda: vectorized_frametime_stats(runs)),
+    )
+
+
+if __name__ == "__main__":
+    main()
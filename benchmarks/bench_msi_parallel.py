@@ -0,0 +1,46 @@
+"""
+Параллельный разбор большого журнала MSI Afterburner: последовательный
+проход против пула процессов по диапазонам, выровненным по заголовкам.
+Результат параллельного разбора сверяется с последовательным.
+
+    python -m benchmarks.bench_msi_parallel [--blocks 500000] [--workers 4]
+"""
+
+import argparse
+import os
+import tempfile
+
+from parsers.msi_afterburner_parser import MSIAfterburnerParser
+from benchmarks.common import best_of, report, synthetic_msi_log
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=500_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    msi_parser = MSIAfterburnerParser()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_msi_log(args.blocks))
+
+        serial = msi_parser.parse_file(path)
+        parallel = msi_parser._parse_parallel(path, args.workers)
+        assert serial.equals(parallel), "параллельный разбор расходится с последовательным"
+
+        size_mb = os.path.getsize(path) / (1 << 20)
+        baseline = best_of(lambda: msi_parser.parse_file(path), repeat=1)
+        candidate = best_of(lambda: msi_parser._parse_parallel(path, args.workers), repeat=1)
+        report(
+            f"Журнал MSI Afterburner ({args.blocks} блоков, {size_mb:.0f} МБ, "
+            f"{args.workers} процессов)",
+            baseline,
+            candidate,
+        )
+        print(f"  пропускная способность: {size_mb / candidate:8.1f} МБ/с")
+
+
+if __name__ == "__main__":
+    main()
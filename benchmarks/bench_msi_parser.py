@@ -0,0 +1,103 @@
+"""
+Разбор журнала MSI Afterburner: прежний readlines с блоками по 6 строк
+против потокового разбора с ресинхронизацией по заголовкам.
+
+    python -m benchmarks.bench_msi_parser [--blocks 200000]
+"""
+
+import argparse
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from parsers.msi_afterburner_parser import MSIAfterburnerParser
+from benchmarks.common import best_of, report, synthetic_msi_log
+
+
+def legacy_parse(file_path):
+    """Прежний алгоритм MSIAfterburnerParser.parse_file"""
+    with open(file_path, "r", encoding="utf-8") as txt_file:
+        data = txt_file.readlines()
+
+    bench_data = []
+    for i in range(0, len(data), 6):
+        try:
+            if i + 5 >= len(data):
+                continue
+            date_time_info = data[i].split(" ")
+            date_string = date_time_info[0].replace(",", "").replace("\x00", "").strip()
+            date = datetime.strptime(date_string, "%d-%m-%Y")
+            time = date_time_info[1]
+            application = "Unknown"
+            for j, part in enumerate(date_time_info):
+                if part and ".exe" in part:
+                    application = part.replace(".exe", "").strip()
+                    break
+                elif part and j > 1 and not part.isspace():
+                    application = part.strip()
+                    break
+            index_completed = None
+            for idx, part in enumerate(date_time_info):
+                if "completed," in part:
+                    index_completed = idx
+                    break
+            if index_completed is None or index_completed + 5 >= len(date_time_info):
+                continue
+            bench_data.append(
+                {
+                    "Date": date,
+                    "Time": time,
+                    "Application": application,
+                    "Frames": int(date_time_info[index_completed + 1]),
+                    "TimeTaken": float(date_time_info[index_completed + 5]),
+                    "AverageFramerate": float(
+                        data[i + 1].split(":")[1].strip().replace("FPS", "")
+                    ),
+                    "MinFramerate": float(
+                        data[i + 2].split(":")[1].strip().replace("FPS", "").replace(",", ".")
+                    ),
+                    "MaxFramerate": float(
+                        data[i + 3].split(":")[1].strip().replace("FPS", "").replace(",", ".")
+                    ),
+                    "Low1Percent": float(
+                        data[i + 4].split(":")[1].strip().replace("FPS", "")
+                    ),
+                    "Low01Percent": float(
+                        data[i + 5].split(":")[1].strip().replace("FPS", "")
+                    ),
+                }
+            )
+        except Exception:
+            continue
+    return bench_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--blocks", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "benchmark.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_msi_log(args.blocks))
+
+        # Парсер возвращает категориальные ключи и метрики float32
+        expected = pd.DataFrame(legacy_parse(path))
+        actual = MSIAfterburnerParser().parse_file(path)
+        assert len(expected) == len(actual) == args.blocks
+        pd.testing.assert_frame_equal(
+            expected, actual, check_dtype=False, check_categorical=False, rtol=1e-6
+        )
+
+        report(
+            f"Журнал MSI Afterburner ({args.blocks} блоков)",
+            best_of(lambda: pd.DataFrame(legacy_parse(path))),
+            best_of(lambda: MSIAfterburnerParser().parse_file(path)),
+        )
+
+
+if __name__ == "__main__":
+    main()
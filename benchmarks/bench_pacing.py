@@ -0,0 +1,50 @@
+"""
+Доля метрик плавности (pacing_stats) во времени разбора CapFrameX файла.
+Бенчмарк завершается с ошибкой, если доля превышает MAX_OVERHEAD.
+
+    python -m benchmarks.bench_pacing [--frames 1000000] [--runs 3]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+from parsers.capframe_parser import CapFrameParser
+from parsers.capframe_reader import CapFrameReader
+from parsers.frametime import pacing_stats
+from benchmarks.common import best_of, write_capture
+
+# Допустимая доля метрик плавности во времени разбора файла
+MAX_OVERHEAD = 0.10
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = write_capture(
+            os.path.join(tmp, "capture.json"), frames_per_run=args.frames, runs=args.runs
+        )
+        frametimes = [
+            run.get("MsBetweenPresents") for run in CapFrameReader(path).iter_runs()
+        ]
+
+        parse_time = best_of(lambda: CapFrameParser().parse_file(path), repeat=2)
+        pacing_time = best_of(lambda: [pacing_stats(values) for values in frametimes])
+
+    overhead = pacing_time / parse_time
+    print(f"Метрики плавности ({args.runs} x {args.frames} кадров)")
+    print(f"  разбор файла:      {parse_time * 1000:10.1f} мс")
+    print(f"  метрики плавности: {pacing_time * 1000:10.1f} мс")
+    print(f"  доля:              {overhead * 100:10.1f} % (порог {MAX_OVERHEAD * 100:.0f} %)")
+
+    if overhead > MAX_OVERHEAD:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
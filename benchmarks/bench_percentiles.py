@@ -0,0 +1,57 @@
+"""
+Перцентили и "X% low" метрики: полная сортировка против линейного выбора.
+
+    python -m benchmarks.bench_percentiles [--frames 5000000]
+"""
+
+import argparse
+
+import numpy as np
+
+from parsers.percentiles import (
+    FPS_PERCENTILE,
+    FRAMETIME_PERCENTILE,
+    LOW_AVERAGE,
+    METRIC_SETS,
+    compute_metrics,
+)
+from benchmarks.common import best_of, report
+
+
+def sorted_metrics(fps_values, metrics):
+    """Прежний подход: полностью отсортированная копия массива FPS"""
+    sorted_fps = np.sort(fps_values)
+    count = sorted_fps.size
+    result = {}
+    for column, (kind, percent) in metrics.items():
+        rank = min(count - 1, max(0, int(count * percent / 100)))
+        if kind == FPS_PERCENTILE:
+            result[column] = float(sorted_fps[rank])
+        elif kind == FRAMETIME_PERCENTILE:
+            result[column] = float(1000.0 / sorted_fps[count - 1 - rank])
+        elif kind == LOW_AVERAGE:
+            result[column] = float(sorted_fps[: max(1, int(count * percent / 100))].mean())
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--frames", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    fps_values = 1000.0 / rng.gamma(shape=20.0, scale=0.8, size=args.frames)
+    for name, metrics in METRIC_SETS.items():
+        expected = sorted_metrics(fps_values, metrics)
+        actual = compute_metrics(fps_values, metrics)
+        for key, value in expected.items():
+            assert np.isclose(value, actual[key]), (key, value, actual[key])
+
+        report(
+            f"Набор {name} ({len(metrics)} метрик, {args.frames} кадров)",
+            best_of(lambda: sorted_metrics(fps_values, metrics)),
+            best_of(lambda: compute_metrics(fps_values, metrics)),
+        )
+
+if __name__ == "__main__":
+    main()
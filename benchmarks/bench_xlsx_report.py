@@ -0,0 +1,79 @@
+"""
+Время и пиковая память записи листа XLSX: to_excel с перезаписью дат
+по ячейкам и autofit против ReportWriter (constant_memory).
+
+    python -m benchmarks.bench_xlsx_report [--rows 100000]
+"""
+
+import argparse
+import io
+import time
+import tracemalloc
+
+import pandas as pd
+
+from benchmarks.bench_aggregation import synthetic_runs
+from parsers.xlsx_report import REPORT_DATE_FORMAT, ReportWriter
+
+
+def pandas_report(df: pd.DataFrame) -> bytes:
+    """Прежний подход: to_excel, формат даты на каждую ячейку и autofit"""
+    excel_buffer = io.BytesIO()
+    with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
+        df.to_excel(writer, sheet_name="Benchmark", index=False)
+        worksheet = writer.sheets["Benchmark"]
+        cell_format = writer.book.add_format()
+        cell_format.set_num_format("dd-mm-yyyy")
+        cell_format.set_align("left")
+        for row_num, date_value in enumerate(df["Date"], start=2):
+            worksheet.write(f"A{row_num}", date_value, cell_format)
+        worksheet.autofit()
+        worksheet.set_column("A:A", 12)
+    return excel_buffer.getvalue()
+
+
+def stream_report(df: pd.DataFrame) -> bytes:
+    with ReportWriter() as writer:
+        writer.write_frame(
+            "Benchmark", df, date_format=REPORT_DATE_FORMAT, date_align="left"
+        )
+    return writer.getvalue()
+
+
+def measure(func):
+    """
+    Возвращает (результат, секунды, пиковая память в МБ). Время замеряется
+    отдельным запуском без tracemalloc, который замедляет запись в разы.
+    """
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    df = synthetic_runs(args.rows).astype(
+        {"Time": "category", "Application": "category"}
+    )
+    print(f"Лист из {args.rows} строк, {df.shape[1]} колонок")
+    for title, func in (
+        ("to_excel", pandas_report),
+        ("ReportWriter", stream_report),
+    ):
+        data, elapsed, peak = measure(lambda: func(df))
+        print(
+            f"  {title:13s} {elapsed * 1000:10.1f} мс  пик {peak:8.1f} МБ"
+            f"  файл {len(data) / 1e6:6.1f} МБ"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -24,9 +24,60 @@ WEBHOOK_URL = os.getenv(
 # Режим работы (polling или webhook)
 RUN_MODE = os.getenv("RUN_MODE", "polling")
 
+# Набор перцентильных метрик отчета по умолчанию (default или extended)
+REPORT_METRICS = os.getenv("REPORT_METRICS", "default")
+
+# Файлы не больше MEMORY_UPLOAD_MAX_BYTES скачиваются в память и разбираются
+# без временных файлов; более крупные сохраняются в TEMP_DIR
+MEMORY_UPLOAD_MAX_BYTES = int(
+    os.getenv("MEMORY_UPLOAD_MAX_BYTES", str(32 * 1024 * 1024))
+)
+
+# Число процессов для разбора файлов и генерации отчетов (0 - выполнять в потоке
+# без отдельных процессов) и максимум одновременно выполняемых задач; остальные
+# задачи ждут своей очереди, не блокируя обработку сообщений
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+PIPELINE_MAX_IN_FLIGHT = int(
+    os.getenv("PIPELINE_MAX_IN_FLIGHT", str(max(1, PIPELINE_WORKERS) * 2))
+)
+
+# Планировщик задач: сколько файлов (пакетов) обрабатывается одновременно
+# и их наибольший суммарный размер; остальные задачи ждут в очереди
+SCHEDULER_MAX_RUNNING = int(
+    os.getenv("SCHEDULER_MAX_RUNNING", str(PIPELINE_MAX_IN_FLIGHT))
+)
+SCHEDULER_MAX_BYTES = int(os.getenv("SCHEDULER_MAX_BYTES", str(1024 * 1024 * 1024)))
+
 # Временная директория для файлов
 TEMP_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "temp_files")
 
+# Кэш результатов обработки по содержимому файлов: объем отчетов в памяти,
+# каталог и предельный объем на диске (0 - без дискового кэша)
+RESULT_CACHE_MEMORY_BYTES = int(
+    os.getenv("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024))
+)
+RESULT_CACHE_DIR = os.getenv(
+    "RESULT_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache_files"),
+)
+RESULT_CACHE_DISK_BYTES = int(
+    os.getenv("RESULT_CACHE_DISK_BYTES", str(512 * 1024 * 1024))
+)
+
+# База SQLite с историей обработанных данных (пустая строка - история не сохраняется)
+HISTORY_DB_PATH = os.getenv(
+    "HISTORY_DB_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "benchmark_history.sqlite3"),
+)
+
+# Каталог с уже разобранными строками дописываемых журналов (MSI Afterburner)
+# и сколько пользователей помнить: давние журналы забываются вместе с файлами
+APPENDED_LOG_DIR = os.getenv(
+    "APPENDED_LOG_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "appended_logs"),
+)
+APPENDED_LOG_MAX_USERS = int(os.getenv("APPENDED_LOG_MAX_USERS", "256"))
+
 # Создаем временную директорию, если её нет
 os.makedirs(TEMP_DIR, exist_ok=True)
 
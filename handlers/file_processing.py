@@ -5,13 +5,42 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 
 from services.processor import BenchmarkProcessor
-from utils.file_utils import save_uploaded_file, cleanup_temp_files
-from parsers import detect_parser_type
+from services.scheduler import JobScheduler, PRIORITY_HIGH, PRIORITY_NORMAL
+from utils.file_utils import fetch_uploaded_file, cleanup_upload
+from parsers import detect_file
+from parsers.source import source_size
+from config.settings import (
+    REPORT_METRICS,
+    MEMORY_UPLOAD_MAX_BYTES,
+    SCHEDULER_MAX_RUNNING,
+    SCHEDULER_MAX_BYTES,
+)
 import asyncio
-import os
+import functools
 
 processor = BenchmarkProcessor()
 
+# Очередь задач обработки: справедливая между пользователями, с ограничением
+# числа и суммарного размера одновременно обрабатываемых файлов
+scheduler = JobScheduler(SCHEDULER_MAX_RUNNING, SCHEDULER_MAX_BYTES)
+
+
+async def run_scheduled(
+    message: Message, user_id: int, factory, size: int, priority: int
+):
+    """
+    Ставит обработку в очередь, сообщает пользователю место в очереди и ждет результат.
+    Возвращает None, если обработка отменена командой /cancel.
+    """
+    job = scheduler.submit(user_id, factory, size=size, priority=priority)
+    position = scheduler.position(job)
+    if position:
+        await message.answer(f"⏳ Файл в очереди, позиция: {position}. Отменить: /cancel")
+    result = await job.wait()
+    if result is None:
+        await message.answer("🛑 Обработка отменена")
+    return result
+
 
 # Определяем состояния для обработки нескольких файлов CapFrame
 class CapFrameProcessingStates(StatesGroup):
@@ -21,6 +50,9 @@ class CapFrameProcessingStates(StatesGroup):
 # Хранилище для временных файлов (в реальном приложении лучше использовать БД или Redis)
 capframe_sessions = {}
 
+# Выбранный пользователем набор метрик отчета
+user_metrics = {}
+
 
 async def handle_benchmark_file(message: Message, state: FSMContext, bot: Bot):
     """Обработка benchmark файла с автоматическим определением нескольких файлов CapFrameX"""
@@ -32,26 +64,18 @@ async def handle_benchmark_file(message: Message, state: FSMContext, bot: Bot):
             )
             return
 
-        # Получаем информацию о файле
-        file_info = await bot.get_file(message.document.file_id)
-
-        # Проверяем, является ли путь абсолютным (локальный режим)
-        if os.path.isabs(file_info.file_path):
-            # В локальном режиме file_path уже содержит абсолютный путь к файлу
-            file_path = file_info.file_path
-        else:
-            # В стандартном режиме скачиваем файл
-            file_path = await save_uploaded_file(message.document, bot)
+        # Получаем файл: путь локального сервера, содержимое в памяти
+        # для небольших файлов или временный файл для крупных
+        file_path = await fetch_uploaded_file(message.document, bot)
 
-        # Определяем тип парсера
-        with open(file_path, "r", encoding="utf-8") as f:
-            content = f.read()
-        parser_type = detect_parser_type(content)
+        # Определяем тип парсера по началу файла; прочитанные байты передаются парсеру
+        parser_type, prefix = detect_file(file_path)
 
-        # Проверяем, является ли файл CapFrameX
-        if parser_type == "capframex":
+        # CapFrameX файл открывает сессию; пока сессия открыта, в нее попадают
+        # файлы любых форматов и обрабатываются одним пакетом
+        user_id = message.from_user.id
+        if parser_type == "capframex" or capframe_sessions.get(user_id):
             # Получаем текущую сессию пользователя
-            user_id = message.from_user.id
             session = capframe_sessions.get(user_id, [])
             session.append(file_path)
             capframe_sessions[user_id] = session
@@ -67,22 +91,51 @@ async def handle_benchmark_file(message: Message, state: FSMContext, bot: Bot):
                 )
             return
 
-        # Если это не CapFrame файл, обрабатываем как обычно
-        result = await processor.process_file(file_path, parser_type)
+        # Если это не CapFrame файл, обрабатываем как обычно; небольшие файлы
+        # обслуживаются раньше крупных
+        size = message.document.file_size
+        result = await run_scheduled(
+            message,
+            user_id,
+            functools.partial(
+                processor.process_file,
+                file_path,
+                parser_type,
+                metrics=user_metrics.get(user_id, REPORT_METRICS),
+                user_id=user_id,
+                schema=await processor.get_schema(user_id),
+                prefix=prefix,
+            ),
+            size,
+            PRIORITY_HIGH if size <= MEMORY_UPLOAD_MAX_BYTES else PRIORITY_NORMAL,
+        )
+        if result is None:
+            cleanup_upload(file_path)
+            return
 
         if not result["success"]:
             await message.answer(
                 f"❌ Ошибка обработки ({result['parser_type']}): {result['error']}"
             )
             # Очищаем временные файлы только в стандартном режиме
-            if not os.path.isabs(file_path):
-                cleanup_temp_files(file_path)
+            cleanup_upload(file_path)
             return
 
         # Отправляем результаты
+        dialect = f"🧾 Формат: {result['dialect']}\n" if result.get("dialect") else ""
+        if result.get("mapping"):
+            columns = ", ".join(f"{k} → {v}" for k, v in result["mapping"].items())
+            dialect += f"🗺 Колонки: {columns}\n"
+        appended = ""
+        if result.get("new_count") is not None and result["new_count"] < result["raw_count"]:
+            appended = f"🔁 Новых записей с прошлой загрузки: {result['new_count']}\n"
+        if result.get("cached"):
+            appended += "♻️ Файл уже обрабатывался, отчеты взяты из кэша\n"
         await message.answer(
             f"✅ Обработка завершена! ({result['parser_type']})\n"
+            f"{dialect}"
             f"📊 Записей: {result['raw_count']} → {result['processed_count']}\n"
+            f"{appended}"
             f"📈 Средний FPS: {result['stats'].get('avg_framerate', 0):.1f}"
         )
 
@@ -108,8 +161,7 @@ async def handle_benchmark_file(message: Message, state: FSMContext, bot: Bot):
             await message.answer_document(document=csv_file, caption="📄 CSV отчет")
 
         # Очищаем временные файлы только в стандартном режиме
-        if not os.path.isabs(file_path):
-            cleanup_temp_files(file_path)
+        cleanup_upload(file_path)
 
     except Exception as e:
         await message.answer("❌ Произошла ошибка при обработке файла")
@@ -123,15 +175,35 @@ async def process_capframe_session(
     # Ждем 10 секунд для получения всех файлов
     await asyncio.sleep(10)
 
-    # Получаем все файлы сессии
-    session = capframe_sessions.get(user_id, [])
+    # Забираем файлы сессии: файлы, присланные во время обработки, открывают
+    # новую сессию и не попадают в этот пакет. Задача получает неизменяемый
+    # набор файлов, к которому относятся место в /queue и отмена /cancel
+    session = tuple(capframe_sessions.pop(user_id, []))
 
     if not session:
         return
 
     try:
-        # Обрабатываем все CapFrame файлы как один набор
-        result = await processor.process_files(session, "capframex")
+        # Обрабатываем все файлы сессии как один набор; формат определяется
+        # для каждого файла, файлы разных форматов получают общий отчет
+        result = await run_scheduled(
+            message,
+            user_id,
+            functools.partial(
+                processor.process_files,
+                session,
+                None,
+                metrics=user_metrics.get(user_id, REPORT_METRICS),
+                schema=await processor.get_schema(user_id),
+                user_id=user_id,
+            ),
+            sum(source_size(file_path) for file_path in session),
+            PRIORITY_NORMAL,
+        )
+        if result is None:
+            for file_path in session:
+                cleanup_upload(file_path)
+            return
 
         if not result["success"]:
             await message.answer(
@@ -139,16 +211,26 @@ async def process_capframe_session(
             )
             # Очищаем временные файлы только в стандартном режиме
             for file_path in session:
-                if not os.path.isabs(file_path):
-                    cleanup_temp_files(file_path)
-            # Очищаем сессию
-            if user_id in capframe_sessions:
-                del capframe_sessions[user_id]
+                cleanup_upload(file_path)
             return
 
-        # Отправляем результаты
+        # Отправляем результаты; файлы, которые не удалось разобрать, перечисляются отдельно
+        failures = "".join(
+            f"⚠️ {failure['file']}: {failure['error']}\n"
+            for failure in result.get("failures", [])
+        )
+        cached = "♻️ Отчеты взяты из кэша\n" if result.get("cached") else ""
+        groups = "".join(
+            f"• {group['parser_type']}: файлов {group['files_count']}, "
+            f"записей {group['raw_count']} → {group['processed_count']}\n"
+            for group in result.get("groups", [])
+        )
         await message.answer(
-            f"✅ Обработка CapFrameX файлов завершена!\n"
+            f"✅ Обработка {'файлов' if groups else 'CapFrameX файлов'} завершена!\n"
+            f"📁 Файлов: {result['files_count']} из {len(session)}\n"
+            f"{groups}"
+            f"{failures}"
+            f"{cached}"
             f"📊 Записей: {result['raw_count']} → {result['processed_count']}\n"
             f"📈 Средний FPS: {result['stats'].get('avg_framerate', 0):.1f}"
         )
@@ -180,23 +262,14 @@ async def process_capframe_session(
 
         # Очищаем временные файлы только в стандартном режиме
         for file_path in session:
-            if not os.path.isabs(file_path):
-                cleanup_temp_files(file_path)
-
-        # Очищаем сессию
-        if user_id in capframe_sessions:
-            del capframe_sessions[user_id]
+            cleanup_upload(file_path)
 
     except Exception as e:
         await message.answer("❌ Произошла ошибка при обработке CapFrameX файлов")
         print(f"Error: {e}")
-        # Очищаем сессию в случае ошибки
-        if user_id in capframe_sessions:
-            # Очищаем временные файлы только в стандартном режиме
-            for file_path in capframe_sessions[user_id]:
-                if not os.path.isabs(file_path):
-                    cleanup_temp_files(file_path)
-            del capframe_sessions[user_id]
+        # Очищаем временные файлы пакета в случае ошибки
+        for file_path in session:
+            cleanup_upload(file_path)
 
 
 async def cmd_parsers(message: Message):
@@ -211,6 +284,175 @@ async def cmd_parsers(message: Message):
     await message.answer(response)
 
 
+async def cmd_metrics(message: Message):
+    """Выбор набора перцентильных метрик: /metrics [default|extended]"""
+    # Модуль метрик загружает numpy, поэтому импортируется при первой команде
+    from parsers.percentiles import METRIC_SETS
+
+    args = (message.text or "").split()[1:]
+    user_id = message.from_user.id
+
+    if args:
+        if args[0] not in METRIC_SETS:
+            await message.answer(f"❌ Набор метрик {args[0]} не найден")
+            return
+        user_metrics[user_id] = args[0]
+
+    current = user_metrics.get(user_id, REPORT_METRICS)
+    response = f"📐 Текущий набор метрик: {current}\n\n"
+    for name, metrics in METRIC_SETS.items():
+        response += f"• {name}: {', '.join(metrics)}\n"
+    response += "\nИзменить: /metrics <набор>"
+    await message.answer(response)
+
+
+async def cmd_schema(message: Message):
+    """Схема колонок пользовательских файлов: /schema [колонка=каноническая ...|reset]"""
+    # Модуль схемы загружает pandas, поэтому импортируется при первой команде
+    from parsers.schema import CANONICAL_COLUMNS, REQUIRED_COLUMNS, parse_mapping
+
+    text = (message.text or "").split(maxsplit=1)
+    user_id = message.from_user.id
+
+    if len(text) > 1:
+        if text[1].strip() == "reset":
+            await processor.set_schema(user_id, None)
+        else:
+            try:
+                mapping = parse_mapping(text[1])
+            except ValueError as e:
+                await message.answer(f"❌ {e}")
+                return
+            await processor.set_schema(user_id, mapping)
+
+    saved = await processor.get_schema(user_id)
+    response = "🗺 Схема колонок: "
+    if saved:
+        response += ", ".join(f"{k} → {v}" for k, v in saved.items())
+    else:
+        response += "определяется автоматически по заголовкам"
+    response += (
+        f"\n\nКанонические колонки: {', '.join(CANONICAL_COLUMNS)}"
+        f"\nОбязательные: {', '.join(REQUIRED_COLUMNS)}"
+        "\n\nИзменить: /schema FPS=AverageFramerate Game=Application"
+        "\nНазвания с пробелами: /schema Avg FPS=AverageFramerate; Game=Application"
+        "\nСбросить: /schema reset"
+    )
+    await message.answer(response)
+
+
+async def cmd_history(message: Message):
+    """
+    История обработанных данных: /history - список приложений,
+    /history <приложение> [дней] - отчет по сохраненным данным без повторной загрузки файлов
+    """
+    args = (message.text or "").split()[1:]
+    user_id = message.from_user.id
+
+    if not args:
+        applications = await processor.history_applications(user_id)
+        if not applications:
+            await message.answer("📭 История пуста: отправьте benchmark файлы")
+            return
+        response = "🗂 Сохраненные данные:\n\n"
+        for app in applications:
+            response += (
+                f"• {app['application']}: прогонов {app['runs']}, "
+                f"{app['date_from']} — {app['date_to']}\n"
+            )
+        response += "\nОтчет: /history <приложение> [дней]"
+        await message.answer(response)
+        return
+
+    days = None
+    if len(args) > 1 and args[-1].isdigit():
+        days = int(args.pop())
+    application = " ".join(args)
+
+    result = await run_scheduled(
+        message,
+        user_id,
+        functools.partial(
+            processor.history_report,
+            user_id,
+            application,
+            days,
+            metrics=user_metrics.get(user_id, REPORT_METRICS),
+        ),
+        0,
+        PRIORITY_HIGH,
+    )
+    if result is None:
+        return
+    if not result["success"]:
+        await message.answer(f"❌ {result['error']}")
+        return
+
+    period = f"за {days} дн." if days is not None else "за все время"
+    await message.answer(
+        f"🗂 {application} {period} ({result['parser_type']})\n"
+        f"📊 Записей: {result['raw_count']} → {result['processed_count']}\n"
+        f"📈 Средний FPS: {result['stats'].get('avg_framerate', 0):.1f}\n"
+        f"⚡ Выборка из истории: {result['query_ms']:.0f} мс"
+    )
+    await message.answer_document(
+        document=BufferedInputFile(
+            result["reports"]["xlsx_data"], filename=result["xlsx_filename"]
+        ),
+        caption="📊 XLSX отчет",
+    )
+    if result["reports"]["csv_data"]:
+        await message.answer_document(
+            document=BufferedInputFile(
+                result["reports"]["csv_data"], filename=result["csv_filename"]
+            ),
+            caption="📄 CSV отчет",
+        )
+
+
+async def cmd_cancel(message: Message):
+    """Отмена ожидающих и выполняемых задач пользователя и несобранного пакета"""
+    user_id = message.from_user.id
+    count = scheduler.cancel(user_id)
+
+    # Пакет, который еще собирается, удаляется вместе с файлами
+    session = capframe_sessions.pop(user_id, [])
+    for file_path in session:
+        cleanup_upload(file_path)
+
+    if count or session:
+        await message.answer(
+            f"🛑 Отменено задач: {count}, файлов в пакете: {len(session)}"
+        )
+    else:
+        await message.answer("ℹ️ Нет задач для отмены")
+
+
+async def cmd_queue(message: Message):
+    """Состояние очереди обработки"""
+    stats = scheduler.stats()
+    await message.answer(
+        "⏳ Очередь обработки:\n"
+        f"• В очереди: {stats['queued']} (пользователей: {stats['queued_users']})\n"
+        f"• Выполняется: {stats['running']} ({stats['running_bytes'] / 1024 / 1024:.1f} МБ)\n"
+        f"• Среднее ожидание: {stats['avg_wait']:.1f} с, наибольшее: {stats['max_wait']:.1f} с\n"
+        f"• Дольше всех ждет: {stats['oldest_wait']:.1f} с\n"
+        f"• Завершено: {stats['completed']}, отменено: {stats['cancelled']}"
+    )
+
+
+async def cmd_cache(message: Message):
+    """Счетчики кэша результатов обработки"""
+    stats = await processor.cache_stats()
+    await message.answer(
+        "♻️ Кэш результатов:\n"
+        f"• Попаданий: {stats['hits']} (память: {stats['memory_hits']}, диск: {stats['disk_hits']})\n"
+        f"• Промахов: {stats['misses']}\n"
+        f"• В памяти: {stats['memory_items']} ({stats['memory_bytes'] / 1024 / 1024:.1f} МБ)\n"
+        f"• На диске: {stats['disk_bytes'] / 1024 / 1024:.1f} МБ"
+    )
+
+
 def register_file_handlers(dp: Dispatcher):
     """Регистрация обработчиков файлов"""
     # Обработка всех текстовых файлов
@@ -218,3 +460,19 @@ def register_file_handlers(dp: Dispatcher):
 
     # Команда для просмотра парсеров
     dp.message.register(cmd_parsers, Command("parsers"))
+
+    # Команда для выбора набора метрик
+    dp.message.register(cmd_metrics, Command("metrics"))
+
+    # Команда для настройки схемы колонок
+    dp.message.register(cmd_schema, Command("schema"))
+
+    # Команда для просмотра счетчиков кэша результатов
+    dp.message.register(cmd_cache, Command("cache"))
+
+    # Команда истории обработанных данных
+    dp.message.register(cmd_history, Command("history"))
+
+    # Команды очереди обработки
+    dp.message.register(cmd_cancel, Command("cancel"))
+    dp.message.register(cmd_queue, Command("queue"))
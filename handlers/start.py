@@ -2,7 +2,7 @@ from aiogram import Dispatcher
 from aiogram.filters import Command
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
 
-from services.processor import BenchmarkProcessor
+from parsers import PARSER_REGISTRY
 
 
 async def cmd_start(message: Message):
@@ -40,6 +40,11 @@ async def cmd_help(message: Message):
         "📊 Особенности:\n"
         "• Для CapFrameX файлов автоматически объединяются несколько файлов в один отчет\n"
         "• Время отображается в формате часов\n"
+        "• /metrics - выбор набора метрик (1%/0.1% lows, перцентили времени кадра)\n"
+        "• /schema - схема колонок пользовательских файлов\n"
+        "• /history - история данных и отчеты за период без повторной загрузки\n"
+        "• /cache - статистика кэша результатов\n"
+        "• /queue - очередь обработки, /cancel - отменить свои задачи\n"
         "• Поддерживаются все популярные форматы benchmark!"
     )
 
@@ -62,8 +67,8 @@ async def cmd_about(message: Message):
 
 async def cmd_parsers_info(message: Message):
     """Обработчик кнопки 'Парсеры'"""
-    processor = BenchmarkProcessor()
-    parsers = processor.get_available_parsers()
+    # Описания берутся из реестра, модули парсеров не импортируются
+    parsers = PARSER_REGISTRY.descriptions()
 
     response = "🛠 Доступные парсеры:\n\n"
     for name, description in parsers.items():
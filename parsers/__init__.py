@@ -1,55 +1,83 @@
 """
 Пакет парсеров benchmark файлов.
-Добавляйте новые парсеры для поддержки разных форматов.
+Добавляйте новые парсеры для поддержки разных форматов: опишите парсер
+через register_parser (см. parsers.registry и пример в parsers.example_parser).
+Модули парсеров импортируются только при использовании.
 """
 
-from .base_parser import BaseParser
-from .capframe_parser import CapFrameParser
-from .msi_afterburner_parser import MSIAfterburnerParser
-from .custom_parser import CustomParser
+from typing import Tuple
 
-# Реестр всех доступных парсеров
-PARSER_REGISTRY = {
-    "capframex": CapFrameParser,
-    "msi_afterburner": MSIAfterburnerParser,
-    "custom": CustomParser,
-}
+from .registry import (
+    PARSER_ENTRIES,
+    PARSER_REGISTRY,
+    detect_scores,
+    best_parser,
+    load_parser_class,
+    register_parser,
+)
+from .source import read_range
 
+# Сколько байт из начала файла используется для определения формата
+DETECT_BYTES = 64 * 1024
 
-def get_parser(parser_type: str) -> BaseParser:
-    """Получение парсера по типу"""
-    if parser_type not in PARSER_REGISTRY:
-        raise ValueError(f"Парсер {parser_type} не найден")
-    return PARSER_REGISTRY[parser_type]()
+# Встроенные парсеры; описание, расширения и сигнатуры объявлены в их классах.
+# При равных оценках побеждает зарегистрированный раньше
+register_parser("capframex", "parsers.capframe_parser", "CapFrameParser")
+register_parser(
+    "msi_afterburner", "parsers.msi_afterburner_parser", "MSIAfterburnerParser"
+)
+register_parser("custom", "parsers.custom_parser", "CustomParser")
+
+
+def get_parser(parser_type: str, **options):
+    """Получение парсера по типу; options передаются в конструктор парсера"""
+    return load_parser_class(parser_type)(**options)
+
+
+def read_file_prefix(source, size: int = DETECT_BYTES) -> bytes:
+    """Читает начало файла (или данных в памяти) для определения формата"""
+    return read_range(source, 0, size)
+
+
+def detect_file(source) -> Tuple[str, bytes]:
+    """
+    Определение типа парсера по началу файла (не более DETECT_BYTES байт).
+    source - путь к файлу или данные в памяти (см. parsers.source).
+    Возвращает тип парсера и прочитанное начало файла, которое передается парсеру,
+    чтобы он не читал его повторно.
+    """
+    prefix = read_file_prefix(source)
+    text = prefix.decode("utf-8", errors="replace")
+    return detect_parser_type(text), prefix
 
 
 def detect_parser_type(file_content: str) -> str:
-    """Автоматическое определение типа парсера по содержимому файла"""
-    lines = file_content.split("\n")[:10]  # Анализируем первые 10 строк
-
-    # Проверяем, является ли файл JSON (возможно CapFrameX)
-    file_content_stripped = file_content.strip()
-    if file_content_stripped.startswith('{') and file_content_stripped.endswith('}'):
-        try:
-            import json
-            data = json.loads(file_content_stripped)
-            # Проверяем характерные поля CapFrameX
-            if "Hash" in data and "Info" in data and "Runs" in data:
-                return "capframex"
-        except:
-            pass
-
-    # Эвристики для определения формата
-    if any("capframex" in line.lower() for line in lines):
-        return "capframex"
-    elif any("completed," in line and "frames" in line and ".exe" in line for line in lines):
-        # Более точная проверка для MSI Afterburner
-        return "msi_afterburner"
-    elif any("completed," in line and "frames" in line for line in lines):
-        # Более общая проверка для Custom формата
-        return "custom"
-    else:
-        return "custom"  # По умолчанию для универсального парсера
-
-
-__all__ = ["BaseParser", "get_parser", "detect_parser_type", "PARSER_REGISTRY"]
+    """
+    Автоматическое определение типа парсера по содержимому файла.
+    Каждый зарегистрированный парсер оценивает начало файла по своим сигнатурам,
+    побеждает парсер с наибольшей оценкой (см. parsers.registry).
+    """
+    return best_parser(file_content)
+
+
+def __getattr__(name: str):
+    # Базовый класс и классы парсеров загружаются при первом обращении
+    if name == "BaseParser":
+        from .base_parser import BaseParser
+
+        return BaseParser
+    for parser_type, entry in PARSER_ENTRIES.items():
+        if entry["class_name"] == name:
+            return load_parser_class(parser_type)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = [
+    "BaseParser",
+    "get_parser",
+    "detect_file",
+    "detect_parser_type",
+    "detect_scores",
+    "register_parser",
+    "PARSER_REGISTRY",
+]
@@ -0,0 +1,223 @@
+"""
+Общая обработка данных в канонической схеме (Date, Time, Application, Frames,
+TimeTaken, AverageFramerate, ...): фильтрация неполных прогонов, удаление выбросов
+по z-оценке и усреднение по дате, часу и приложению. Используется всеми парсерами.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .columns import BENCHMARK_COLUMNS
+
+
+# Прогон отбрасывается, если он короче этой доли среднего времени прогонов
+# с тем же временем запуска и приложением
+MIN_TIME_RATIO = 0.8
+
+# Прогоны дальше этого числа стандартных отклонений времени прогона - выбросы
+MAX_Z_SCORE = 3
+
+# Число значащих цифр, которое всегда восстанавливается из float32 (FLT_DIG),
+# и достаточное для однозначной записи любого float32
+FLOAT32_MIN_DIGITS = 6
+FLOAT32_MAX_DIGITS = 9
+
+# Группы нумеруются без сортировки строк, если возможных сочетаний ключей
+# не больше чем в DENSE_KEY_RATIO раз больше строк
+DENSE_KEY_RATIO = 16
+
+
+def float_values(column: pd.Series) -> np.ndarray:
+    """
+    Значения колонки в float64, нечисловые значения - NaN.
+    Значения float32 переводятся в кратчайшую десятичную запись, которая дает
+    то же значение float32 (от FLOAT32_MIN_DIGITS значащих цифр): 102.3,
+    а не 102.30000305175781.
+    """
+    values = pd.to_numeric(column, errors="coerce")
+    if values.dtype != np.float32:
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    single = values.to_numpy()
+    result = single.astype(np.float64)
+    pending = np.flatnonzero(np.isfinite(result) & (result != 0))
+    for digits in range(FLOAT32_MIN_DIGITS, FLOAT32_MAX_DIGITS + 1):
+        if not pending.size:
+            break
+        exact = result[pending]
+        shift = digits - 1 - np.floor(np.log10(np.abs(exact)))
+        scale = 10.0 ** np.abs(shift)
+        rounded = np.where(
+            shift >= 0, np.round(exact * scale) / scale, np.round(exact / scale) * scale
+        )
+        matched = rounded.astype(np.float32) == single[pending]
+        result[pending[matched]] = rounded[matched]
+        pending = pending[~matched]
+    return result
+
+
+def _key_codes(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Коды ключа группировки и его значения. Коды упорядочены как значения,
+    пропуски получают код -1. У категориальной колонки используются ее коды,
+    остальные колонки факторизуются без сортировки строк - сортируются только
+    уникальные значения.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    order = uniques.argsort()
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return np.where(codes >= 0, rank[codes], -1), np.asarray(uniques[order])
+
+
+def _group_ids(
+    keys: Sequence[Tuple[np.ndarray, int]], valid: np.ndarray
+) -> Tuple[np.ndarray, List[np.ndarray]]:
+    """
+    Номера групп для строк valid по нескольким ключам (коды, число значений)
+    и коды ключей каждой группы. Группы пронумерованы в лексикографическом
+    порядке значений ключей.
+    """
+    combined = np.zeros(int(valid.sum()), dtype=np.int64)
+    space = 1
+    for codes, size in keys:
+        combined = combined * size + codes[valid]
+        space *= size
+
+    if space <= DENSE_KEY_RATIO * max(len(combined), 1):
+        # Плотная нумерация без сортировки строк: отметка встреченных ключей
+        present = np.zeros(space, dtype=bool)
+        present[combined] = True
+        group_keys = np.flatnonzero(present)
+        numbers = np.cumsum(present) - 1
+        groups = numbers[combined]
+    else:
+        group_keys, groups = np.unique(combined, return_inverse=True)
+
+    key_codes = []
+    for _, size in reversed(keys):
+        key_codes.append(group_keys % size)
+        group_keys = group_keys // size
+    return groups, key_codes[::-1]
+
+
+def _group_means(values: np.ndarray, groups: np.ndarray, count: int) -> np.ndarray:
+    """
+    Средние значений по номерам групп; пропуски не учитываются (NaN для групп
+    без значений). Сумма по группам уточняется вторым проходом по отклонениям
+    от первого среднего, чтобы ошибка округления не зависела от числа строк.
+    """
+    present = ~np.isnan(values)
+    if not present.all():
+        values, groups = values[present], groups[present]
+    sizes = np.bincount(groups, minlength=count)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = np.bincount(groups, weights=values, minlength=count) / sizes
+        residuals = np.bincount(groups, weights=values - means[groups], minlength=count)
+        means += residuals / sizes
+    return means
+
+
+def aggregate_benchmarks(
+    df: pd.DataFrame, numeric_columns: Sequence[str] = BENCHMARK_COLUMNS
+) -> pd.DataFrame:
+    """
+    Усреднение прогонов по дате, часу и приложению.
+    Колонки numeric_columns, которых нет в df, пропускаются.
+
+    1. Прогоны короче MIN_TIME_RATIO от среднего TimeTaken среди прогонов
+       с той же датой, временем запуска и приложением отбрасываются.
+    2. Из оставшихся отбрасываются выбросы: |z-оценка TimeTaken| >= MAX_Z_SCORE.
+       Если все оставшиеся прогоны одинаковой длины (стандартное отклонение 0),
+       выбросов нет и прогоны сохраняются. Прежняя реализация в этом случае
+       получала z-оценки NaN и отбрасывала все прогоны (пустой отчет).
+    3. Остальные усредняются по дате, часу ("21 h") и приложению и округляются.
+
+    Ключи группировки переводятся в целочисленные коды (коды категориальных
+    колонок или pd.factorize), час считается по уникальным значениям времени,
+    маски фильтров и средние - по массивам numpy (np.bincount по номерам групп)
+    без копий исходного DataFrame. Результат отсортирован по дате, часу и приложению.
+    """
+    numeric_columns: List[str] = [col for col in numeric_columns if col in df.columns]
+
+    date_codes, dates = _key_codes(df["Date"])
+    time_codes, times = _key_codes(df["Time"])
+    app_codes, apps = _key_codes(df["Application"])
+
+    # Час запуска: первые два символа времени; считается по уникальным значениям
+    hour_of_time, hours = _key_codes(pd.Series(times, dtype=object).astype(str).str[:2])
+    hour_codes = np.where(time_codes >= 0, hour_of_time[time_codes], -1)
+
+    time_taken = float_values(df["TimeTaken"])
+    keyed = (date_codes >= 0) & (time_codes >= 0) & (app_codes >= 0)
+
+    # Проход 1: среднее время прогона по дате, точному времени и приложению
+    run_groups, _ = _group_ids(
+        [(date_codes, len(dates)), (time_codes, len(times)), (app_codes, len(apps))],
+        keyed,
+    )
+    run_time = time_taken[keyed]
+    run_means = _group_means(run_time, run_groups, int(run_groups.max(initial=-1)) + 1)
+    keep = np.zeros(len(df), dtype=bool)
+    keep[keyed] = run_time >= run_means[run_groups] * MIN_TIME_RATIO
+
+    # Проход 2: z-оценка времени прогона по оставшимся прогонам
+    if keep.sum() > 1:
+        kept_time = time_taken[keep]
+        std = kept_time.std(ddof=1)
+        if std > 0:
+            keep[keep] = np.abs(kept_time - kept_time.mean()) / std < MAX_Z_SCORE
+
+    if not keep.any():
+        return df.iloc[0:0]
+
+    # Проход 3: средние числовых колонок по дате, часу и приложению
+    groups, (date_key, hour_key, app_key) = _group_ids(
+        [(date_codes, len(dates)), (hour_codes, len(hours)), (app_codes, len(apps))],
+        keep,
+    )
+    count = int(groups.max()) + 1
+    mean_data = pd.DataFrame(
+        {
+            "Date": dates[date_key],
+            "Time": [f"{hour} h" for hour in hours[hour_key]],
+            "Application": apps[app_key].astype(str),
+        }
+    )
+    for col in numeric_columns:
+        values = float_values(df[col])
+        means = np.round(_group_means(values[keep], groups, count))
+        # Колонки с пропусками остаются целыми с поддержкой NA
+        mean_data[col] = (
+            means.astype(np.int64)
+            if not np.isnan(means).any()
+            else pd.array(means, dtype="Int64")
+        )
+
+    return mean_data
+
+
+def benchmark_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    """Сводная статистика по усредненным данным"""
+    if df.empty:
+        return {}
+
+    return {
+        "avg_framerate": float(df["AverageFramerate"].mean())
+        if "AverageFramerate" in df.columns
+        else 0,
+        "min_framerate": float(df["MinFramerate"].min())
+        if "MinFramerate" in df.columns
+        else 0,
+        "max_framerate": float(df["MaxFramerate"].max())
+        if "MaxFramerate" in df.columns
+        else 0,
+        "total_frames": int(df["Frames"].sum()) if "Frames" in df.columns else 0,
+        "total_time": int(df["TimeTaken"].sum())
+        if "TimeTaken" in df.columns
+        else 0,
+    }
@@ -1,15 +1,53 @@
 from abc import ABC, abstractmethod
 import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple, Union
 import io
+import os
+
+from .xlsx_report import ReportWriter
 
 
 class BaseParser(ABC):
     """Базовый класс для всех парсеров benchmark файлов"""
 
+    # Объявления для реестра (см. parsers.registry): описание, расширения файлов
+    # и сигнатуры - пары (регулярное выражение, вес), проверяемые по началу файла.
+    # Реестр читает их из исходного кода, поэтому значения должны быть литералами
+    DESCRIPTION: str = ""
+    FORMATS: List[str] = []
+    SIGNATURES: List[Tuple[str, float]] = []
+
+    def __init__(
+        self,
+        metrics: Optional[Union[str, Dict[str, Any]]] = None,
+        schema: Optional[Dict[str, str]] = None,
+        workers: Optional[int] = None,
+    ):
+        # Набор метрик отчета; учитывается парсерами, которые сами считают метрики кадров
+        self.metrics = metrics
+        # Сопоставление колонок файла канонической схеме (см. parsers.schema);
+        # учитывается парсерами пользовательских форматов
+        self.schema = schema
+        # Сколько процессов парсер может занять для параллельного разбора;
+        # None - по числу ядер (пул обработки передает свободные места, см.
+        # services.processor)
+        self.workers = workers
+
+    def parallel_workers(self, max_workers: int) -> int:
+        """Число процессов для параллельного разбора внутри парсера"""
+        workers = min(max_workers, os.cpu_count() or 1)
+        if self.workers is not None:
+            workers = min(workers, self.workers)
+        return max(1, workers)
+
     @abstractmethod
-    def parse_file(self, file_path: str) -> pd.DataFrame:
-        """Парсинг файла и возврат DataFrame"""
+    def parse_file(self, source, prefix: Optional[bytes] = None) -> pd.DataFrame:
+        """
+        Парсинг файла и возврат DataFrame.
+        source - путь к файлу или данные в памяти: bytes, memoryview, io.BytesIO (см. parsers.source).
+        prefix - начало файла, уже прочитанное при определении формата;
+        парсер может не читать эти байты повторно.
+        """
         pass
 
     @abstractmethod
@@ -39,28 +77,37 @@ class BaseParser(ABC):
             "max_framerate": df.get("MaxFramerate", pd.Series([0])).max(),
         }
 
-    def generate_reports(self, processed_data: Dict[str, Any]) -> Dict[str, bytes]:
-        """Генерация отчетов (XLSX и CSV)"""
+    def write_sheets(
+        self, writer: ReportWriter, processed_data: Dict[str, Any], prefix: str = ""
+    ) -> None:
+        """
+        Запись листов отчета в открытую книгу (parsers.xlsx_report.ReportWriter).
+        prefix добавляется к названиям листов, когда в одну книгу пишутся
+        отчеты нескольких форматов (см. parsers.combined_report).
+        """
         df_raw = processed_data["raw_data"]
         df_processed = processed_data["processed_data"]
 
-        # XLSX отчет
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-            df_raw.to_excel(writer, sheet_name="Raw Data", index=False)
-            df_processed.to_excel(writer, sheet_name="Processed Data", index=False)
+        writer.write_frame(f"{prefix}Raw Data", df_raw)
+        writer.write_frame(f"{prefix}Processed Data", df_processed)
 
-            # Добавляем лист со статистикой
-            stats_df = pd.DataFrame([processed_data["stats"]])
-            stats_df.to_excel(writer, sheet_name="Statistics", index=False)
+        # Добавляем лист со статистикой
+        stats_df = pd.DataFrame([processed_data["stats"]])
+        writer.write_frame(f"{prefix}Statistics", stats_df)
 
-        excel_buffer.seek(0)
+    def generate_reports(self, processed_data: Dict[str, Any]) -> Dict[str, bytes]:
+        """Генерация отчетов (XLSX и CSV)"""
+        df_processed = processed_data["processed_data"]
+
+        # XLSX отчет
+        with ReportWriter() as writer:
+            self.write_sheets(writer, processed_data)
 
         # CSV отчет
         csv_buffer = io.StringIO()
         df_processed.to_csv(csv_buffer, index=False, encoding="utf-8")
 
         return {
-            "xlsx_data": excel_buffer.getvalue(),
+            "xlsx_data": writer.getvalue(),
             "csv_data": csv_buffer.getvalue().encode("utf-8"),
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,126 @@
+"""
+Компактное хранение данных в канонической схеме (Date, Time, Application и
+числовые колонки, см. parsers.aggregation).
+
+Парсеры добавляют прогоны в CanonicalFrame напрямую, без словаря на каждую
+строку: дата хранится номером дня, время запуска и приложение - кодами
+словаря значений, числа кадров - int32, остальные метрики - float32
+(array.array). to_frame() строит DataFrame с датами datetime64,
+категориальными Time и Application и метриками int32/float32.
+
+Память на миллион прогонов (10 колонок, время запуска до секунды,
+python -m benchmarks.bench_canonical_frame):
+    список словарей и DataFrame из него: пик ~760 МБ, DataFrame ~230 МБ
+    CanonicalFrame и DataFrame из него:   пик ~135 МБ, DataFrame ~49 МБ
+"""
+
+from array import array
+from datetime import date
+from typing import Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .columns import BENCHMARK_COLUMNS, GROUP_COLUMNS
+
+# Числовые колонки, которые хранятся целыми (int32); остальные - float32
+INTEGER_COLUMNS = ("Frames", "StutterCount")
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def day_number(value: date) -> int:
+    """Номер дня от 1970-01-01 (значение datetime64[D])"""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _categorical(codes: array, labels: Dict[str, int]) -> pd.Categorical:
+    """Категориальная колонка по кодам в порядке появления; категории упорядочены"""
+    values = np.array(list(labels), dtype=object)
+    order = np.argsort(values)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    codes = rank[np.array(codes, dtype=np.int32)]
+    return pd.Categorical.from_codes(codes, values[order])
+
+
+class CanonicalFrame:
+    """Прогоны в канонической схеме в типизированных массивах"""
+
+    def __init__(self, numeric_columns: Sequence[str] = BENCHMARK_COLUMNS):
+        self.numeric_columns = list(numeric_columns)
+        self._days = array("i")
+        self._time_codes = array("i")
+        self._app_codes = array("i")
+        # Значение -> код в порядке появления
+        self._times: Dict[str, int] = {}
+        self._apps: Dict[str, int] = {}
+        self._values = [
+            array("i" if column in INTEGER_COLUMNS else "f")
+            for column in self.numeric_columns
+        ]
+
+    def __len__(self) -> int:
+        return len(self._days)
+
+    def append(
+        self, day: int, time: str, application: str, values: Sequence[float]
+    ) -> None:
+        """
+        Добавляет прогон: номер дня (day_number), время запуска, приложение
+        и значения numeric_columns в том же порядке
+        """
+        self._days.append(day)
+        self._time_codes.append(self._times.setdefault(time, len(self._times)))
+        self._app_codes.append(self._apps.setdefault(application, len(self._apps)))
+        for column, value in zip(self._values, values):
+            column.append(value)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame: даты datetime64, категориальные Time/Application, int32/float32"""
+        if not len(self):
+            return pd.DataFrame()
+        data = {
+            "Date": np.array(self._days, dtype=np.int64)
+            .astype("datetime64[D]")
+            .astype("datetime64[ns]"),
+            "Time": _categorical(self._time_codes, self._times),
+            "Application": _categorical(self._app_codes, self._apps),
+        }
+        for column, values in zip(self.numeric_columns, self._values):
+            data[column] = np.array(
+                values, dtype=np.int32 if values.typecode == "i" else np.float32
+            )
+        return pd.DataFrame(data)
+
+
+def concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Объединение DataFrame с пропуском пустых. Категориальные колонки остаются
+    категориальными: категории всех частей объединяются до склейки
+    (pd.concat превратил бы колонки с разными категориями в строки).
+    """
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0]
+
+    for column in GROUP_COLUMNS:
+        columns = [frame.get(column) for frame in frames]
+        if not all(
+            values is not None and isinstance(values.dtype, pd.CategoricalDtype)
+            for values in columns
+        ):
+            continue
+        categories = columns[0].cat.categories
+        for values in columns[1:]:
+            categories = categories.union(values.cat.categories)
+        unified = []
+        for frame, values in zip(frames, columns):
+            frame = frame.copy(deep=False)
+            frame[column] = values.cat.set_categories(categories)
+            unified.append(frame)
+        frames = unified
+    return pd.concat(frames, ignore_index=True)
+
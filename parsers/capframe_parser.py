@@ -1,35 +1,75 @@
 import pandas as pd
-import json
 from datetime import datetime
 import math
+from .aggregation import aggregate_benchmarks, benchmark_stats
 from .base_parser import BaseParser
-from typing import List, Dict, Any
+from .canonical import CanonicalFrame, day_number
+from .capframe_reader import CapFrameReader
+from .capture_columns import CaptureColumns
+from .frametime import RUN_CHANNELS, run_stats
+from .percentiles import MetricSpec, resolve_metrics
+from .registry import DETECT_MIN_SCORE, signature_score
+from .source import is_path
+from .xlsx_report import REPORT_DATE_FORMAT, ReportWriter
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Iterator, Optional, Union
 import io
-import numpy as np
+
+# Прогоны считаются параллельно, если их не меньше PARALLEL_MIN_RUNS
+# и суммарный размер их каналов не меньше PARALLEL_MIN_BYTES (~2 млн кадров)
+PARALLEL_MIN_RUNS = 4
+PARALLEL_MIN_BYTES = 64 * 1024 * 1024
+PARALLEL_MAX_WORKERS = 8
 
 
 class CapFrameParser(BaseParser):
     """Парсер для CapFrameX benchmark файлов"""
 
-    def parse_file(self, file_path: str) -> pd.DataFrame:
-        """Парсинг файла CapFrameX и возврат DataFrame"""
+    DESCRIPTION = "Парсер для CapFrameX benchmark файлов"
+    FORMATS = [".json"]
+    SIGNATURES = [
+        # JSON объект с массивом прогонов и полями Hash/Info: порога достигают
+        # только Runs вместе с Hash или Info
+        (r'\A\ufeff?\s*\{', 0.2),
+        (r'"Runs"\s*:\s*\[', 0.4),
+        (r'"(?:Hash|Info)"\s*:', 0.4),
+    ]
+
+    def __init__(
+        self,
+        metrics: Optional[Union[str, Dict[str, MetricSpec]]] = None,
+        schema: Optional[Dict[str, str]] = None,
+        workers: Optional[int] = None,
+    ):
+        super().__init__(metrics, schema, workers)
+        # Набор перцентильных метрик, которые попадут в отчет
+        self.metrics = resolve_metrics(metrics)
+
+    def parse_file(self, source, prefix: Optional[bytes] = None) -> pd.DataFrame:
+        """Парсинг файла CapFrameX и возврат DataFrame (одна строка на прогон)"""
+        # Потоково читаем прогоны: каждый прогон анализируется отдельно,
+        # а каналы CaptureData декодируются только при расчете метрик.
+        # Если прогоны считаются в этом процессе, время кадров декодируется
+        # сразу при чтении файла; в пул процессов передаются только границы каналов
+        in_process = (
+            self.parallel_workers(PARALLEL_MAX_WORKERS) == 1 or not is_path(source)
+        )
+        reader = CapFrameReader(
+            source, prefix=prefix, decode=RUN_CHANNELS if in_process else ()
+        )
+
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Некорректный JSON формат: {str(e)}")
+            run_results = self._analyse_runs(reader.iter_runs())
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Ошибка чтения файла: {str(e)}")
 
-        bench_data = []
-
-        # Извлекаем информацию из JSON
-        info = data.get("Info", {})
-        runs = data.get("Runs", [])
-
-        if not runs:
+        if not run_results:
             raise ValueError("Файл не содержит данных о прогонах (Runs)")
 
+        # Извлекаем информацию из JSON
+        info = reader.info
         process_name = info.get("ProcessName", "Unknown").replace(".exe", "")
         creation_date = info.get("CreationDate", "")
 
@@ -53,176 +93,85 @@ class CapFrameParser(BaseParser):
         # Округляем часы вниз
         hour = math.floor(time_obj.hour)
 
-        # Собираем все данные из всех прогонов
-        all_time_values = []
-        total_time_taken = 0.0
-
-        for run_idx, run in enumerate(runs):
-            try:
-                capture_data = run.get("CaptureData", {})
-                time_in_seconds = capture_data.get("TimeInSeconds", [])
-                if time_in_seconds:
-                    all_time_values.extend(time_in_seconds)
-                    # TimeTaken - это время последнего кадра
-                    total_time_taken += time_in_seconds[-1]
-            except Exception:
-                # Пропускаем проблемные прогоны
-                continue
-
-        # Если есть данные, обрабатываем их
-        if all_time_values and len(all_time_values) > 1:
-            # Сортируем временные значения
-            all_time_values.sort()
-
-            # Вычисляем FPS для каждого кадра
-            fps_values = []
-            for i in range(1, len(all_time_values)):
-                delta = all_time_values[i] - all_time_values[i - 1]
-                if delta > 0:
-                    fps_values.append(1.0 / delta)
-
-            if fps_values:
-                avg_fps = sum(fps_values) / len(fps_values)
-                min_fps = min(fps_values)
-                max_fps = max(fps_values)
-
-                # Вычисляем 1% lows
-                sorted_fps = sorted(fps_values)
-                low_1_percent_index = max(0, int(len(sorted_fps) * 0.01))
-                low_1_percent = sorted_fps[low_1_percent_index]
-
-                # Вычисляем 0.1% lows
-                low_01_percent_index = max(0, int(len(sorted_fps) * 0.001))
-                low_01_percent = sorted_fps[low_01_percent_index]
+        run_results = [run_result for run_result in run_results if run_result]
+        if not run_results:
+            raise ValueError("Не удалось извлечь данные из файла")
 
-                bench_data.append(
-                    {
-                        "Date": date,
-                        "Time": f"{hour:02d}",  # Часы с ведущим нулем и округлением вниз
-                        "Application": process_name,
-                        "Frames": len(all_time_values),
-                        "TimeTaken": total_time_taken,  # Общее время выполнения всех прогонов
-                        "AverageFramerate": avg_fps,
-                        "MinFramerate": min_fps,
-                        "MaxFramerate": max_fps,
-                        "Low1Percent": low_1_percent,
-                        "Low01Percent": low_01_percent,
-                    }
-                )
+        # Колонки в порядке метрик прогона; часы с ведущим нулем и округлением вниз
+        columns = list(run_results[0])
+        frame = CanonicalFrame(columns)
+        for run_result in run_results:
+            frame.append(
+                day_number(date),
+                f"{hour:02d}",
+                process_name,
+                [run_result[column] for column in columns],
+            )
+        return frame.to_frame()
+
+    def _analyse_runs(
+        self, runs: Iterator[CaptureColumns]
+    ) -> List[Optional[Dict[str, float]]]:
+        """
+        Анализ прогонов с сохранением порядка.
+        Если прогонов и кадров много, прогоны считаются в пуле процессов.
+        """
+        pending = []
+        pending_bytes = 0
+        futures = []
+        executor = None
+        workers = self.parallel_workers(PARALLEL_MAX_WORKERS)
 
-        if not bench_data:
-            raise ValueError("Не удалось извлечь данные из файла")
+        try:
+            for columns in runs:
+                if executor is not None:
+                    futures.append(executor.submit(run_stats, columns, self.metrics))
+                    continue
+
+                pending.append(columns)
+                pending_bytes += columns.nbytes
+                # Прогоны из памяти не пересылаются в другие процессы
+                if (
+                    workers > 1
+                    and is_path(columns.source)
+                    and len(pending) >= PARALLEL_MIN_RUNS
+                    and pending_bytes >= PARALLEL_MIN_BYTES
+                ):
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                    futures = [
+                        executor.submit(run_stats, columns, self.metrics)
+                        for columns in pending
+                    ]
+                    pending = []
 
-        return pd.DataFrame(bench_data)
+            if executor is None:
+                return [run_stats(columns, self.metrics) for columns in pending]
+            return [future.result() for future in futures]
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
     def get_supported_formats(self) -> List[str]:
-        return [".json"]
+        return list(self.FORMATS)
 
     def can_parse(self, file_content: str) -> bool:
-        try:
-            # Проверяем, начинается и заканчивается ли содержимое как JSON
-            stripped_content = file_content.strip()
-            if not (
-                stripped_content.startswith("{") and stripped_content.endswith("}")
-            ):
-                return False
-
-            data = json.loads(stripped_content)
-            # Проверяем, есть ли характерные поля CapFrameX
-            return (
-                "Hash" in data
-                and "Info" in data
-                and "Runs" in data
-                and isinstance(data.get("Runs"), list)
-            )
-        except:
-            return False
+        # Проверка по сигнатурам реестра: JSON объект с массивом Runs и полями Hash/Info
+        return signature_score("capframex", file_content) >= DETECT_MIN_SCORE
 
     def process_data(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Обработка данных CapFrameX"""
+        """Обработка данных CapFrameX (общая обработка, см. parsers.aggregation)"""
         if df.empty:
             return {"raw_data": df, "processed_data": df, "stats": {}}
 
-        # Создаем копию для фильтрации
-        df_filtered = df.copy()
-
-        # Применяем фильтрацию по времени выполнения (как в MSI Afterburner)
-        if len(df_filtered) > 1:
-            mean_time_taken = df_filtered.groupby(["Date", "Time", "Application"])[
-                "TimeTaken"
-            ].transform("mean")
-            df_filtered = df_filtered[df_filtered["TimeTaken"] >= mean_time_taken * 0.8]
-
-        df_filtered.loc[:, "Time"] = df_filtered["Time"].astype(str) + " h"
-
-        # Удаление выбросов с помощью z-оценки (как в MSI Afterburner)
-        if len(df_filtered) > 1:  # Только если у нас больше одной записи
-            z_scores = np.abs(
-                (df_filtered["TimeTaken"] - df_filtered["TimeTaken"].mean())
-                / df_filtered["TimeTaken"].std()
-            )
-            df_filtered = df_filtered[
-                z_scores < 3
-            ]  # Сохранение только данных в пределах 3-х стандартных отклонений
-
-        # Группировка и усреднение данных (как в MSI Afterburner)
-        if not df_filtered.empty and len(df_filtered) > 1:
-            mean_data = (
-                df_filtered.groupby(["Date", "Time", "Application"], as_index=False)[
-                    [
-                        "Frames",
-                        "TimeTaken",
-                        "AverageFramerate",
-                        "MinFramerate",
-                        "MaxFramerate",
-                        "Low1Percent",
-                        "Low01Percent",
-                    ]
-                ]
-                .mean()
-                .round()
-            )
-
-            # Преобразование типов данных
-            numeric_columns = [
-                "Frames",
-                "TimeTaken",
-                "AverageFramerate",
-                "MinFramerate",
-                "MaxFramerate",
-                "Low1Percent",
-                "Low01Percent",
-            ]
-            for col in numeric_columns:
-                if col in mean_data.columns:
-                    mean_data[col] = mean_data[col].astype(int)
-
-            mean_data["Time"] = mean_data["Time"].astype(str)
-            mean_data["Application"] = mean_data["Application"].astype(str)
-            mean_data = mean_data.sort_values(
-                ["Date", "Time", "Application"], ascending=True
-            )
-        elif not df_filtered.empty:
-            # Если только одна запись, просто копируем данные
-            mean_data = df_filtered.copy()
-            # Преобразование типов данных
-            numeric_columns = [
-                "Frames",
-                "TimeTaken",
-                "AverageFramerate",
-                "MinFramerate",
-                "MaxFramerate",
-                "Low1Percent",
-                "Low01Percent",
-            ]
-            for col in numeric_columns:
-                if col in mean_data.columns:
-                    mean_data[col] = mean_data[col].astype(int)
-
-            mean_data["Time"] = mean_data["Time"].astype(str)
-            mean_data["Application"] = mean_data["Application"].astype(str)
-        else:
-            mean_data = pd.DataFrame()
+        numeric_columns = [
+            "Frames",
+            "TimeTaken",
+            "AverageFramerate",
+            "MinFramerate",
+            "MaxFramerate",
+            *self.metrics,
+        ]
+        mean_data = aggregate_benchmarks(df, numeric_columns)
 
         return {
             "raw_data": df,
@@ -232,81 +181,37 @@ class CapFrameParser(BaseParser):
 
     def calculate_stats(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Расчет статистики для данных CapFrameX"""
-        if df.empty:
-            return {}
-
-        return {
-            "avg_framerate": float(df["AverageFramerate"].mean())
-            if "AverageFramerate" in df.columns
-            else 0,
-            "min_framerate": float(df["MinFramerate"].min())
-            if "MinFramerate" in df.columns
-            else 0,
-            "max_framerate": float(df["MaxFramerate"].max())
-            if "MaxFramerate" in df.columns
-            else 0,
-            "total_frames": int(df["Frames"].sum()) if "Frames" in df.columns else 0,
-            "total_time": int(df["TimeTaken"].sum())
-            if "TimeTaken" in df.columns
-            else 0,
-        }
+        return benchmark_stats(df)
+
+    def write_sheets(
+        self, writer: ReportWriter, processed_data: Dict[str, Any], prefix: str = ""
+    ) -> None:
+        """Запись листов Benchmark и Benchmark_mean с форматированием дат"""
+        # Листы и формат дат аналогичны MSI Afterburner
+        sheets = (
+            (f"{prefix}Benchmark", processed_data["raw_data"]),
+            (f"{prefix}Benchmark_mean", processed_data["processed_data"]),
+        )
+        for sheet_name, df in sheets:
+            if not df.empty:
+                writer.write_frame(
+                    sheet_name, df, date_format=REPORT_DATE_FORMAT, date_align="left"
+                )
 
     def generate_reports(self, processed_data: Dict[str, Any]) -> Dict[str, bytes]:
         """Генерация отчетов XLSX и CSV для данных CapFrameX"""
-        df_raw = processed_data["raw_data"]
         df_processed = processed_data["processed_data"]
 
         # Создание XLSX отчета в памяти
-        excel_buffer = io.BytesIO()
-
         try:
-            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                # Запись данных на разные листы (аналогично MSI Afterburner)
-                if not df_raw.empty:
-                    df_raw.to_excel(writer, sheet_name="Benchmark", index=False)
-                if not df_processed.empty:
-                    df_processed.to_excel(
-                        writer, sheet_name="Benchmark_mean", index=False
-                    )
-
-                # Получение объектов workbook и worksheet
-                workbook = writer.book
-                worksheet = writer.sheets.get("Benchmark")
-                worksheet_mean = writer.sheets.get("Benchmark_mean")
-
-                # Форматирование дат (аналогично MSI Afterburner)
-                if worksheet and not df_raw.empty and "Date" in df_raw.columns:
-                    cell_format = workbook.add_format()
-                    cell_format.set_num_format("dd-mm-yyyy")
-                    cell_format.set_align("left")
-                    for row_num, date_value in enumerate(df_raw["Date"], start=2):
-                        worksheet.write(f"A{row_num}", date_value, cell_format)
-                    worksheet.autofit()
-                    worksheet.set_column("A:A", 12)
-
-                if (
-                    worksheet_mean
-                    and not df_processed.empty
-                    and "Date" in df_processed.columns
-                ):
-                    cell_format = workbook.add_format()
-                    cell_format.set_num_format("dd-mm-yyyy")
-                    cell_format.set_align("left")
-                    for row_num, date_value in enumerate(df_processed["Date"], start=2):
-                        worksheet_mean.write(f"A{row_num}", date_value, cell_format)
-                    worksheet_mean.autofit()
-                    worksheet_mean.set_column("A:A", 12)
+            with ReportWriter() as writer:
+                self.write_sheets(writer, processed_data)
 
         except Exception as e:
             # В случае ошибки при создании Excel, создаем пустой файл
-            excel_buffer = io.BytesIO()
-            with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-                pd.DataFrame().to_excel(writer, sheet_name="Benchmark", index=False)
-                pd.DataFrame().to_excel(
-                    writer, sheet_name="Benchmark_mean", index=False
-                )
-
-        excel_buffer.seek(0)
+            with ReportWriter() as writer:
+                writer.write_frame("Benchmark", pd.DataFrame())
+                writer.write_frame("Benchmark_mean", pd.DataFrame())
 
         # Создание CSV отчета
         csv_buffer = io.StringIO()
@@ -314,6 +219,6 @@ class CapFrameParser(BaseParser):
             df_processed.to_csv(csv_buffer, index=False, encoding="utf-8")
 
         return {
-            "xlsx_data": excel_buffer.getvalue(),
+            "xlsx_data": writer.getvalue(),
             "csv_data": csv_buffer.getvalue().encode("utf-8") if csv_buffer.getvalue() else b"",
         }
@@ -0,0 +1,288 @@
+"""
+Потоковое чтение CapFrameX JSON.
+Файл читается блоками без построения полного дерева объектов Python:
+для каждого прогона запоминаются только границы числовых каналов CaptureData,
+а сами каналы декодируются в float64 по требованию (см. CaptureColumns).
+Каналы из decode декодируются сразу из буфера чтения, без повторного чтения.
+"""
+
+import json
+import re
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from .capture_columns import CaptureColumns, parse_number_array
+from .source import as_buffer, open_source
+
+# Размер блока чтения файла
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = b" \t\r\n"
+_STRING_RE = re.compile(rb'"((?:[^"\\]|\\.)*)"', re.DOTALL)
+_STRUCTURE_RE = re.compile(rb'["\[\]{}]')
+
+
+class CapFrameReader:
+    """
+    Потоковый читатель CapFrameX JSON.
+
+    Обходит структуру {"Hash", "Info", "Runs": [{"CaptureData": {...}}]} и по одному
+    возвращает прогоны в виде CaptureColumns. Остальные ключи пропускаются
+    без декодирования. Info и Hash доступны после завершения обхода.
+    """
+
+    def __init__(
+        self,
+        source,
+        chunk_size: int = CHUNK_SIZE,
+        prefix: Optional[bytes] = None,
+        decode: Iterable[str] = (),
+    ):
+        # Путь к файлу или буфер в памяти (см. parsers.source)
+        self.source = as_buffer(source)
+        self.chunk_size = chunk_size
+        # Уже прочитанное начало файла; с него начинается буфер
+        self.prefix = prefix
+        # Каналы, которые декодируются при обходе файла
+        self.decode = frozenset(decode)
+        self.info: Dict[str, Any] = {}
+        self.hash: Optional[str] = None
+        self._file = None
+        self._buf = b""
+        self._pos = 0
+        # Смещение начала буфера от начала файла
+        self._base = 0
+        self._keep_from: Optional[int] = None
+        self._eof = False
+
+    def iter_runs(self) -> Iterator[CaptureColumns]:
+        """Итерация по прогонам файла"""
+        with open_source(self.source) as f:
+            self._file = f
+            self._buf = b""
+            if self.prefix:
+                self._buf = bytes(self.prefix)
+                f.seek(len(self._buf))
+            self._pos = 0
+            self._base = 0
+            self._eof = False
+            try:
+                yield from self._read_root()
+            finally:
+                self._file = None
+                self._buf = b""
+
+    # --- Обход структуры CapFrameX ---
+
+    def _read_root(self) -> Iterator[CaptureColumns]:
+        self._skip_bom()
+        for key in self._iter_object_keys():
+            if key == "Runs" and self._peek() == b"[":
+                for _ in self._iter_array_items():
+                    if self._peek() == b"{":
+                        yield self._read_run()
+                    else:
+                        self._skip_value()
+            elif key == "Info":
+                info = self._read_value()
+                self.info = info if isinstance(info, dict) else {}
+            elif key == "Hash":
+                self.hash = self._read_value()
+            else:
+                self._skip_value()
+
+    def _read_run(self) -> CaptureColumns:
+        spans: Dict[str, Tuple[int, int]] = {}
+        values: Dict[str, np.ndarray] = {}
+        for key in self._iter_object_keys():
+            if key == "CaptureData" and self._peek() == b"{":
+                for channel in self._iter_object_keys():
+                    if self._peek() != b"[":
+                        self._skip_value()
+                        continue
+                    span, body = self._scan_flat_array(keep=channel in self.decode)
+                    if span is None:
+                        continue
+                    if body is None:
+                        spans[channel] = span
+                        continue
+                    array = parse_number_array(body)
+                    # Нечисловой канал не предлагается, как и в CaptureColumns.load
+                    if array is not None:
+                        spans[channel] = span
+                        values[channel] = array
+            else:
+                self._skip_value()
+        return CaptureColumns(self.source, spans, values)
+
+    # --- Примитивы JSON ---
+
+    def _iter_object_keys(self) -> Iterator[str]:
+        """Итерация по ключам объекта; после каждого ключа курсор стоит на значении"""
+        self._expect(b"{")
+        if self._peek() == b"}":
+            self._pos += 1
+            return
+        while True:
+            key = self._read_string()
+            self._expect(b":")
+            self._peek()
+            yield key
+            separator = self._next_char()
+            if separator == b"}":
+                return
+            if separator != b",":
+                raise ValueError("Некорректный JSON формат: ожидалась ',' или '}'")
+
+    def _iter_array_items(self) -> Iterator[None]:
+        """Итерация по элементам массива; курсор стоит на очередном элементе"""
+        self._expect(b"[")
+        if self._peek() == b"]":
+            self._pos += 1
+            return
+        while True:
+            yield None
+            separator = self._next_char()
+            if separator == b"]":
+                return
+            if separator != b",":
+                raise ValueError("Некорректный JSON формат: ожидалась ',' или ']'")
+
+    def _read_string(self) -> str:
+        self._peek()
+        while True:
+            match = _STRING_RE.match(self._buf, self._pos)
+            if match or self._eof:
+                break
+            self._fill()
+        if not match:
+            raise ValueError("Некорректный JSON формат: ожидалась строка")
+        self._pos = match.end()
+        return json.loads(match.group(0))
+
+    def _scan_flat_array(
+        self, keep: bool = False
+    ) -> Tuple[Optional[Tuple[int, int]], Optional[bytes]]:
+        """
+        Пропускает массив и возвращает границы его тела в файле, если массив плоский.
+        Вложенные массивы, объекты и строки пропускаются, для них границы - None.
+        keep - вернуть и тело массива, собранное из прочитанных блоков
+        (из файла оно повторно не читается); иначе вместо тела возвращается None.
+        """
+        self._expect(b"[")
+        start = self._base + self._pos
+        parts = []
+        while True:
+            match = _STRUCTURE_RE.search(self._buf, self._pos)
+            if match:
+                break
+            if self._eof:
+                raise ValueError("Некорректный JSON формат: неожиданный конец файла")
+            if keep:
+                parts.append(self._buf[self._pos :])
+            self._pos = len(self._buf)
+            self._fill()
+
+        if match.group(0) == b"]":
+            body = None
+            if keep:
+                parts.append(self._buf[self._pos : match.start()])
+                body = b"".join(parts)
+            self._pos = match.end()
+            return (start, self._base + match.start()), body
+
+        # Не плоский массив - такой канал не нужен
+        self._pos = match.start()
+        self._skip_nested(depth=1)
+        return None, None
+
+    def _read_value(self) -> Any:
+        """Декодирует небольшое значение целиком (Info, Hash)"""
+        self._peek()
+        self._keep_from = self._pos
+        try:
+            self._skip_value()
+            return json.loads(self._buf[self._keep_from : self._pos])
+        finally:
+            self._keep_from = None
+
+    def _skip_value(self) -> None:
+        """Пропускает значение без декодирования"""
+        char = self._peek()
+        if char == b'"':
+            self._read_string()
+            return
+        if char not in (b"{", b"["):
+            # Скаляр: число, true, false, null
+            while True:
+                end = self._pos
+                while end < len(self._buf) and self._buf[end : end + 1] not in b",]}" + _WHITESPACE:
+                    end += 1
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return
+                self._fill()
+
+        self._skip_nested(depth=0)
+
+    def _skip_nested(self, depth: int) -> None:
+        """Пропускает вложенную структуру, пока глубина вложенности не станет нулевой"""
+        while True:
+            match = _STRUCTURE_RE.search(self._buf, self._pos)
+            if not match:
+                if self._eof:
+                    raise ValueError("Некорректный JSON формат: неожиданный конец файла")
+                self._pos = len(self._buf)
+                self._fill()
+                continue
+            token = match.group(0)
+            if token == b'"':
+                self._pos = match.start()
+                self._read_string()
+                continue
+            self._pos = match.end()
+            depth += 1 if token in (b"{", b"[") else -1
+            if depth == 0:
+                return
+
+    # --- Буфер ---
+
+    def _fill(self) -> None:
+        """Дочитывает следующий блок файла, отбрасывая уже обработанную часть"""
+        chunk = self._file.read(self.chunk_size)
+        if not chunk:
+            self._eof = True
+        cut = self._pos if self._keep_from is None else self._keep_from
+        self._buf = self._buf[cut:] + chunk
+        self._base += cut
+        self._pos -= cut
+        if self._keep_from is not None:
+            self._keep_from = 0
+
+    def _peek(self) -> bytes:
+        """Пропускает пробелы и возвращает текущий символ, не сдвигая курсор"""
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos : self._pos + 1]
+            if self._eof:
+                return b""
+            self._fill()
+
+    def _next_char(self) -> bytes:
+        char = self._peek()
+        self._pos += 1
+        return char
+
+    def _expect(self, char: bytes) -> None:
+        if self._next_char() != char:
+            raise ValueError(
+                f"Некорректный JSON формат: ожидался символ '{char.decode()}'"
+            )
+
+    def _skip_bom(self) -> None:
+        self._peek()
+        if self._buf.startswith(b"\xef\xbb\xbf", self._pos):
+            self._pos += 3
@@ -0,0 +1,123 @@
+"""
+Колоночное хранилище каналов CaptureData одного прогона CapFrameX.
+Читатель запоминает только байтовые границы каждого числового канала,
+а декодирование в float64 происходит при первом обращении к каналу.
+Каналы, которые точно понадобятся, читатель может декодировать сразу
+при обходе файла (см. CapFrameReader), чтобы не читать их байты повторно.
+"""
+
+import warnings
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .source import open_source, read_range
+
+# Последние байты канала, которых достаточно для чтения последнего значения
+_TAIL_SIZE = 64
+
+
+def parse_number_array(body: bytes) -> Optional[np.ndarray]:
+    """
+    Декодирует тело JSON-массива чисел (без скобок) в float64.
+    true/false превращаются в 1/0, null - в NaN. Возвращает None для нечисловых данных.
+    """
+    if b"t" in body or b"f" in body or b"n" in body:
+        body = body.replace(b"true", b"1").replace(b"false", b"0").replace(b"null", b"nan")
+
+    text = body.decode("ascii", errors="replace")
+    if not text.strip():
+        return np.empty(0, dtype=np.float64)
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            values = np.fromstring(text, dtype=np.float64, sep=",")
+    except (ValueError, DeprecationWarning):
+        return None
+    if values.size != text.count(",") + 1:
+        return None
+    return values
+
+
+class CaptureColumns:
+    """
+    Каналы CaptureData одного прогона (TimeInSeconds, MsBetweenPresents, MsUntilDisplayed,
+    GPU/CPU busy, Dropped и т.д.). Каждый канал декодируется лениво и кешируется.
+    Объект легко передается в другой процесс: пересылаются только границы каналов
+    (для файлов на диске; прогоны из памяти считаются в текущем процессе).
+    """
+
+    def __init__(
+        self,
+        source,
+        spans: Dict[str, Tuple[int, int]],
+        values: Optional[Dict[str, np.ndarray]] = None,
+    ):
+        # Путь к файлу или буфер в памяти (см. parsers.source)
+        self.source = source
+        # Канал -> (начало, конец) тела массива в байтах файла
+        self.spans = spans
+        # Каналы, уже декодированные при чтении файла
+        self._cache: Dict[str, np.ndarray] = dict(values or {})
+
+    @property
+    def channels(self) -> List[str]:
+        """Числовые каналы, доступные в прогоне"""
+        return list(self.spans)
+
+    @property
+    def nbytes(self) -> int:
+        """Суммарный размер текстового представления каналов"""
+        return sum(end - start for start, end in self.spans.values())
+
+    def __contains__(self, channel: str) -> bool:
+        return channel in self.spans
+
+    def get(self, channel: str) -> Optional[np.ndarray]:
+        """Возвращает канал в виде массива float64 или None, если канала нет"""
+        if channel not in self.spans:
+            return None
+        if channel not in self._cache:
+            self.load([channel])
+        return self._cache.get(channel)
+
+    def load(self, channels: Iterable[str]) -> None:
+        """Декодирует несколько каналов за одно открытие файла"""
+        wanted = sorted(
+            (self.spans[channel], channel)
+            for channel in set(channels)
+            if channel in self.spans and channel not in self._cache
+        )
+        if not wanted:
+            return
+
+        with open_source(self.source) as f:
+            for (start, end), channel in wanted:
+                f.seek(start)
+                values = parse_number_array(f.read(end - start))
+                if values is None:
+                    # Канал оказался нечисловым - больше не предлагаем его
+                    del self.spans[channel]
+                else:
+                    self._cache[channel] = values
+
+    def last(self, channel: str) -> Optional[float]:
+        """Последнее значение канала без декодирования всего массива"""
+        if channel in self._cache:
+            values = self._cache[channel]
+            return float(values[-1]) if values.size else None
+        if channel not in self.spans:
+            return None
+
+        start, end = self.spans[channel]
+        tail = read_range(self.source, max(start, end - _TAIL_SIZE), end)
+        values = parse_number_array(tail.rsplit(b",", 1)[-1])
+        return float(values[-1]) if values is not None and values.size else None
+
+    def release(self) -> None:
+        """Освобождает декодированные каналы"""
+        self._cache.clear()
+
+    def __getstate__(self):
+        # В другой процесс передаются только границы каналов
+        return {"source": self.source, "spans": self.spans, "_cache": {}}
@@ -0,0 +1,18 @@
+"""
+Колонки канонической схемы benchmark данных (см. parsers.aggregation).
+Модуль не зависит от pandas и numpy: его можно импортировать при запуске бота.
+"""
+
+# Ключи группировки
+GROUP_COLUMNS = ["Date", "Time", "Application"]
+
+# Числовые колонки, которые усредняются по группам
+BENCHMARK_COLUMNS = [
+    "Frames",
+    "TimeTaken",
+    "AverageFramerate",
+    "MinFramerate",
+    "MaxFramerate",
+    "Low1Percent",
+    "Low01Percent",
+]
@@ -0,0 +1,71 @@
+"""
+Объединенный отчет для пакета файлов разных форматов.
+Каждый формат записывает в общую книгу свой набор листов (BaseParser.write_sheets)
+с названием формата в начале, лист Summary сравнивает форматы между собой.
+"""
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from .xlsx_report import ReportWriter
+
+# Наибольшая длина названия формата в названиях листов
+# (Excel ограничивает название листа 31 символом)
+SHEET_PREFIX_MAX = 15
+
+SUMMARY_SHEET = "Summary"
+
+
+def sheet_prefix(parser_type: str) -> str:
+    """Префикс названий листов формата"""
+    return f"{parser_type[:SHEET_PREFIX_MAX]} "
+
+
+def summary_frame(groups: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Сводная таблица: формат, число файлов и записей и статистика каждого формата"""
+    rows = []
+    for group in groups:
+        processed_data = group["processed_data"]
+        rows.append(
+            {
+                "Format": group["parser_type"],
+                "Files": group["files_count"],
+                "Records": len(processed_data["raw_data"]),
+                "Processed": len(processed_data["processed_data"]),
+                **processed_data["stats"],
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def generate_combined_reports(
+    groups: List[Dict[str, Any]], parsers: Dict[str, Any]
+) -> Dict[str, bytes]:
+    """
+    Генерация общей книги XLSX и общего CSV.
+    groups - {"parser_type", "files_count", "processed_data"} в порядке загрузки,
+    parsers - парсеры форматов по типу. В CSV обработанные данные всех форматов
+    объединяются с колонкой Format.
+    """
+    with ReportWriter() as writer:
+        writer.write_frame(SUMMARY_SHEET, summary_frame(groups))
+
+        for group in groups:
+            parser_type = group["parser_type"]
+            parsers[parser_type].write_sheets(
+                writer, group["processed_data"], prefix=sheet_prefix(parser_type)
+            )
+
+    frames = [
+        group["processed_data"]["processed_data"].assign(Format=group["parser_type"])
+        for group in groups
+        if not group["processed_data"]["processed_data"].empty
+    ]
+    csv_data = b""
+    if frames:
+        combined = pd.concat(frames, ignore_index=True)
+        combined = combined[["Format", *combined.columns.drop("Format")]]
+        csv_data = combined.to_csv(index=False).encode("utf-8")
+
+    return {"xlsx_data": writer.getvalue(), "csv_data": csv_data}
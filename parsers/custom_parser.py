@@ -1,43 +1,162 @@
 import pandas as pd
+from .aggregation import aggregate_benchmarks, benchmark_stats
+from .canonical import concat_frames
 from .base_parser import BaseParser
-from typing import List, Dict, Any
+from .dialect import (
+    CSV,
+    JSON_LINES,
+    SNIFF_BYTES,
+    describe_dialect,
+    sniff_dialect,
+)
+from .schema import apply_mapping, missing_required, resolve_mapping
+from .source import as_buffer, open_source, read_range, source_size
+from .streaming import ColumnStats, downcast_frame
+from .xlsx_report import ReportWriter
+from typing import List, Dict, Any, Iterator, Optional
 import io
 
+# Размер порции чтения в строках
+CHUNK_ROWS = 200_000
+
+# Сколько строк сохраняется для отчета (ограничение листа XLSX без строки заголовка)
+REPORT_MAX_ROWS = 1_048_575
+
 
 class CustomParser(BaseParser):
     """Универсальный парсер для пользовательских форматов benchmark файлов"""
 
-    def parse_file(self, file_path: str) -> pd.DataFrame:
+    # Сигнатур нет: парсер выбирается, если формат не определен (FALLBACK_PARSER)
+    DESCRIPTION = "Универсальный парсер для пользовательских форматов benchmark файлов"
+    FORMATS = [".csv", ".tsv", ".json", ".txt"]
+
+    def __init__(self, metrics=None, schema=None, workers=None):
+        super().__init__(metrics, schema, workers)
+        # Диалект последнего разобранного файла (см. parsers.dialect)
+        self.dialect: Optional[Dict[str, Any]] = None
+        # Статистика колонок, накопленная при чтении файла
+        self.column_stats: Optional[ColumnStats] = None
+        self._parsed_frame: Optional[pd.DataFrame] = None
+        # Все строки файла в канонической схеме (порциями с пониженными типами),
+        # если в отчет попали не все строки; по ним считаются средние
+        self._canonical_chunks: Optional[List[pd.DataFrame]] = None
+        self._canonical_mapping: Optional[Dict[str, str]] = None
+        # Схема колонок, примененная при последней обработке
+        self.mapping: Optional[Dict[str, str]] = None
+
+    def parse_file(self, source, prefix: Optional[bytes] = None) -> pd.DataFrame:
         """
-        Парсинг файла. В универсальном парсере мы пытаемся определить формат автоматически.
+        Парсинг файла. Диалект (CSV/TSV/;/JSON/JSON Lines, заголовок, десятичный
+        разделитель) определяется один раз по началу файла, после чего файл
+        читается ровно один раз подходящим способом.
+
+        CSV и JSON Lines читаются порциями по CHUNK_ROWS строк: статистика колонок
+        накапливается за один проход, а в памяти остаются только первые
+        REPORT_MAX_ROWS строк с пониженными типами (больше не помещается на лист XLSX).
+        Если колонки сопоставляются канонической схеме, все строки файла
+        сохраняются еще и в канонической схеме (только ее колонки, пониженные типы),
+        чтобы средние учитывали и прогоны, не попавшие в отчет.
         """
-        # Попробуем разные форматы
+        source = as_buffer(source)
+        if prefix is None:
+            prefix = read_range(source, 0, SNIFF_BYTES)
+        # prefix может быть прочитан при определении формата; файл уместился
+        # в него целиком, если prefix не короче файла
+        complete = SNIFF_BYTES >= len(prefix) >= source_size(source)
+        self.dialect = sniff_dialect(prefix[:SNIFF_BYTES], complete=complete)
+        self.column_stats = ColumnStats()
+        self._canonical_chunks = None
+        self._canonical_mapping = None
+
+        kept = []
+        kept_rows = 0
         try:
-            # CSV формат
-            df = pd.read_csv(file_path, encoding="utf-8")
-            return df
-        except:
-            pass
-
-        try:
-            # TSV формат
-            df = pd.read_csv(file_path, encoding="utf-8", sep="\t")
-            return df
-        except:
-            pass
-
-        try:
-            # JSON формат
-            df = pd.read_json(file_path)
-            return df
-        except:
-            pass
-
-        # Если не удалось определить формат, возвращаем пустой DataFrame
-        return pd.DataFrame()
+            for chunk in self._iter_chunks(source, self.dialect):
+                self.column_stats.update(chunk)
+                if self._canonical_chunks is not None:
+                    self._keep_canonical(chunk)
+                if kept_rows >= REPORT_MAX_ROWS:
+                    continue
+                if kept_rows + len(chunk) > REPORT_MAX_ROWS:
+                    # Файл не помещается в отчет: для средних сохраняются все строки
+                    self._start_canonical([*kept, chunk])
+                    chunk = chunk.iloc[: REPORT_MAX_ROWS - kept_rows].copy()
+                kept.append(downcast_frame(chunk))
+                kept_rows += len(chunk)
+        except Exception:
+            # Если файл не читается в определенном диалекте, возвращаем пустой DataFrame
+            self.column_stats = None
+            self._canonical_chunks = None
+            return pd.DataFrame()
+
+        if not kept:
+            df = pd.DataFrame()
+        elif len(kept) == 1:
+            df = kept[0]
+        else:
+            # Категории разных порций различаются, поэтому после склейки типы понижаются снова
+            df = downcast_frame(pd.concat(kept, ignore_index=True))
+        self._parsed_frame = df
+        return df
+
+    def _start_canonical(self, chunks: List[pd.DataFrame]) -> None:
+        """Строки сохраняются в канонической схеме, если колонки ей сопоставляются"""
+        mapping = resolve_mapping(list(chunks[0].columns), self.schema)
+        if missing_required(mapping):
+            return
+        self._canonical_chunks = []
+        self._canonical_mapping = mapping
+        for chunk in chunks:
+            self._keep_canonical(chunk)
+
+    def _keep_canonical(self, chunk: pd.DataFrame) -> None:
+        canonical = apply_mapping(chunk, self._canonical_mapping)
+        self._canonical_chunks.append(downcast_frame(canonical))
+
+    @property
+    def dialect_description(self) -> Optional[str]:
+        """Описание диалекта последнего разобранного файла"""
+        return describe_dialect(self.dialect) if self.dialect else None
+
+    @staticmethod
+    def _iter_chunks(
+        source, dialect: Dict[str, Any], chunk_rows: int = CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """Чтение файла порциями в заданном диалекте (JSON-массив читается целиком)"""
+        with open_source(source) as f:
+            if dialect["format"] == JSON_LINES:
+                with pd.read_json(
+                    f, lines=True, encoding="utf-8", chunksize=chunk_rows
+                ) as reader:
+                    yield from reader
+                return
+            if dialect["format"] != CSV:
+                yield pd.read_json(f, encoding="utf-8")
+                return
+
+            yield from CustomParser._iter_csv_chunks(f, dialect, chunk_rows)
+
+    @staticmethod
+    def _iter_csv_chunks(
+        f, dialect: Dict[str, Any], chunk_rows: int
+    ) -> Iterator[pd.DataFrame]:
+        with pd.read_csv(
+            f,
+            encoding="utf-8-sig",
+            sep=dialect["sep"],
+            decimal=dialect["decimal"],
+            header=0 if dialect["header"] else None,
+            chunksize=chunk_rows,
+        ) as reader:
+            for chunk in reader:
+                if not dialect["header"]:
+                    chunk.columns = [
+                        f"Column{index + 1}" for index in range(len(chunk.columns))
+                    ]
+                yield chunk
 
     def get_supported_formats(self) -> List[str]:
-        return [".csv", ".tsv", ".json", ".txt"]
+        return list(self.FORMATS)
 
     def can_parse(self, file_content: str) -> bool:
         """
@@ -50,46 +169,74 @@ class CustomParser(BaseParser):
         if df.empty:
             return {"raw_data": df, "processed_data": df, "stats": {}}
 
+        # Если колонки сопоставляются канонической схеме, файл обрабатывается
+        # так же, как журналы MSI Afterburner
+        mapping = resolve_mapping(list(df.columns), self.schema)
+        if not missing_required(mapping):
+            canonical = apply_mapping(df, mapping)
+            if not canonical.empty:
+                self.mapping = mapping
+                if (
+                    self._canonical_chunks is not None
+                    and df is self._parsed_frame
+                    and mapping == self._canonical_mapping
+                ):
+                    # Усредняются все строки файла, а не только попавшие в отчет
+                    mean_data = aggregate_benchmarks(
+                        concat_frames(self._canonical_chunks)
+                    )
+                else:
+                    mean_data = aggregate_benchmarks(canonical)
+                return {
+                    "raw_data": canonical,
+                    "processed_data": mean_data,
+                    "stats": benchmark_stats(mean_data),
+                }
+
         # Простая обработка - возвращаем как есть
+        self.mapping = None
         return {"raw_data": df, "processed_data": df, "stats": self.calculate_stats(df)}
 
     def calculate_stats(self, df: pd.DataFrame) -> Dict[str, Any]:
-        """Расчет базовой статистики"""
+        """
+        Расчет базовой статистики за один проход по колонкам.
+        Для только что разобранного файла берется статистика, накопленная при чтении,
+        она учитывает и строки, не попавшие в отчет.
+        """
         if df.empty:
             return {}
 
-        numeric_columns = df.select_dtypes(include=["number"]).columns.tolist()
+        if self.column_stats is not None and df is self._parsed_frame:
+            return self.column_stats.result()
 
-        stats = {
-            "total_records": len(df),
-        }
+        stats = ColumnStats()
+        stats.update(df)
+        return stats.result()
 
-        for col in numeric_columns:
-            stats[f"{col}_avg"] = df[col].mean()
-            stats[f"{col}_min"] = df[col].min()
-            stats[f"{col}_max"] = df[col].max()
+    def write_sheets(
+        self, writer: ReportWriter, processed_data: Dict[str, Any], prefix: str = ""
+    ) -> None:
+        """Запись листов отчета (пустые листы пропускаются)"""
+        df_raw = processed_data["raw_data"]
+        df_processed = processed_data["processed_data"]
 
-        return stats
+        if not df_raw.empty:
+            writer.write_frame(f"{prefix}Raw Data", df_raw)
+        if not df_processed.empty:
+            writer.write_frame(f"{prefix}Processed Data", df_processed)
+
+        # Добавляем лист со статистикой
+        stats_df = pd.DataFrame([processed_data["stats"]])
+        if not stats_df.empty:
+            writer.write_frame(f"{prefix}Statistics", stats_df)
 
     def generate_reports(self, processed_data: Dict[str, Any]) -> Dict[str, bytes]:
         """Генерация отчетов (XLSX и CSV)"""
-        df_raw = processed_data["raw_data"]
         df_processed = processed_data["processed_data"]
 
         # XLSX отчет
-        excel_buffer = io.BytesIO()
-        with pd.ExcelWriter(excel_buffer, engine="xlsxwriter") as writer:
-            if not df_raw.empty:
-                df_raw.to_excel(writer, sheet_name="Raw Data", index=False)
-            if not df_processed.empty:
-                df_processed.to_excel(writer, sheet_name="Processed Data", index=False)
-
-            # Добавляем лист со статистикой
-            stats_df = pd.DataFrame([processed_data["stats"]])
-            if not stats_df.empty:
-                stats_df.to_excel(writer, sheet_name="Statistics", index=False)
-
-        excel_buffer.seek(0)
+        with ReportWriter() as writer:
+            self.write_sheets(writer, processed_data)
 
         # CSV отчет
         csv_buffer = io.StringIO()
@@ -97,7 +244,7 @@ class CustomParser(BaseParser):
             df_processed.to_csv(csv_buffer, index=False, encoding="utf-8")
 
         return {
-            "xlsx_data": excel_buffer.getvalue(),
+            "xlsx_data": writer.getvalue(),
             "csv_data": csv_buffer.getvalue().encode("utf-8")
             if csv_buffer.getvalue()
             else b"",
@@ -0,0 +1,124 @@
+"""
+Определение диалекта пользовательских файлов по ограниченному началу файла:
+CSV с разделителем (запятая, табуляция, точка с запятой, вертикальная черта),
+JSON или JSON Lines, наличие строки заголовка и десятичный разделитель.
+"""
+
+import json
+import re
+from typing import Any, Dict, List
+
+# Сколько байт из начала файла используется для определения диалекта
+SNIFF_BYTES = 64 * 1024
+
+# Сколько строк начала файла анализируется
+SNIFF_LINES = 50
+
+# Форматы
+CSV = "csv"
+JSON = "json"
+JSON_LINES = "jsonl"
+
+# Кандидаты в разделители полей в порядке предпочтения при равенстве
+DELIMITERS = ("\t", ";", "|", ",")
+
+_DELIMITER_NAMES = {"\t": "TAB", ";": ";", "|": "|", ",": ","}
+_NUMBER_RE = re.compile(r"^[-+]?(\d+([.,]\d*)?|[.,]\d+)([eE][-+]?\d+)?$")
+_COMMA_DECIMAL_RE = re.compile(r"^[-+]?\d*,\d+$")
+
+
+def sniff_dialect(prefix: bytes, complete: bool = False) -> Dict[str, Any]:
+    """
+    Определяет диалект по началу файла.
+    complete - prefix содержит файл целиком (последняя строка не обрезана).
+
+    Возвращает словарь {"format", "sep", "header", "decimal"}.
+    """
+    text = prefix.decode("utf-8", errors="replace").lstrip("\ufeff")
+    if not complete and "\n" in text:
+        # Последняя строка могла оборваться на границе prefix
+        text = text[: text.rindex("\n")]
+    lines = [line.rstrip("\r") for line in text.split("\n") if line.strip()][:SNIFF_LINES]
+
+    dialect = {"format": CSV, "sep": ",", "header": True, "decimal": "."}
+    if not lines:
+        return dialect
+
+    if lines[0].lstrip().startswith(("{", "[")):
+        dialect["format"] = JSON_LINES if _is_json_lines(lines) else JSON
+        return dialect
+
+    dialect["sep"] = _sniff_delimiter(lines)
+    rows = [line.split(dialect["sep"]) for line in lines]
+    dialect["decimal"] = _sniff_decimal(rows[1:] or rows, dialect["sep"])
+    dialect["header"] = _has_header(rows)
+    return dialect
+
+
+def describe_dialect(dialect: Dict[str, Any]) -> str:
+    """Краткое описание диалекта для пользователя"""
+    if dialect["format"] == JSON:
+        return "JSON"
+    if dialect["format"] == JSON_LINES:
+        return "JSON Lines"
+    parts = [f"CSV (разделитель {_DELIMITER_NAMES.get(dialect['sep'], dialect['sep'])})"]
+    parts.append("с заголовком" if dialect["header"] else "без заголовка")
+    parts.append(f"десятичный разделитель '{dialect['decimal']}'")
+    return ", ".join(parts)
+
+
+def _is_json_lines(lines: List[str]) -> bool:
+    """JSON Lines: каждая строка - отдельный JSON объект"""
+    if len(lines) < 2:
+        return False
+    for line in lines:
+        try:
+            if not isinstance(json.loads(line), dict):
+                return False
+        except ValueError:
+            return False
+    return True
+
+
+def _sniff_delimiter(lines: List[str]) -> str:
+    """
+    Первый по порядку предпочтения разделитель, который встречается почти
+    в каждой строке одинаковое число раз. Запятая проверяется последней,
+    так как в файлах с ";" она обычно служит десятичным разделителем.
+    """
+    for delimiter in DELIMITERS:
+        counts = [line.count(delimiter) for line in lines]
+        fields = max(set(counts), key=counts.count)
+        if fields and counts.count(fields) >= 0.9 * len(counts):
+            return delimiter
+    return ","
+
+
+def _sniff_decimal(rows: List[List[str]], sep: str) -> str:
+    """Десятичная запятая возможна, только если поля разделяются не запятой"""
+    if sep == ",":
+        return "."
+    values = [field.strip() for row in rows for field in row]
+    comma = sum(1 for value in values if _COMMA_DECIMAL_RE.match(value))
+    dot = sum(1 for value in values if "." in value and _NUMBER_RE.match(value))
+    return "," if comma > dot else "."
+
+
+def _has_header(rows: List[List[str]]) -> bool:
+    """
+    Первая строка считается заголовком, если в ней есть нечисловое поле
+    в колонке, которая в остальных строках числовая, или если чисел нет вовсе.
+    """
+    first, rest = rows[0], rows[1:]
+    if not rest:
+        return not any(_NUMBER_RE.match(field.strip()) for field in first)
+
+    has_numbers = False
+    for column, field in enumerate(first):
+        values = [row[column].strip() for row in rest if column < len(row)]
+        numeric = values and all(_NUMBER_RE.match(value) for value in values if value)
+        if numeric:
+            has_numbers = True
+            if not _NUMBER_RE.match(field.strip()):
+                return True
+    return not has_numbers
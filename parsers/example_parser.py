@@ -1,13 +1,34 @@
 # Пример добавления нового парсера
+#
+# 1. Реализуйте парсер в отдельном модуле (как ниже) и объявите в классе
+#    описание, расширения и сигнатуры формата (DESCRIPTION, FORMATS, SIGNATURES).
+# 2. Зарегистрируйте его, например в parsers/__init__.py:
+#
+#     register_parser("newtool", "parsers.example_parser", "NewToolParser")
+#
+# Реестр читает объявления из исходного кода класса, а модуль импортируется
+# только если парсер выбран; ошибка импорта превращается в ValueError
+# с понятным сообщением, а не роняет бота.
+# Этот шаблон не зарегистрирован и ничего не разбирает.
 import pandas as pd
 from .base_parser import BaseParser
+from typing import List, Optional
 
 
 class NewToolParser(BaseParser):
-    def parse_file(self, file_path: str) -> pd.DataFrame:
-        # ваша логика парсинга
-        pass
+    """Шаблон парсера нового формата"""
+
+    DESCRIPTION = "Парсер для файлов NewTool"
+    FORMATS = [".log"]
+    SIGNATURES = [(r"(?m)^NewTool benchmark v\d+", 0.6), (r"avg fps:", 0.4)]
+
+    def parse_file(self, source, prefix: Optional[bytes] = None) -> pd.DataFrame:
+        # ваша логика парсинга; source открывается через parsers.source.open_source
+        return pd.DataFrame()
+
+    def get_supported_formats(self) -> List[str]:
+        return list(self.FORMATS)
 
     def can_parse(self, file_content: str) -> bool:
-        # проверка формата
-        pass
\ No newline at end of file
+        # проверка формата; определение формата в боте использует сигнатуры из реестра
+        return False
@@ -0,0 +1,189 @@
+"""
+Векторизованный расчет метрик по времени кадров.
+Все вычисления выполняются над непрерывными массивами float64 без циклов Python.
+"""
+
+import numpy as np
+from typing import Dict, Iterable, Mapping, Optional
+
+from .capture_columns import CaptureColumns
+from .percentiles import MetricSpec, compute_metrics, resolve_metrics
+
+# Кадр считается фризом, если он дольше STUTTER_FACTOR скользящих медиан
+# по окну из STUTTER_WINDOW соседних кадров (нечетное: кадр в центре окна)
+STUTTER_FACTOR = 2.0
+STUTTER_WINDOW = 33
+
+# Размер блока кадров с общей нижней границей медиан окон и сколько
+# кадров проверяется на фризы за раз
+STUTTER_BLOCK = 32
+STUTTER_CHUNK_FRAMES = 1 << 12
+
+# Каналы, которые run_stats читает целиком (TimeInSeconds - только если
+# MsBetweenPresents нет, иначе берется его последнее значение)
+RUN_CHANNELS = ("MsBetweenPresents",)
+
+
+def to_float_array(values: Iterable[float]) -> np.ndarray:
+    """Преобразует последовательность значений в непрерывный массив float64"""
+    return np.ascontiguousarray(np.asarray(values, dtype=np.float64))
+
+
+def fps_from_timestamps(time_in_seconds: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет FPS каждого кадра по отметкам времени.
+    Нулевые и отрицательные интервалы отбрасываются.
+    """
+    deltas = np.diff(time_in_seconds)
+    deltas = deltas[deltas > 0]
+    return np.reciprocal(deltas)
+
+
+def fps_from_frametimes(ms_between_presents: np.ndarray) -> np.ndarray:
+    """
+    Вычисляет FPS каждого кадра по времени между кадрами в миллисекундах.
+    Нулевые, отрицательные и пропущенные (NaN) интервалы отбрасываются.
+    """
+    frametimes = ms_between_presents[ms_between_presents > 0]
+    return np.divide(1000.0, frametimes)
+
+
+def fps_stats(
+    fps_values: np.ndarray, metrics: Optional[Mapping[str, MetricSpec]] = None
+) -> Optional[Dict[str, float]]:
+    """Расчет avg/min/max FPS и набора перцентильных метрик по массиву FPS"""
+    if fps_values.size == 0:
+        return None
+
+    return {
+        "AverageFramerate": float(fps_values.mean()),
+        "MinFramerate": float(fps_values.min()),
+        "MaxFramerate": float(fps_values.max()),
+        # Массив FPS больше не нужен, поэтому выбор идет на месте
+        **compute_metrics(fps_values, resolve_metrics(metrics), overwrite_input=True),
+    }
+
+
+def frametime_stats(
+    time_in_seconds: np.ndarray, metrics: Optional[Mapping[str, MetricSpec]] = None
+) -> Optional[Dict[str, float]]:
+    """
+    Расчет avg/min/max FPS и набора перцентильных метрик по отметкам времени.
+    Возвращает None, если кадров недостаточно для расчета.
+    """
+    if time_in_seconds.size < 2:
+        return None
+    return fps_stats(fps_from_timestamps(time_in_seconds), metrics)
+
+
+def frametimes_from_timestamps(time_in_seconds: np.ndarray) -> np.ndarray:
+    """Время между кадрами в миллисекундах по отметкам времени (только положительные)"""
+    deltas = np.diff(time_in_seconds)
+    return deltas[deltas > 0] * 1000.0
+
+
+def stutter_mask(frametimes: np.ndarray) -> np.ndarray:
+    """
+    Маска фризов: кадр дольше STUTTER_FACTOR скользящих медиан по окну из
+    STUTTER_WINDOW кадров с центром в этом кадре (у краев массива берется
+    ближайшее полное окно).
+
+    Медиана окна меньше порога, когда меньше порога больше половины значений
+    окна, поэтому окна не сортируются. Сначала для каждого блока из
+    STUTTER_BLOCK кадров считается нижняя граница медиан его окон - значение
+    того же ранга в отрезке, покрывающем все эти окна (np.partition по матрице
+    отрезков). Точная проверка по окну (sliding_window_view без копирования)
+    выполняется только для кадров дольше STUTTER_FACTOR таких границ.
+    """
+    count = frametimes.size
+    thresholds = frametimes / STUTTER_FACTOR
+    if count <= STUTTER_WINDOW:
+        return np.median(frametimes) < thresholds
+
+    half = STUTTER_WINDOW // 2
+    candidates = np.arange(count)
+    span = STUTTER_BLOCK + STUTTER_WINDOW - 1
+    if count >= span:
+        spans = np.lib.stride_tricks.sliding_window_view(frametimes, span)
+        span_starts = np.clip(
+            np.arange(0, count, STUTTER_BLOCK) - half, 0, count - span
+        )
+        lower = np.partition(spans[span_starts], half, axis=1)[:, half]
+        candidates = np.flatnonzero(
+            thresholds > np.repeat(lower, STUTTER_BLOCK)[:count]
+        )
+
+    windows = np.lib.stride_tricks.sliding_window_view(frametimes, STUTTER_WINDOW)
+    starts = np.clip(candidates - half, 0, count - STUTTER_WINDOW)
+    mask = np.zeros(count, dtype=bool)
+    for start in range(0, candidates.size, STUTTER_CHUNK_FRAMES):
+        chunk = slice(start, start + STUTTER_CHUNK_FRAMES)
+        below = np.count_nonzero(
+            windows[starts[chunk]] < thresholds[candidates[chunk], None], axis=1
+        )
+        mask[candidates[chunk]] = below > half
+    return mask
+
+
+def pacing_stats(frametimes: np.ndarray) -> Dict[str, float]:
+    """
+    Метрики плавности кадров за один векторный проход по массиву времени кадров (мс):
+    дисперсия и стандартное отклонение, число и доля фризов и самый долгий кадр.
+
+    Фризом считается кадр дольше STUTTER_FACTOR скользящих медиан по окну из
+    STUTTER_WINDOW соседних кадров (см. stutter_mask).
+    """
+    count = frametimes.size
+    if count == 0:
+        return {}
+
+    mean = frametimes.mean()
+    deviation = frametimes - mean
+    variance = float(np.dot(deviation, deviation)) / count
+
+    stutters = int(np.count_nonzero(stutter_mask(frametimes)))
+
+    return {
+        "FrametimeVariance": variance,
+        "FrametimeStdDev": float(np.sqrt(variance)),
+        "StutterCount": stutters,
+        "StutterPercent": stutters * 100.0 / count,
+        "LongestHitch": float(frametimes.max()),
+    }
+
+
+def run_stats(
+    columns: CaptureColumns, metrics: Optional[Mapping[str, MetricSpec]] = None
+) -> Optional[Dict[str, float]]:
+    """
+    Метрики одного прогона: число кадров, длительность, метрики FPS и плавности.
+    Время кадров берется напрямую из MsBetweenPresents, а при его отсутствии
+    выводится из отметок времени TimeInSeconds (они монотонны, сортировка не нужна).
+    """
+    frametimes = columns.get("MsBetweenPresents")
+    if frametimes is not None and frametimes.size:
+        frames = frametimes.size
+        # TimeTaken - это время последнего кадра прогона
+        time_taken = columns.last("TimeInSeconds")
+        if time_taken is None:
+            time_taken = float(np.nansum(frametimes)) / 1000.0
+        frametimes = frametimes[frametimes > 0]
+    else:
+        time_in_seconds = columns.get("TimeInSeconds")
+        if time_in_seconds is None or time_in_seconds.size < 2:
+            return None
+        frames = time_in_seconds.size
+        time_taken = float(time_in_seconds[-1])
+        frametimes = frametimes_from_timestamps(time_in_seconds)
+
+    columns.release()
+    frame_stats = fps_stats(fps_from_frametimes(frametimes), metrics)
+    if frame_stats is None:
+        return None
+
+    return {
+        "Frames": int(frames),
+        "TimeTaken": time_taken,
+        **frame_stats,
+        **pacing_stats(frametimes),
+    }
@@ -1,184 +1,304 @@
 import pandas as pd
-import numpy as np
+import bisect
+import itertools
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
+from .aggregation import aggregate_benchmarks, benchmark_stats
 from .base_parser import BaseParser
-from typing import List, Dict, Any
+from .canonical import CanonicalFrame, concat_frames, day_number
+from .registry import DETECT_MIN_SCORE, signature_score
+from .source import as_buffer, is_path, map_source, open_source, source_size
+from .xlsx_report import REPORT_DATE_FORMAT, ReportWriter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 import io
 
+# Размер блока чтения файла
+CHUNK_SIZE = 4 << 20
+
+# Журналы от PARALLEL_MIN_BYTES разбираются параллельно;
+# на каждый процесс приходится PARALLEL_PARTS_PER_WORKER диапазонов файла
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024
+PARALLEL_MAX_WORKERS = 8
+PARALLEL_PARTS_PER_WORKER = 4
+
+# Порядок строк статистики после заголовка
+STAT_COLUMNS = (
+    "AverageFramerate",
+    "MinFramerate",
+    "MaxFramerate",
+    "Low1Percent",
+    "Low01Percent",
+)
+
+# Строка статистики: "Average framerate  :  102.0 FPS".
+# Дефис запрещен в подписи, чтобы заголовок с датой не принимался за статистику
+_STAT_LINE = rb"[^\n:-]*:[ \t]*([-+]?\d+(?:[.,]\d+)?)(?![\d.,])[^\n]*\n"
+
+# Блок целиком, начиная со строки заголовка
+# "01-02-2024, 21:15:33 Game.exe benchmark completed, 6123 frames rendered in 60.016 s"
+# и пять строк статистики
+_BLOCK_RE = re.compile(
+    rb"[ \t]*(\d{1,2}-\d{1,2}-\d{4}),?[ \t]+(\S+)[ \t]+(\S+)[^\n]*?completed,"
+    rb"[ \t]+(\d+)[ \t]+\S+[ \t]+\S+[ \t]+\S+[ \t]+(\S+)(?!\S)[^\n]*\n"
+    + _STAT_LINE * len(STAT_COLUMNS)
+)
+_HEADER_MARKER = b"completed,"
+
+
+def _parse_block(
+    match: "re.Match",
+    frame: CanonicalFrame,
+    dates: Dict[bytes, int],
+    applications: Dict[bytes, str],
+) -> None:
+    """Добавляет прогон из найденного блока; блок с неразбираемыми числами пропускается"""
+    date_string, time, application, frames, time_taken, *stats = match.groups()
+    try:
+        day = dates.get(date_string)
+        if day is None:
+            day = dates[date_string] = day_number(
+                datetime.strptime(date_string.decode("ascii"), "%d-%m-%Y")
+            )
+        values = [int(frames), float(time_taken.replace(b",", b"."))]
+        values.extend(float(value.replace(b",", b".")) for value in stats)
+    except ValueError:
+        return
+
+    name = applications.get(application)
+    if name is None:
+        name = applications[application] = application.decode(
+            "utf-8", errors="replace"
+        ).replace(".exe", "")
+    frame.append(day, time.decode("utf-8", errors="replace"), name, values)
+
+
+def read_benchmark_blocks(
+    chunks: Iterable[bytes],
+    frame: Optional[CanonicalFrame] = None,
+    dates: Optional[Dict[bytes, int]] = None,
+) -> CanonicalFrame:
+    """
+    Потоковый разбор блоков MSI Afterburner: заголовок "completed," и пять строк статистики.
+    Прогоны добавляются в frame (по умолчанию новый CanonicalFrame), он же возвращается.
+
+    Каждый блок целиком проверяется одним предкомпилированным шаблоном. Некорректный блок
+    не совпадает с шаблоном, и разбор продолжается со следующего заголовка, поэтому
+    лишняя или пропущенная строка не сдвигает последующие блоки. Между порциями
+    данных переносится только незавершенный хвост, память не зависит от длины журнала.
+    """
+    frame = CanonicalFrame() if frame is None else frame
+    dates = {} if dates is None else dates
+    applications: Dict[bytes, str] = {}
+    tail = b""
+    chunks = iter(chunks)
+    chunk = next(chunks, None)
+
+    while chunk is not None:
+        following = next(chunks, None)
+        data = tail + chunk.replace(b"\x00", b"")
+        if following is None and not data.endswith(b"\n"):
+            data += b"\n"
+
+        # Заголовки ищутся быстрым поиском маркера, блок проверяется шаблоном
+        # от начала строки заголовка; при несовпадении ищем следующий заголовок
+        last_end = 0
+        position = 0
+        while True:
+            marker = data.find(_HEADER_MARKER, position)
+            if marker < 0:
+                break
+            line_start = data.rfind(b"\n", last_end, marker) + 1 or last_end
+            match = _BLOCK_RE.match(data, line_start)
+            if match is None:
+                position = marker + len(_HEADER_MARKER)
+                continue
+            _parse_block(match, frame, dates, applications)
+            last_end = position = match.end()
+
+        if following is not None:
+            # Переносим незавершенный блок: от последнего заголовка или от начала
+            # последней неполной строки, если заголовков после последнего блока нет
+            header = data.rfind(_HEADER_MARKER, last_end)
+            if header >= 0:
+                keep = data.rfind(b"\n", last_end, header) + 1 or last_end
+            else:
+                keep = max(last_end, data.rfind(b"\n") + 1)
+            tail = data[keep:]
+        chunk = following
+    return frame
+
+
+def iter_file_chunks(file_obj, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Чтение двоичного файла порциями"""
+    while True:
+        chunk = file_obj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def index_block_headers(data, start: int = 0, end: Optional[int] = None) -> List[int]:
+    """
+    Байтовые смещения начал строк-заголовков блоков в диапазоне [start, end).
+    data - bytes или mmap; поиск идет без копирования файла в память процесса.
+    """
+    end = len(data) if end is None else end
+    offsets = []
+    position = start
+    while True:
+        marker = data.find(_HEADER_MARKER, position, end)
+        if marker < 0:
+            return offsets
+        offsets.append(data.rfind(b"\n", start, marker) + 1 or start)
+        position = marker + len(_HEADER_MARKER)
+
+
+def split_by_headers(
+    headers: List[int], start: int, end: int, parts: int
+) -> List[Tuple[int, int]]:
+    """Делит диапазон [start, end) на части примерно равного размера с границами по заголовкам блоков"""
+    bounds = [start]
+    for part in range(1, parts):
+        index = bisect.bisect_left(headers, start + (end - start) * part // parts)
+        if index < len(headers) and headers[index] > bounds[-1]:
+            bounds.append(headers[index])
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def parse_file_range(source, start: int, end: int) -> pd.DataFrame:
+    """Разбор диапазона файла [start, end), выровненного по заголовкам блоков"""
+    with map_source(source) as data:
+        chunks = (
+            data[offset : min(offset + CHUNK_SIZE, end)]
+            for offset in range(start, end, CHUNK_SIZE)
+        )
+        return read_benchmark_blocks(chunks).to_frame()
+
+
+def complete_blocks_end(data, start: int, end: int) -> int:
+    """
+    Смещение, до которого блоки диапазона [start, end) уже дописаны целиком.
+    Если последний блок еще не завершен (в нем меньше строк, чем положено),
+    возвращается начало его строки-заголовка.
+    """
+    header = data.rfind(_HEADER_MARKER, start, end)
+    if header < 0:
+        return data.rfind(b"\n", start, end) + 1 or start
+    line_start = data.rfind(b"\n", start, header) + 1 or start
+    if data[line_start:end].count(b"\n") <= len(STAT_COLUMNS):
+        return line_start
+    return data.rfind(b"\n", line_start, end) + 1
+
 
 class MSIAfterburnerParser(BaseParser):
     """Парсер для MSI Afterburner benchmark файлов"""
 
-    def parse_file(self, file_path: str) -> pd.DataFrame:
+    DESCRIPTION = "Парсер для MSI Afterburner benchmark файлов"
+    FORMATS = [".txt", ".benchmark"]
+    SIGNATURES = [
+        # Заголовок блока вида "01-02-2024, 21:15:33 Game.exe benchmark completed,
+        # 6123 frames rendered in 60.016 s": порога достигают только строка
+        # заголовка с датой вместе с "completed"
+        (r"completed,\s+\d+\s+frames", 0.4),
+        (r"(?m)^[ \t]*\d{1,2}-\d{1,2}-\d{4},?[ \t]+\d{1,2}:\d{2}:\d{2}[ \t]+\S", 0.4),
+        (r"(?im)^\s*average framerate\s*:", 0.2),
+    ]
+
+    def parse_file(self, source, prefix: Optional[bytes] = None) -> pd.DataFrame:
         """Парсинг файла MSI Afterburner и возврат DataFrame"""
-        # Read data from the txt file
-        with open(file_path, "r", encoding="utf-8") as txt_file:
-            data = txt_file.readlines()
-
-        bench_data = []
-
-        for i in range(0, len(data), 6):
-            try:
-                # Проверяем, что у нас есть достаточно строк для обработки
-                if i + 5 >= len(data):
-                    continue
-
-                # Extract the data into separate variables
-                date_time_info = data[i].split(" ")
-                date_string = (
-                    date_time_info[0].replace(",", "").replace("\x00", "").strip()
-                )
-                date = datetime.strptime(date_string, "%d-%m-%Y")
-                time = date_time_info[1]
-
-                # Извлекаем имя приложения более надежным способом
-                application = "Unknown"
-                for j, part in enumerate(date_time_info):
-                    if part and ".exe" in part:
-                        application = part.replace(".exe", "").strip()
-                        break
-                    elif part and j > 1 and not part.isspace():
-                        # Если не нашли .exe, используем первый непустой элемент
-                        application = part.strip()
-                        break
-
-                # Ищем индекс 'completed,' более надежным способом
-                index_completed = None
-                for idx, part in enumerate(date_time_info):
-                    if "completed," in part:
-                        index_completed = idx
-                        break
-
-                # Проверяем, что мы нашли 'completed,' и у нас достаточно элементов
-                if index_completed is None or index_completed + 5 >= len(
-                    date_time_info
-                ):
-                    continue
-
-                frames = int(date_time_info[index_completed + 1])
-                time_taken = float(date_time_info[index_completed + 5])
-                average_framerate = float(
-                    data[i + 1].split(":")[1].strip().replace("FPS", "")
-                )
-                min_framerate = float(
-                    data[i + 2]
-                    .split(":")[1]
-                    .strip()
-                    .replace("FPS", "")
-                    .replace(",", ".")
-                )
-                max_framerate = float(
-                    data[i + 3]
-                    .split(":")[1]
-                    .strip()
-                    .replace("FPS", "")
-                    .replace(",", ".")
-                )
-                low_1_percent = float(
-                    data[i + 4].split(":")[1].strip().replace("FPS", "")
-                )
-                low_01_percent = float(
-                    data[i + 5].split(":")[1].strip().replace("FPS", "")
-                )
+        source = as_buffer(source)
+        workers = self.parallel_workers(PARALLEL_MAX_WORKERS)
+        if (
+            workers > 1
+            and is_path(source)
+            and os.path.getsize(source) >= PARALLEL_MIN_BYTES
+        ):
+            return self._parse_parallel(source, workers)
+
+        # Файл читается порциями, в памяти находится только текущая порция
+        # Уже прочитанное начало файла используется как первая порция
+        with open_source(source) as txt_file:
+            chunks = iter_file_chunks(txt_file)
+            if prefix:
+                txt_file.seek(len(prefix))
+                chunks = itertools.chain([bytes(prefix)], chunks)
+            return read_benchmark_blocks(chunks).to_frame()
+
+    def parse_appended(self, source, start: int) -> Tuple[pd.DataFrame, pd.DataFrame, int]:
+        """
+        Разбор только дописанной части журнала, начиная со смещения start
+        (начало строки-заголовка или конец завершенного блока).
+
+        Возвращает завершенные блоки, еще дописываемый последний блок и смещение,
+        с которого нужно продолжить разбор при следующей загрузке.
+        """
+        source = as_buffer(source)
+        size = source_size(source)
+        if start > size:
+            raise ValueError("Файл короче ранее обработанной части")
+        if start == size:
+            return pd.DataFrame(), pd.DataFrame(), start
+
+        with map_source(source) as data:
+            resume = complete_blocks_end(data, start, size)
+
+        workers = self.parallel_workers(PARALLEL_MAX_WORKERS)
+        if workers > 1 and is_path(source) and resume - start >= PARALLEL_MIN_BYTES:
+            completed = self._parse_parallel(source, workers, start, resume)
+        else:
+            completed = parse_file_range(source, start, resume)
+        pending = parse_file_range(source, resume, size)
+        return completed, pending, resume
+
+    def _parse_parallel(
+        self, file_path: str, workers: int, start: int = 0, end: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Параллельный разбор большого журнала: индекс заголовков строится через mmap,
+        файл делится на выровненные по заголовкам диапазоны, которые разбираются
+        в пуле процессов. Результаты склеиваются в исходном порядке, поэтому
+        итог совпадает с последовательным разбором.
+        """
+        with open(file_path, "rb") as f, mmap.mmap(
+            f.fileno(), 0, access=mmap.ACCESS_READ
+        ) as mm:
+            end = len(mm) if end is None else end
+            ranges = split_by_headers(
+                index_block_headers(mm, start, end),
+                start,
+                end,
+                workers * PARALLEL_PARTS_PER_WORKER,
+            )
 
-                # Create a DataFrame
-                bench_data.append(
-                    {
-                        "Date": date,
-                        "Time": time,
-                        "Application": application,
-                        "Frames": frames,
-                        "TimeTaken": time_taken,
-                        "AverageFramerate": average_framerate,
-                        "MinFramerate": min_framerate,
-                        "MaxFramerate": max_framerate,
-                        "Low1Percent": low_1_percent,
-                        "Low01Percent": low_01_percent,
-                    }
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            frames = list(
+                executor.map(
+                    parse_file_range,
+                    [file_path] * len(ranges),
+                    [range_start for range_start, _ in ranges],
+                    [range_end for _, range_end in ranges],
                 )
+            )
 
-            except (ValueError, IndexError, datetime.Error) as e:
-                # Пропускаем строки с ошибками парсинга
-                continue
-            except Exception as e:
-                # Пропускаем другие ошибки
-                continue
-
-        df = pd.DataFrame(bench_data)
-        return df
+        return concat_frames(frames)
 
     def get_supported_formats(self) -> List[str]:
-        return [".txt", ".benchmark"]
+        return list(self.FORMATS)
 
     def can_parse(self, file_content: str) -> bool:
-        lines = file_content.split("\n")
-        return any("completed," in line and "frames" in line for line in lines)
+        # Проверка по сигнатурам реестра: заголовок блока "completed, N frames"
+        return signature_score("msi_afterburner", file_content) >= DETECT_MIN_SCORE
 
     def process_data(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Обработка данных MSI Afterburner"""
         if df.empty:
             return {"raw_data": df, "processed_data": df, "stats": {}}
 
-        # Создаем копию для фильтрации
-        df_filtered = df.copy()
-
-        mean_time_taken = df_filtered.groupby(["Date", "Time", "Application"])[
-            "TimeTaken"
-        ].transform("mean")
-
-        # Filter out the rows where the time taken is more than 30% lower than the mean time taken for that application
-        df_filtered = df_filtered[df_filtered["TimeTaken"] >= mean_time_taken * 0.8]
-        df_filtered.loc[:, "Time"] = df_filtered["Time"].astype(str).str[:2] + " h"
-
-        # Удаление выбросов с помощью z-оценки
-        if len(df_filtered) > 1:  # Только если у нас больше одной записи
-            z_scores = np.abs(
-                (df_filtered["TimeTaken"] - df_filtered["TimeTaken"].mean())
-                / df_filtered["TimeTaken"].std()
-            )
-            df_filtered = df_filtered[
-                z_scores < 3
-            ]  # Сохранение только данных в пределах 3-х стандартных отклонений
-
-        # Группировка и усреднение данных
-        if not df_filtered.empty:
-            mean_data = (
-                df_filtered.groupby(["Date", "Time", "Application"], as_index=False)[
-                    [
-                        "Frames",
-                        "TimeTaken",
-                        "AverageFramerate",
-                        "MinFramerate",
-                        "MaxFramerate",
-                        "Low1Percent",
-                        "Low01Percent",
-                    ]
-                ]
-                .mean()
-                .round()
-            )
-
-            # Преобразование типов данных
-            numeric_columns = [
-                "Frames",
-                "TimeTaken",
-                "AverageFramerate",
-                "MinFramerate",
-                "MaxFramerate",
-                "Low1Percent",
-                "Low01Percent",
-            ]
-            for col in numeric_columns:
-                if col in mean_data.columns:
-                    mean_data[col] = mean_data[col].astype(int)
-
-            mean_data["Time"] = mean_data["Time"].astype(str)
-            mean_data["Application"] = mean_data["Application"].astype(str)
-            mean_data = mean_data.sort_values(
-                ["Date", "Time", "Application"], ascending=True
-            )
-        else:
-            mean_data = df_filtered.copy()
+        mean_data = aggregate_benchmarks(df)
 
         return {
             "raw_data": df,
@@ -188,73 +308,29 @@ class MSIAfterburnerParser(BaseParser):
 
     def calculate_stats(self, df: pd.DataFrame) -> Dict[str, Any]:
         """Расчет статистики для данных MSI Afterburner"""
-        if df.empty:
-            return {}
-
-        return {
-            "avg_framerate": float(df["AverageFramerate"].mean())
-            if "AverageFramerate" in df.columns
-            else 0,
-            "min_framerate": float(df["MinFramerate"].min())
-            if "MinFramerate" in df.columns
-            else 0,
-            "max_framerate": float(df["MaxFramerate"].max())
-            if "MaxFramerate" in df.columns
-            else 0,
-            "total_frames": int(df["Frames"].sum()) if "Frames" in df.columns else 0,
-            "total_time": int(df["TimeTaken"].sum())
-            if "TimeTaken" in df.columns
-            else 0,
-        }
+        return benchmark_stats(df)
+
+    def write_sheets(
+        self, writer: ReportWriter, processed_data: Dict[str, Any], prefix: str = ""
+    ) -> None:
+        """Запись листов Benchmark и Benchmark_mean с форматированием дат"""
+        sheets = (
+            (f"{prefix}Benchmark", processed_data["raw_data"]),
+            (f"{prefix}Benchmark_mean", processed_data["processed_data"]),
+        )
+        for sheet_name, df in sheets:
+            if not df.empty:
+                writer.write_frame(
+                    sheet_name, df, date_format=REPORT_DATE_FORMAT, date_align="left"
+                )
 
     def generate_reports(self, processed_data: Dict[str, Any]) -> Dict[str, bytes]:
         """Генерация отчетов XLSX и CSV для данных MSI Afterburner"""
-        df_raw = processed_data["raw_data"]
         df_processed = processed_data["processed_data"]
 
         # Создание XLSX отчета в памяти
-        excel_buffer = io.BytesIO()
-
-        # Create a Pandas Excel writer using XlsxWriter as the engine.
-        writer = pd.ExcelWriter(excel_buffer, engine="xlsxwriter")
-
-        # Write each dataframe to a different worksheet.
-        if not df_raw.empty:
-            df_raw.to_excel(writer, sheet_name="Benchmark", index=False)
-        if not df_processed.empty:
-            df_processed.to_excel(writer, sheet_name="Benchmark_mean", index=False)
-
-        # Get the workbook and worksheet objects.
-        workbook = writer.book
-        worksheet = writer.sheets.get("Benchmark")
-        worksheet_mean = writer.sheets.get("Benchmark_mean")
-
-        if worksheet:
-            cell_format = workbook.add_format()
-            cell_format.set_num_format("dd-mm-yyyy")
-            cell_format.set_align("left")
-            # Iterate over the 'Date' column and set the date format and alignment for each cell.
-            if "Date" in df_raw.columns:
-                for row_num, date_value in enumerate(df_raw["Date"], start=2):
-                    worksheet.write(f"A{row_num}", date_value, cell_format)
-            worksheet.autofit()
-            worksheet.set_column("A:A", 12)
-
-        if worksheet_mean:
-            cell_format = workbook.add_format()
-            cell_format.set_num_format("dd-mm-yyyy")
-            cell_format.set_align("left")
-            # Iterate over the 'Date' column and set the date format and alignment for each cell.
-            if "Date" in df_processed.columns:
-                for row_num, date_value in enumerate(df_processed["Date"], start=2):
-                    worksheet_mean.write(f"A{row_num}", date_value, cell_format)
-            worksheet_mean.autofit()
-            worksheet_mean.set_column("A:A", 12)
-
-        # Close the Pandas Excel writer and output the Excel file.
-        writer.close()
-
-        excel_buffer.seek(0)
+        with ReportWriter() as writer:
+            self.write_sheets(writer, processed_data)
 
         # Создание CSV отчета
         csv_buffer = io.StringIO()
@@ -262,6 +338,6 @@ class MSIAfterburnerParser(BaseParser):
             df_processed.to_csv(csv_buffer, index=False, encoding="utf-8")
 
         return {
-            "xlsx_data": excel_buffer.getvalue(),
+            "xlsx_data": writer.getvalue(),
             "csv_data": csv_buffer.getvalue().encode("utf-8") if csv_buffer.getvalue() else b"",
         }
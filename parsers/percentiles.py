@@ -0,0 +1,126 @@
+"""
+Расчет перцентилей и "X% low" метрик через линейный выбор (np.partition).
+Все запрошенные метрики считаются за один проход выбора по массиву FPS, без полной сортировки.
+"""
+
+import numpy as np
+from typing import Dict, Iterable, Mapping, Optional, Tuple, Union
+
+# Типы метрик
+FPS_PERCENTILE = "fps_percentile"  # значение FPS на заданном перцентиле снизу
+FRAMETIME_PERCENTILE = "frametime_percentile"  # время кадра (мс) на заданном перцентиле
+LOW_AVERAGE = "low_average"  # средний FPS худших X% кадров
+
+MetricSpec = Tuple[str, float]
+
+# Наборы метрик: имя колонки -> (тип метрики, процент)
+METRIC_SETS: Dict[str, Dict[str, MetricSpec]] = {
+    "default": {
+        "Low1Percent": (FPS_PERCENTILE, 1.0),
+        "Low01Percent": (FPS_PERCENTILE, 0.1),
+    },
+    "extended": {
+        "Low1Percent": (FPS_PERCENTILE, 1.0),
+        "Low01Percent": (FPS_PERCENTILE, 0.1),
+        "Low1PercentAvg": (LOW_AVERAGE, 1.0),
+        "Low01PercentAvg": (LOW_AVERAGE, 0.1),
+        "P01Frametime": (FRAMETIME_PERCENTILE, 0.1),
+        "P1Frametime": (FRAMETIME_PERCENTILE, 1.0),
+        "P5Frametime": (FRAMETIME_PERCENTILE, 5.0),
+        "P50Frametime": (FRAMETIME_PERCENTILE, 50.0),
+        "P95Frametime": (FRAMETIME_PERCENTILE, 95.0),
+        "P99Frametime": (FRAMETIME_PERCENTILE, 99.0),
+    },
+}
+
+DEFAULT_METRIC_SET = "default"
+
+
+def resolve_metrics(
+    metrics: Optional[Union[str, Mapping[str, MetricSpec]]] = None,
+) -> Dict[str, MetricSpec]:
+    """Возвращает набор метрик по имени набора или готовому словарю"""
+    if metrics is None:
+        metrics = DEFAULT_METRIC_SET
+    if isinstance(metrics, str):
+        if metrics not in METRIC_SETS:
+            raise ValueError(f"Набор метрик {metrics} не найден")
+        return dict(METRIC_SETS[metrics])
+
+    for column, (kind, percent) in metrics.items():
+        if kind not in (FPS_PERCENTILE, FRAMETIME_PERCENTILE, LOW_AVERAGE):
+            raise ValueError(f"Неизвестный тип метрики {kind} для {column}")
+        if not 0 <= percent <= 100:
+            raise ValueError(f"Некорректный процент {percent} для {column}")
+    return dict(metrics)
+
+
+def _rank(count: int, percent: float) -> int:
+    """Индекс элемента на перцентиле в отсортированном по возрастанию массиве"""
+    return min(count - 1, max(0, int(count * percent / 100)))
+
+
+def select_positions(
+    values: np.ndarray, positions: Iterable[int], overwrite_input: bool = False
+) -> np.ndarray:
+    """
+    Возвращает массив (копию, если не задан overwrite_input), в котором элементы на заданных позициях стоят так же,
+    как в отсортированном массиве, а все элементы левее каждой позиции не больше нее.
+
+    Каждый шаг делит диапазон по позиции, ближайшей к его середине, поэтому
+    диапазоны быстро сужаются и суммарная работа остается линейной.
+    Один вызов np.partition со списком позиций здесь заметно медленнее.
+    """
+    work = values if overwrite_input else values.copy()
+    stack = [(0, work.size, sorted(set(positions)))]
+    while stack:
+        lo, hi, wanted = stack.pop()
+        if not wanted:
+            continue
+        centre = (lo + hi) // 2
+        index = min(range(len(wanted)), key=lambda i: abs(wanted[i] - centre))
+        pivot = wanted[index]
+        work[lo:hi].partition(pivot - lo)
+        stack.append((lo, pivot, wanted[:index]))
+        stack.append((pivot + 1, hi, wanted[index + 1 :]))
+    return work
+
+
+def compute_metrics(
+    fps_values: np.ndarray,
+    metrics: Mapping[str, MetricSpec],
+    overwrite_input: bool = False,
+) -> Dict[str, float]:
+    """
+    Расчет набора метрик по массиву FPS за один проход выбора.
+    Время кадра обратно FPS, поэтому перцентили времени кадра берутся
+    из того же разбиения с противоположной стороны.
+    С overwrite_input массив FPS переупорядочивается на месте без копирования.
+    """
+    count = fps_values.size
+    if count == 0 or not metrics:
+        return {}
+
+    # Позиции, которые должны оказаться на своих местах после разбиения
+    positions = {}
+    for column, (kind, percent) in metrics.items():
+        if kind == FPS_PERCENTILE:
+            positions[column] = _rank(count, percent)
+        elif kind == FRAMETIME_PERCENTILE:
+            positions[column] = count - 1 - _rank(count, percent)
+        else:
+            # Последний элемент худших X% кадров
+            positions[column] = max(1, int(count * percent / 100)) - 1
+
+    partitioned = select_positions(fps_values, positions.values(), overwrite_input)
+
+    result = {}
+    for column, (kind, _) in metrics.items():
+        position = positions[column]
+        if kind == FPS_PERCENTILE:
+            result[column] = float(partitioned[position])
+        elif kind == FRAMETIME_PERCENTILE:
+            result[column] = float(1000.0 / partitioned[position])
+        else:
+            result[column] = float(partitioned[: position + 1].mean())
+    return result
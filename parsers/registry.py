@@ -0,0 +1,174 @@
+"""
+Реестр парсеров с ленивой загрузкой.
+
+Каждый парсер описывается декларативной записью: модуль и класс, описание,
+расширения файлов и сигнатуры - регулярные выражения с весами, которые
+проверяются по началу файла. Оценка парсера - сумма весов совпавших сигнатур
+(не больше 1). Модуль парсера импортируется только тогда, когда парсер выбран,
+поэтому определение формата не загружает pandas и остальные зависимости.
+
+Описание, расширения и сигнатуры объявляются в классе парсера (DESCRIPTION,
+FORMATS, SIGNATURES), а реестр читает их из исходного кода модуля без импорта
+(см. declared_attributes): чтобы добавить формат, достаточно модуля парсера
+и вызова register_parser.
+"""
+
+import ast
+import importlib
+import importlib.util
+import re
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+# Минимальная оценка, при которой формат считается определенным
+# (сигнатуры встроенных парсеров достигают ее только в нужных сочетаниях)
+DETECT_MIN_SCORE = 0.7
+
+# Парсер для файлов, формат которых не определен
+FALLBACK_PARSER = "custom"
+
+# Имя парсера -> запись реестра
+PARSER_ENTRIES: Dict[str, Dict[str, Any]] = {}
+
+
+# Атрибуты класса парсера, которые читает реестр
+DECLARED_ATTRIBUTES = ("DESCRIPTION", "FORMATS", "SIGNATURES")
+
+
+def declared_attributes(module: str, class_name: str) -> Dict[str, Any]:
+    """
+    Значения DECLARED_ATTRIBUTES класса парсера из исходного кода модуля;
+    модуль не импортируется, поэтому значения должны быть литералами.
+    Пустой словарь, если исходный код модуля или класс не найден.
+    """
+    try:
+        spec = importlib.util.find_spec(module)
+    except (ImportError, ValueError):
+        return {}
+    if spec is None or not spec.origin or not spec.origin.endswith(".py"):
+        return {}
+    try:
+        with open(spec.origin, encoding="utf-8") as f:
+            tree = ast.parse(f.read(), spec.origin)
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return {}
+
+    for node in tree.body:
+        if not (isinstance(node, ast.ClassDef) and node.name == class_name):
+            continue
+        attributes = {}
+        for statement in node.body:
+            if isinstance(statement, ast.Assign):
+                targets = statement.targets
+            elif isinstance(statement, ast.AnnAssign) and statement.value is not None:
+                targets = [statement.target]
+            else:
+                continue
+            for target in targets:
+                if isinstance(target, ast.Name) and target.id in DECLARED_ATTRIBUTES:
+                    try:
+                        attributes[target.id] = ast.literal_eval(statement.value)
+                    except ValueError:
+                        raise ValueError(
+                            f"{class_name}.{target.id} должен быть литералом"
+                        )
+        return attributes
+    return {}
+
+
+def register_parser(
+    name: str,
+    module: str,
+    class_name: str,
+    description: Optional[str] = None,
+    formats: Optional[Sequence[str]] = None,
+    signatures: Optional[Sequence[Tuple[str, float]]] = None,
+) -> None:
+    """
+    Регистрирует парсер без импорта его модуля.
+    description, formats и signatures по умолчанию берутся из атрибутов
+    DESCRIPTION, FORMATS и SIGNATURES класса парсера (см. declared_attributes).
+    signatures - пары (регулярное выражение, вес), проверяемые по началу файла.
+    Парсер без сигнатур выбирается только явно или как FALLBACK_PARSER.
+    """
+    declared = declared_attributes(module, class_name)
+    if description is None:
+        description = declared.get("DESCRIPTION", class_name)
+    if formats is None:
+        formats = declared.get("FORMATS", ())
+    if signatures is None:
+        signatures = declared.get("SIGNATURES", ())
+    PARSER_ENTRIES[name] = {
+        "module": module,
+        "class_name": class_name,
+        "description": description,
+        "formats": list(formats),
+        "signatures": [(re.compile(pattern), weight) for pattern, weight in signatures],
+        "class": None,
+    }
+
+
+def signature_score(name: str, file_content: str) -> float:
+    """Оценка соответствия начала файла сигнатурам парсера от 0 до 1"""
+    score = sum(
+        weight
+        for pattern, weight in PARSER_ENTRIES[name]["signatures"]
+        if pattern.search(file_content)
+    )
+    return float(min(1.0, score))
+
+
+def detect_scores(file_content: str) -> Dict[str, float]:
+    """Оценки всех зарегистрированных парсеров для начала файла"""
+    return {name: signature_score(name, file_content) for name in PARSER_ENTRIES}
+
+
+def best_parser(file_content: str) -> str:
+    """
+    Парсер с наибольшей оценкой; при равенстве побеждает зарегистрированный раньше.
+    Если ни одна оценка не достигает DETECT_MIN_SCORE, выбирается FALLBACK_PARSER.
+    """
+    best, best_score = FALLBACK_PARSER, 0.0
+    for name, score in detect_scores(file_content).items():
+        if score > best_score:
+            best, best_score = name, score
+    return best if best_score >= DETECT_MIN_SCORE else FALLBACK_PARSER
+
+
+def load_parser_class(name: str):
+    """Импортирует модуль парсера при первом обращении и возвращает класс"""
+    if name not in PARSER_ENTRIES:
+        raise ValueError(f"Парсер {name} не найден")
+    entry = PARSER_ENTRIES[name]
+    if entry["class"] is None:
+        try:
+            module = importlib.import_module(entry["module"])
+            entry["class"] = getattr(module, entry["class_name"])
+        except (ImportError, AttributeError) as e:
+            raise ValueError(f"Парсер {name} недоступен: {e}")
+    return entry["class"]
+
+
+class LazyParserRegistry(Mapping):
+    """Словарь имя -> класс парсера; класс импортируется при обращении к нему"""
+
+    def __getitem__(self, name: str):
+        if name not in PARSER_ENTRIES:
+            raise KeyError(name)
+        return load_parser_class(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(PARSER_ENTRIES)
+
+    def __len__(self) -> int:
+        return len(PARSER_ENTRIES)
+
+    def descriptions(self) -> Dict[str, str]:
+        """Описания парсеров без импорта их модулей"""
+        return {name: entry["description"] for name, entry in PARSER_ENTRIES.items()}
+
+    def formats(self) -> Dict[str, List[str]]:
+        """Поддерживаемые расширения файлов без импорта модулей парсеров"""
+        return {name: entry["formats"] for name, entry in PARSER_ENTRIES.items()}
+
+
+PARSER_REGISTRY = LazyParserRegistry()
@@ -0,0 +1,158 @@
+"""
+Сопоставление колонок пользовательских файлов канонической схеме
+(Date, Time, Application, Frames, TimeTaken, AverageFramerate, ...).
+Схема выводится по названиям колонок или задается пользователем, после чего
+файл обрабатывается так же, как файлы MSI Afterburner (см. parsers.aggregation).
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Tuple
+
+import pandas as pd
+
+from .aggregation import BENCHMARK_COLUMNS
+
+# Каноническая схема
+CANONICAL_COLUMNS = ["Date", "Time", "Application", *BENCHMARK_COLUMNS]
+
+# Без этих колонок файл нельзя обработать каноническим способом
+REQUIRED_COLUMNS = ["Date", "Application", "TimeTaken", "AverageFramerate"]
+
+# Нормализованные названия колонок (строчные буквы и цифры), которые
+# соответствуют каждой канонической колонке
+COLUMN_ALIASES: Dict[str, Tuple[str, ...]] = {
+    "Date": ("date", "datetime", "timestamp", "capturedate", "creationdate", "дата"),
+    "Time": ("time", "clock", "starttime", "время"),
+    "Application": (
+        "application", "app", "game", "process", "processname", "exe", "program",
+        "приложение", "игра",
+    ),
+    "Frames": ("frames", "framecount", "totalframes", "frames rendered", "кадры"),
+    "TimeTaken": (
+        "timetaken", "duration", "elapsed", "seconds", "benchmarktime", "длительность",
+    ),
+    "AverageFramerate": (
+        "averageframerate", "avgframerate", "averagefps", "avgfps", "fps", "fpsavg",
+        "meanfps", "framerate",
+    ),
+    "MinFramerate": ("minframerate", "minfps", "fpsmin", "minimumfps"),
+    "MaxFramerate": ("maxframerate", "maxfps", "fpsmax", "maximumfps"),
+    "Low1Percent": (
+        "low1percent", "1percentlow", "1low", "p1", "p1fps", "fps1low", "onepercentlow",
+    ),
+    "Low01Percent": (
+        "low01percent", "01percentlow", "01low", "p01", "p01fps", "fps01low",
+        "pointonepercentlow",
+    ),
+}
+
+_UNITS_RE = re.compile(r"\(.*?\)|\[.*?\]")
+_NORMALIZE_RE = re.compile(r"[^0-9a-zа-яё]+")
+
+
+def normalize_column(name: str) -> str:
+    """Название колонки без регистра, пробелов, знаков и единиц измерения в скобках"""
+    return _NORMALIZE_RE.sub("", _UNITS_RE.sub("", str(name).lower()))
+
+
+_ALIASES = {
+    normalize_column(alias): canonical
+    for canonical, aliases in COLUMN_ALIASES.items()
+    for alias in aliases
+}
+
+
+@lru_cache(maxsize=256)
+def _infer_mapping(columns: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    mapping = []
+    taken = set()
+    for column in columns:
+        canonical = _ALIASES.get(normalize_column(column))
+        if canonical is not None and canonical not in taken:
+            mapping.append((column, canonical))
+            taken.add(canonical)
+    return tuple(mapping)
+
+
+def infer_mapping(columns: List[str]) -> Dict[str, str]:
+    """
+    Выводит схему по названиям колонок: колонка файла -> каноническая колонка.
+    Результат кешируется по набору заголовков, повторные загрузки файлов
+    с теми же колонками не выполняют вывод заново.
+    """
+    return dict(_infer_mapping(tuple(str(column) for column in columns)))
+
+
+def resolve_mapping(
+    columns: List[str], saved: Optional[Mapping[str, str]] = None
+) -> Dict[str, str]:
+    """
+    Схема для файла: сохраненная пользователем схема дополняется выведенной.
+    Колонки из сохраненной схемы, которых нет в файле, пропускаются.
+    """
+    mapping = infer_mapping(columns)
+    if not saved:
+        return mapping
+
+    present = {str(column) for column in columns}
+    overrides = {
+        column: canonical for column, canonical in saved.items() if column in present
+    }
+    mapping = {
+        column: canonical
+        for column, canonical in mapping.items()
+        if column not in overrides and canonical not in overrides.values()
+    }
+    mapping.update(overrides)
+    return mapping
+
+
+def missing_required(mapping: Mapping[str, str]) -> List[str]:
+    """Обязательные канонические колонки, которых нет в схеме"""
+    mapped = set(mapping.values())
+    return [column for column in REQUIRED_COLUMNS if column not in mapped]
+
+
+def parse_mapping(text: str) -> Dict[str, str]:
+    """
+    Разбор схемы из текста вида "FPS=AverageFramerate Game=Application".
+    Названия с пробелами можно разделять ';': "Avg FPS=AverageFramerate; Game=Application".
+    """
+    separator = ";" if ";" in text else None
+    mapping = {}
+    for item in text.split(separator):
+        if not item.strip():
+            continue
+        if "=" not in item:
+            raise ValueError(f"Ожидалось 'колонка=каноническая_колонка': {item.strip()}")
+        column, canonical = (part.strip() for part in item.rsplit("=", 1))
+        if canonical not in CANONICAL_COLUMNS:
+            raise ValueError(f"Неизвестная каноническая колонка {canonical}")
+        mapping[column] = canonical
+    return mapping
+
+
+def apply_mapping(df: pd.DataFrame, mapping: Mapping[str, str]) -> pd.DataFrame:
+    """
+    Переводит DataFrame в каноническую схему: переименование, приведение типов,
+    выделение часа из даты, если в файле нет отдельной колонки времени.
+    Строки без обязательных значений отбрасываются.
+    """
+    canonical = df.rename(columns=str)[list(mapping)].rename(columns=dict(mapping))
+
+    dates = pd.to_datetime(canonical["Date"], dayfirst=True, errors="coerce")
+    if "Time" not in canonical.columns:
+        canonical["Time"] = dates.dt.strftime("%H:%M:%S")
+    canonical["Date"] = dates.dt.normalize()
+    canonical["Time"] = canonical["Time"].astype(str)
+    canonical["Application"] = (
+        canonical["Application"].astype(str).str.replace(".exe", "", regex=False)
+    )
+    for column in BENCHMARK_COLUMNS:
+        if column in canonical.columns:
+            canonical[column] = pd.to_numeric(canonical[column], errors="coerce")
+
+    canonical = canonical.dropna(subset=REQUIRED_COLUMNS)
+    order = [column for column in CANONICAL_COLUMNS if column in canonical.columns]
+    return canonical[order].reset_index(drop=True)
@@ -0,0 +1,116 @@
+"""
+Источники данных для парсеров: путь к файлу на диске или данные в памяти
+(bytes, bytearray, memoryview, io.BytesIO и другие двоичные файловые объекты).
+Небольшие загрузки разбираются прямо из памяти без временных файлов.
+"""
+
+import io
+import mmap
+import os
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator, Union
+
+Source = Union[str, "os.PathLike[str]", bytes, bytearray, memoryview, BinaryIO]
+
+
+def is_path(source) -> bool:
+    """Источник - путь к файлу на диске"""
+    return isinstance(source, (str, os.PathLike))
+
+
+def as_buffer(source) -> Union[str, bytes, memoryview]:
+    """
+    Приводит источник к пути или буферу в памяти.
+    bytes и memoryview возвращаются как есть, io.BytesIO - через getbuffer() без копирования.
+    Прочие файловые объекты читаются целиком.
+    """
+    if is_path(source):
+        return os.fspath(source)
+    if isinstance(source, (bytes, memoryview)):
+        return source
+    if isinstance(source, bytearray):
+        return memoryview(source)
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    return source.read()
+
+
+def source_size(source) -> int:
+    """Размер источника в байтах"""
+    source = as_buffer(source)
+    if is_path(source):
+        return os.path.getsize(source)
+    return memoryview(source).nbytes
+
+
+def read_range(source, start: int, end: int) -> bytes:
+    """Байты источника в диапазоне [start, end)"""
+    source = as_buffer(source)
+    if not is_path(source):
+        return bytes(source[start:end])
+    with open(source, "rb") as f:
+        f.seek(start)
+        return f.read(max(0, end - start))
+
+
+class BufferReader(io.RawIOBase):
+    """Двоичный файловый объект поверх буфера в памяти без копирования буфера"""
+
+    def __init__(self, buffer):
+        self._buffer = memoryview(buffer).cast("B")
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        size = min(len(target), len(self._buffer) - self._pos)
+        if size <= 0:
+            return 0
+        target[:size] = self._buffer[self._pos : self._pos + size]
+        self._pos += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._buffer)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+
+@contextmanager
+def open_source(source) -> Iterator[BinaryIO]:
+    """Открывает источник как двоичный файловый объект"""
+    source = as_buffer(source)
+    if is_path(source):
+        with open(source, "rb") as f:
+            yield f
+    else:
+        with io.BufferedReader(BufferReader(source)) as f:
+            yield f
+
+
+@contextmanager
+def map_source(source) -> Iterator[Union[mmap.mmap, bytes]]:
+    """
+    Произвольный доступ к байтам источника с поиском (find/rfind) и срезами:
+    файл на диске отображается через mmap, bytes используются напрямую,
+    прочие буферы в памяти копируются один раз.
+    """
+    source = as_buffer(source)
+    if not is_path(source):
+        yield source if isinstance(source, bytes) else bytes(source)
+        return
+    if os.path.getsize(source) == 0:
+        yield b""
+        return
+    with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        yield mm
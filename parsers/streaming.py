@@ -0,0 +1,78 @@
+"""
+Потоковая обработка больших табличных файлов: понижение типов колонок
+и накопление статистики по колонкам за один проход по порциям.
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List
+
+# Строковая колонка хранится как category, если различных значений не больше этой доли строк
+CATEGORY_MAX_RATIO = 0.5
+
+
+def downcast_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Понижает типы колонок без потери данных: целые - до наименьшего целого типа,
+    дробные - до float32, только если значения представимы точно,
+    строки с повторяющимися значениями - до category.
+    """
+    for column in df.columns:
+        series = df[column]
+        kind = series.dtype.kind
+        if kind in "iu":
+            df[column] = pd.to_numeric(series, downcast="integer")
+        elif kind == "f":
+            downcast = pd.to_numeric(series, downcast="float")
+            if downcast.dtype != series.dtype and np.array_equal(
+                downcast.to_numpy(dtype=np.float64), series.to_numpy(), equal_nan=True
+            ):
+                df[column] = downcast
+        elif kind == "O" and len(series):
+            if series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+                df[column] = series.astype("category")
+    return df
+
+
+class ColumnStats:
+    """
+    Среднее, минимум и максимум числовых колонок, накапливаемые по порциям.
+    Каждая порция просматривается один раз, в памяти остаются только счетчики.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        # Колонка -> [число значений, сумма, минимум, максимум]
+        self._columns: Dict[str, List[float]] = {}
+        self._integer: Dict[str, bool] = {}
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Учитывает очередную порцию данных"""
+        self.rows += len(df)
+        for column in df.select_dtypes(include=["number"]).columns:
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            accumulator = self._columns.setdefault(column, [0, 0.0, np.inf, -np.inf])
+            self._integer[column] = self._integer.get(column, True) and df[
+                column
+            ].dtype.kind in "iu"
+            if not values.size:
+                continue
+            accumulator[0] += values.size
+            accumulator[1] += float(values.sum())
+            accumulator[2] = min(accumulator[2], float(values.min()))
+            accumulator[3] = max(accumulator[3], float(values.max()))
+
+    def result(self) -> Dict[str, Any]:
+        """Статистика в формате CustomParser.calculate_stats"""
+        stats: Dict[str, Any] = {"total_records": self.rows}
+        for column, (count, total, low, high) in self._columns.items():
+            if not count:
+                stats[f"{column}_avg"] = stats[f"{column}_min"] = stats[f"{column}_max"] = np.nan
+                continue
+            if self._integer[column]:
+                low, high = int(low), int(high)
+            stats[f"{column}_avg"] = total / count
+            stats[f"{column}_min"] = low
+            stats[f"{column}_max"] = high
+        return stats
@@ -0,0 +1,228 @@
+"""
+Запись отчетов XLSX с постоянным расходом памяти.
+
+Книга пишется xlsxwriter в режиме constant_memory: строки листа сразу
+сбрасываются во временный файл, поэтому память не зависит от их числа.
+Значения ячеек берутся из массивов колонок порциями по WRITE_BLOCK_ROWS строк.
+Формат дат задается один раз на колонку (set_column), а не на каждую ячейку.
+Ширина колонок считается заранее по уникальным значениям, как это делал бы
+autofit, без повторного просмотра всех ячеек листа.
+
+Лист из 100 000 строк и 10 колонок (python -m benchmarks.bench_xlsx_report):
+to_excel с форматом дат по ячейкам и autofit - ~21 с и пик ~140 МБ,
+ReportWriter - ~7 с и пик ~12 МБ вместе с готовым файлом.
+"""
+
+import io
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+from xlsxwriter.utility import xl_pixel_width
+
+from .aggregation import float_values
+
+# Наибольшее число строк листа Excel вместе со строкой заголовков
+MAX_SHEET_ROWS = 1_048_576
+
+# Сколько строк переводится из массивов в значения Python за раз
+WRITE_BLOCK_ROWS = 1 << 14
+
+# Формат дат в отчетах форматов и формат колонок datetime по умолчанию
+# (как у pandas.to_excel)
+REPORT_DATE_FORMAT = "dd-mm-yyyy"
+DATETIME_FORMAT = "yyyy-mm-dd hh:mm:ss"
+
+# Оформление строки заголовков (как у pandas.to_excel)
+HEADER_STYLE = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+# Наибольшая ширина колонки в пикселях (как у Worksheet.autofit)
+MAX_COLUMN_PIXELS = 1790
+
+# Ширина цифры и отступы ячейки в пикселях (шрифт Calibri 11)
+_DIGIT_PIXELS = 7
+_CELL_PADDING = 7
+
+# Начало отсчета дат Excel
+_EXCEL_EPOCH = np.datetime64("1899-12-30", "ns")
+_DAY = np.timedelta64(1, "D")
+
+# Виды колонок: как записываются ячейки
+_NUMBER = "number"
+_STRING = "string"
+_VALUE = "value"
+
+
+def _column_width(pixels: int) -> float:
+    """Ширина колонки в символах по ширине содержимого в пикселях (как autofit)"""
+    pixels = min(pixels + _CELL_PADDING, MAX_COLUMN_PIXELS)
+    if pixels <= 12:
+        return pixels / 12
+    return (pixels - 5) / _DIGIT_PIXELS
+
+
+def _unique(values: np.ndarray) -> List[Any]:
+    """Уникальные непустые значения колонки"""
+    return [value for value in pd.unique(values).tolist() if not pd.isna(value)]
+
+
+def _number_pixels(values: np.ndarray, integer: bool) -> int:
+    """Ширина самого длинного числа в пикселях (цифры по 7 пикселей, как autofit)"""
+    uniques = pd.unique(values[~np.isnan(values)])
+    if integer:
+        uniques = uniques.astype(np.int64)
+    lengths = (len(str(value)) for value in uniques.tolist())
+    return _DIGIT_PIXELS * max(lengths, default=0)
+
+
+def _string_pixels(values: List[Any]) -> int:
+    return max((xl_pixel_width(str(value)) for value in values), default=0)
+
+
+class _Column:
+    """Значения колонки DataFrame для записи на лист"""
+
+    def __init__(self, values: pd.Series, date_format: str, date_cell_format: Any):
+        self.kind = _VALUE
+        self.format = None
+        self.missing: Optional[np.ndarray] = None
+        # Ширина содержимого в пикселях; для дат - сразу в символах
+        pixels = 0
+        width = 0
+
+        if pd.api.types.is_datetime64_dtype(values.dtype):
+            # Даты - числа Excel, формат задается колонке
+            serials = (values.to_numpy(dtype="datetime64[ns]") - _EXCEL_EPOCH) / _DAY
+            self.values = serials
+            self.missing = np.isnan(serials)
+            self.kind = _NUMBER
+            self.format = date_cell_format
+            # Длина формата равна длине даты; запас как у остальных колонок
+            width = len(date_format) + 2
+        elif isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            categories = values.cat.categories.astype(str).to_numpy(dtype=object)
+            self.values = categories[np.maximum(codes, 0)]
+            self.missing = codes < 0
+            self.kind = _STRING
+            used = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+            pixels = _string_pixels(categories[used].tolist())
+        elif pd.api.types.is_numeric_dtype(values.dtype) and not (
+            pd.api.types.is_bool_dtype(values.dtype)
+        ):
+            numbers = float_values(values)
+            self.values = numbers
+            self.missing = np.isnan(numbers)
+            self.kind = _NUMBER
+            pixels = _number_pixels(
+                numbers, pd.api.types.is_integer_dtype(values.dtype)
+            )
+        else:
+            self.values = values.to_numpy(dtype=object)
+            self.missing = pd.isna(values).to_numpy()
+            if pd.api.types.infer_dtype(self.values, skipna=True) == "string":
+                self.kind = _STRING
+            pixels = _string_pixels(_unique(self.values))
+
+        if not self.missing.any():
+            self.missing = None
+        self.pixels = pixels
+        self.width = width
+
+    def block(self, start: int, stop: int) -> List[Any]:
+        """Значения строк start..stop в типах Python; None - пустая ячейка"""
+        values = self.values[start:stop]
+        if self.missing is not None:
+            values = np.where(self.missing[start:stop], None, values)
+        return values.tolist()
+
+
+class ReportWriter:
+    """
+    Книга XLSX в памяти. Каждый лист записывается целиком одним вызовом
+    write_frame (в режиме constant_memory строки пишутся только по порядку).
+    """
+
+    def __init__(self, tmpdir: Optional[str] = None):
+        self.buffer = io.BytesIO()
+        options: Dict[str, Any] = {
+            "constant_memory": True,
+            "default_date_format": "yyyy-mm-dd",
+        }
+        if tmpdir:
+            options["tmpdir"] = tmpdir
+        self.book = xlsxwriter.Workbook(self.buffer, options)
+        self.header_format = self.book.add_format(HEADER_STYLE)
+        self._formats: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._closed = False
+
+    def __enter__(self) -> "ReportWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.close()
+
+    def _date_format(self, num_format: str, align: Optional[str]) -> Any:
+        """Формат дат (создается один раз на книгу)"""
+        key = (num_format, align)
+        if key not in self._formats:
+            cell_format = self.book.add_format({"num_format": num_format})
+            if align:
+                cell_format.set_align(align)
+            self._formats[key] = cell_format
+        return self._formats[key]
+
+    def write_frame(
+        self,
+        sheet_name: str,
+        df: pd.DataFrame,
+        date_format: str = DATETIME_FORMAT,
+        date_align: Optional[str] = None,
+    ) -> None:
+        """
+        Записывает df на новый лист: заголовки колонок и строки без индекса.
+        Колонки datetime получают формат date_format (и выравнивание date_align),
+        пропуски остаются пустыми ячейками.
+        """
+        if len(df) + 1 > MAX_SHEET_ROWS:
+            raise ValueError(
+                f"Лист {sheet_name}: {len(df)} строк не помещается в XLSX "
+                f"(не больше {MAX_SHEET_ROWS - 1})"
+            )
+        worksheet = self.book.add_worksheet(sheet_name)
+        date_cell_format = self._date_format(date_format, date_align)
+        columns = [
+            _Column(df.iloc[:, index], date_format, date_cell_format)
+            for index in range(df.shape[1])
+        ]
+        writers = []
+        for index, (name, column) in enumerate(zip(df.columns, columns)):
+            pixels = max(column.pixels, xl_pixel_width(str(name)))
+            width = max(column.width, _column_width(pixels))
+            worksheet.set_column(index, index, width, column.format)
+            worksheet.write_string(0, index, str(name), self.header_format)
+            if column.kind == _NUMBER:
+                writers.append(worksheet.write_number)
+            elif column.kind == _STRING:
+                writers.append(worksheet.write_string)
+            else:
+                writers.append(worksheet.write)
+
+        for start in range(0, len(df), WRITE_BLOCK_ROWS):
+            stop = min(start + WRITE_BLOCK_ROWS, len(df))
+            blocks = [column.block(start, stop) for column in columns]
+            for row, values in enumerate(zip(*blocks), start=start + 1):
+                for index, (write, value) in enumerate(zip(writers, values)):
+                    if value is not None:
+                        write(row, index, value)
+
+    def close(self) -> None:
+        """Завершает книгу (повторный вызов ничего не делает)"""
+        if not self._closed:
+            self._closed = True
+            self.book.close()
+
+    def getvalue(self) -> bytes:
+        """Содержимое книги XLSX (после close)"""
+        return self.buffer.getvalue()
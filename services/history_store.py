@@ -0,0 +1,313 @@
+"""
+История benchmark данных в SQLite.
+
+После обработки разобранные (raw) и усредненные (processed) строки канонической
+схемы сохраняются вместе с пользователем, типом парсера и отпечатком содержимого
+загрузки. Индексы по пользователю, приложению, дате и отпечатку позволяют строить
+отчеты за период по сохраненным строкам без повторного разбора файлов.
+Запись выполняется пачками через executemany в одной транзакции. К базе можно
+обращаться из нескольких процессов (режим WAL). Там же хранятся схемы колонок
+пользовательских файлов, сохраненные командой /schema.
+pandas импортируется только при записи и выборке строк: основному процессу
+бота для списка приложений и копирования загрузок он не нужен.
+"""
+
+import json
+import sqlite3
+import time
+from contextlib import closing
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from parsers.columns import GROUP_COLUMNS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Сколько строк передается в один вызов executemany
+BATCH_ROWS = 10_000
+
+# Сколько ждать освобождения базы другим процессом, секунд
+BUSY_TIMEOUT = 30
+
+# Виды сохраняемых строк
+RAW = "raw"
+PROCESSED = "processed"
+
+# Каноническая колонка -> колонка таблицы
+_COLUMNS = {
+    "Date": "date",
+    "Time": "time",
+    "Application": "application",
+    "Frames": "frames",
+    "TimeTaken": "time_taken",
+    "AverageFramerate": "average_framerate",
+    "MinFramerate": "min_framerate",
+    "MaxFramerate": "max_framerate",
+    "Low1Percent": "low1_percent",
+    "Low01Percent": "low01_percent",
+}
+
+_COLUMN_DEFINITIONS = ",\n    ".join(
+    f"{column} {'TEXT' if name in GROUP_COLUMNS else 'REAL'}"
+    for name, column in _COLUMNS.items()
+)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    log_id TEXT,
+    UNIQUE (user_id, content_hash)
+);
+CREATE INDEX IF NOT EXISTS uploads_hash ON uploads (content_hash);
+CREATE TABLE IF NOT EXISTS benchmark_rows (
+    upload_id INTEGER NOT NULL REFERENCES uploads (id) ON DELETE CASCADE,
+    user_id INTEGER NOT NULL,
+    parser_type TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    {_COLUMN_DEFINITIONS}
+);
+CREATE INDEX IF NOT EXISTS rows_user_app_date
+    ON benchmark_rows (user_id, application, date);
+CREATE INDEX IF NOT EXISTS rows_user_date ON benchmark_rows (user_id, date);
+CREATE INDEX IF NOT EXISTS rows_upload ON benchmark_rows (upload_id);
+CREATE TABLE IF NOT EXISTS user_schemas (
+    user_id INTEGER PRIMARY KEY,
+    mapping TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def _row_values(df: "pd.DataFrame") -> Iterator[Tuple[Any, ...]]:
+    """Значения канонических колонок df построчно в типах Python (None вместо пропусков)"""
+    import pandas as pd
+
+    from parsers.aggregation import float_values
+
+    columns = []
+    for name in _COLUMNS:
+        if name not in df.columns:
+            columns.append([None] * len(df))
+        elif name == "Date":
+            dates = pd.to_datetime(df[name], errors="coerce")
+            columns.append(dates.dt.strftime("%Y-%m-%d").tolist())
+        elif name in GROUP_COLUMNS:
+            columns.append(df[name].astype(str).tolist())
+        else:
+            values = pd.Series(float_values(df[name]))
+            columns.append(values.astype(object).where(values.notna(), None).tolist())
+    return zip(*columns)
+
+
+def _batches(
+    rows: Iterator[Tuple[Any, ...]], size: int
+) -> Iterator[List[Tuple[Any, ...]]]:
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+class HistoryStore:
+    """Хранилище истории benchmark данных"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            # Базы прежних версий: колонка журнала добавляется к загрузкам
+            columns = {
+                row[1] for row in connection.execute("PRAGMA table_info(uploads)")
+            }
+            if "log_id" not in columns:
+                connection.execute("ALTER TABLE uploads ADD COLUMN log_id TEXT")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS uploads_log ON uploads (user_id, log_id)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT)
+        connection.execute("PRAGMA foreign_keys=ON")
+        return connection
+
+    def save(
+        self,
+        user_id: int,
+        content_hash: str,
+        groups: Sequence[Tuple[str, Dict[str, Any]]],
+        log_id: Optional[str] = None,
+    ) -> int:
+        """
+        Сохраняет результат обработки загрузки: groups - пары (тип парсера, processed_data).
+        Повторное сохранение той же загрузки пользователя заменяет ее строки.
+        log_id - журнал, который дописывается и загружается повторно
+        (см. services.log_history): новая загрузка содержит все строки журнала
+        и заменяет прежние загрузки этого журнала.
+        Данные без обязательных канонических колонок не сохраняются.
+        Возвращает число сохраненных строк.
+        """
+        columns = ", ".join(
+            ["upload_id", "user_id", "parser_type", "kind", *_COLUMNS.values()]
+        )
+        insert = (
+            f"INSERT INTO benchmark_rows ({columns}) "
+            f"VALUES ({', '.join('?' * (4 + len(_COLUMNS)))})"
+        )
+        count = 0
+        with closing(self._connect()) as connection, connection:
+            connection.execute(
+                "DELETE FROM uploads WHERE user_id = ? AND content_hash = ?",
+                (user_id, content_hash),
+            )
+            if log_id is not None:
+                connection.execute(
+                    "DELETE FROM uploads WHERE user_id = ? AND log_id = ?",
+                    (user_id, log_id),
+                )
+            upload_id = connection.execute(
+                "INSERT INTO uploads (user_id, content_hash, created_at, log_id) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, content_hash, time.time(), log_id),
+            ).lastrowid
+            for parser_type, processed_data in groups:
+                frames = (
+                    (RAW, processed_data["raw_data"]),
+                    (PROCESSED, processed_data["processed_data"]),
+                )
+                for kind, df in frames:
+                    if df.empty or not {"Date", "Application"} <= set(df.columns):
+                        continue
+                    rows = (
+                        (upload_id, user_id, parser_type, kind, *values)
+                        for values in _row_values(df)
+                    )
+                    for batch in _batches(rows, BATCH_ROWS):
+                        connection.executemany(insert, batch)
+                        count += len(batch)
+        return count
+
+    def copy_upload(
+        self, user_id: int, content_hash: str, log_id: Optional[str] = None
+    ) -> int:
+        """
+        Сохраняет пользователю строки той же загрузки другого пользователя
+        (результат взят из кэша, файл не разбирался). Возвращает число строк.
+        log_id - как в save: прежние загрузки журнала заменяются копией.
+        """
+        columns = ", ".join(["parser_type", "kind", *_COLUMNS.values()])
+        with closing(self._connect()) as connection, connection:
+            if connection.execute(
+                "SELECT 1 FROM uploads WHERE user_id = ? AND content_hash = ?",
+                (user_id, content_hash),
+            ).fetchone():
+                return 0
+            source = connection.execute(
+                "SELECT id FROM uploads WHERE content_hash = ? LIMIT 1", (content_hash,)
+            ).fetchone()
+            if source is None:
+                return 0
+            if log_id is not None:
+                connection.execute(
+                    "DELETE FROM uploads WHERE user_id = ? AND log_id = ?",
+                    (user_id, log_id),
+                )
+            upload_id = connection.execute(
+                "INSERT INTO uploads (user_id, content_hash, created_at, log_id) "
+                "VALUES (?, ?, ?, ?)",
+                (user_id, content_hash, time.time(), log_id),
+            ).lastrowid
+            return connection.execute(
+                f"INSERT INTO benchmark_rows (upload_id, user_id, {columns}) "
+                f"SELECT ?, ?, {columns} FROM benchmark_rows WHERE upload_id = ?",
+                (upload_id, user_id, source[0]),
+            ).rowcount
+
+    def applications(self, user_id: int) -> List[Dict[str, Any]]:
+        """Приложения пользователя: число прогонов и период"""
+        with closing(self._connect()) as connection:
+            rows = connection.execute(
+                "SELECT application, COUNT(*), MIN(date), MAX(date) FROM benchmark_rows"
+                " WHERE user_id = ? AND kind = ?"
+                " GROUP BY application ORDER BY application",
+                (user_id, RAW),
+            ).fetchall()
+        return [
+            {"application": app, "runs": runs, "date_from": first, "date_to": last}
+            for app, runs, first, last in rows
+        ]
+
+    def load_schema(self, user_id: int) -> Optional[Dict[str, str]]:
+        """Сохраненная схема колонок пользователя (см. parsers.schema) или None"""
+        with closing(self._connect()) as connection:
+            row = connection.execute(
+                "SELECT mapping FROM user_schemas WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def save_schema(self, user_id: int, mapping: Optional[Dict[str, str]]) -> None:
+        """Сохраняет схему колонок пользователя; None удаляет сохраненную схему"""
+        with closing(self._connect()) as connection, connection:
+            if mapping is None:
+                connection.execute(
+                    "DELETE FROM user_schemas WHERE user_id = ?", (user_id,)
+                )
+            else:
+                connection.execute(
+                    "INSERT OR REPLACE INTO user_schemas (user_id, mapping, updated_at)"
+                    " VALUES (?, ?, ?)",
+                    (user_id, json.dumps(mapping, ensure_ascii=False), time.time()),
+                )
+
+    def query(
+        self,
+        user_id: int,
+        application: Optional[str] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None,
+        kind: str = RAW,
+    ) -> "pd.DataFrame":
+        """
+        Строки пользователя в канонической схеме с колонкой parser_type.
+        Даты - строки YYYY-MM-DD, границы периода включаются.
+        """
+        conditions = ["user_id = ?", "kind = ?"]
+        params: List[Any] = [user_id, kind]
+        if application is not None:
+            conditions.append("application = ?")
+            params.append(application)
+        if date_from is not None:
+            conditions.append("date >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("date <= ?")
+            params.append(date_to)
+
+        columns = ", ".join(f'{column} AS "{name}"' for name, column in _COLUMNS.items())
+        sql = (
+            f"SELECT parser_type, {columns} FROM benchmark_rows "
+            f"WHERE {' AND '.join(conditions)} ORDER BY date, time"
+        )
+        import pandas as pd
+
+        with closing(self._connect()) as connection:
+            df = pd.read_sql_query(sql, connection, params=params)
+        df["Date"] = pd.to_datetime(df["Date"])
+        # Колонки, которых не было в сохраненных данных, не возвращаются
+        if not df.empty:
+            df = df.dropna(axis=1, how="all")
+        return df
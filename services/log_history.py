@@ -0,0 +1,203 @@
+"""
+Инкрементальный разбор дописываемых журналов (MSI Afterburner пишет в один benchmark.txt).
+Для каждого пользователя запоминаются обработанная длина файла и отпечаток этой части.
+Если новый файл продолжает ранее виденный, разбирается только дописанная часть.
+
+Уже разобранные строки хранятся не в памяти бота, а в файлах каталога хранилища:
+рабочий процесс сам читает их (resume_rows) и дописывает новые завершенные
+блоки (append_rows), поэтому строки не передаются между процессами. Хранилище
+помнит не больше max_users пользователей: давно не присылавшие журналы
+забываются вместе с файлами. pandas нужен только функциям рабочего процесса
+и импортируется в них.
+"""
+
+import hashlib
+import os
+import pickle
+import shutil
+import uuid
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from parsers.source import read_range, source_size
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Размер окон в начале и в конце обработанной части, по которым строится отпечаток
+PREFIX_WINDOW = 64 * 1024
+
+# Сколько разных журналов помнить для одного пользователя
+MAX_LOGS_PER_USER = 4
+
+# Сколько пользователей помнить по умолчанию
+MAX_USERS = 256
+
+# Расширение файлов со строками журналов
+ROWS_SUFFIX = ".rows"
+
+
+def prefix_digest(source, offset: int) -> str:
+    """
+    Отпечаток первых offset байт файла: длина и SHA-256 окон в начале и в конце этой части.
+    Стоимость не зависит от размера файла, при этом дописывание в конец журнала
+    не меняет отпечаток, а подмена файла почти наверняка его меняет.
+    """
+    digest = hashlib.sha256(str(offset).encode("ascii"))
+    digest.update(read_range(source, 0, min(PREFIX_WINDOW, offset)))
+    digest.update(read_range(source, max(0, offset - PREFIX_WINDOW), offset))
+    return digest.hexdigest()
+
+
+def read_rows(path: str) -> "pd.DataFrame":
+    """Строки журнала из файла хранилища: DataFrame, дописанные append_rows"""
+    from parsers.canonical import concat_frames
+
+    frames = []
+    with open(path, "rb") as f:
+        while True:
+            try:
+                frames.append(pickle.load(f))
+            except EOFError:
+                break
+    return concat_frames(frames)
+
+
+def resume_rows(path: str, previous: Optional[str]) -> Optional["pd.DataFrame"]:
+    """
+    Начинает файл строк path следующего состояния журнала с копии файла previous
+    и возвращает ранее разобранные строки. None, если файла previous уже нет
+    (журнал забыт или заменен другой загрузкой): path остается пустым,
+    и журнал нужно разобрать с начала.
+    """
+    if previous is not None:
+        try:
+            shutil.copyfile(previous, path)
+            return read_rows(path)
+        except (OSError, pickle.UnpicklingError):
+            pass
+    open(path, "wb").close()
+    if previous is not None:
+        return None
+    import pandas as pd
+
+    return pd.DataFrame()
+
+
+def append_rows(path: str, completed: "pd.DataFrame") -> None:
+    """Дописывает завершенные строки в файл строк журнала (прежние не перечитываются)"""
+    if not completed.empty:
+        with open(path, "ab") as f:
+            pickle.dump(completed, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def remove_stale_rows(directory: str) -> int:
+    """
+    Удаляет файлы строк прошлого запуска бота (состояния журналов хранятся
+    только в памяти процесса). Вызывается один раз при запуске, до обработки
+    файлов: хранилище само файлы каталога не удаляет. Возвращает число файлов.
+    """
+    if not os.path.isdir(directory):
+        return 0
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.name.endswith(ROWS_SUFFIX):
+            _remove(entry.path)
+            removed += 1
+    return removed
+
+
+class AppendedLogStore:
+    """Состояние ранее обработанных дописываемых журналов по пользователям"""
+
+    def __init__(
+        self,
+        directory: str,
+        max_logs_per_user: int = MAX_LOGS_PER_USER,
+        max_users: int = MAX_USERS,
+    ):
+        self.directory = directory
+        self.max_logs_per_user = max_logs_per_user
+        self.max_users = max(1, max_users)
+        # Пользователь -> список состояний {"offset", "digest", "path", "log_id"},
+        # последние в конце; порядок пользователей - от давних к недавним
+        self._states: "OrderedDict[int, List[Dict[str, Any]]]" = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def find(self, user_id: int, source, size: int) -> Optional[Dict[str, Any]]:
+        """Состояние журнала, продолжением которого является файл, или None"""
+        for state in reversed(self._states.get(user_id, [])):
+            if state["offset"] <= size and state["digest"] == prefix_digest(
+                source, state["offset"]
+            ):
+                return state
+        return None
+
+    def lookup(self, user_id: int, source) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Состояние журнала, продолжением которого является файл, и смещение,
+        с которого нужно продолжить разбор (0, если журнал не найден)
+        """
+        state = self.find(user_id, source, source_size(source))
+        if user_id in self._states:
+            self._states.move_to_end(user_id)
+        return state, (state["offset"] if state is not None else 0)
+
+    @staticmethod
+    def log_id(state: Optional[Dict[str, Any]]) -> str:
+        """Идентификатор журнала: его продолжение сохраняет идентификатор state"""
+        return state["log_id"] if state is not None else uuid.uuid4().hex
+
+    def new_path(self, user_id: int) -> str:
+        """Путь для файла строк следующего состояния журнала (см. resume_rows)"""
+        name = f"{user_id}-{uuid.uuid4().hex}{ROWS_SUFFIX}"
+        return os.path.join(self.directory, name)
+
+    def commit(
+        self,
+        user_id: int,
+        source,
+        state: Optional[Dict[str, Any]],
+        path: str,
+        resume: int,
+        log_id: Optional[str] = None,
+    ) -> None:
+        """
+        Сохраняет результат разбора дописанной части: path - файл со всеми
+        завершенными строками журнала (заменяет файл состояния state),
+        следующий разбор начнется с resume. log_id - идентификатор журнала
+        (см. log_id); по умолчанию берется из state.
+        """
+        if log_id is None:
+            log_id = self.log_id(state)
+        states = self._states.pop(user_id, [])
+        if state is not None and any(other is state for other in states):
+            states = [other for other in states if other is not state]
+            _remove(state["path"])
+        states.append(
+            {
+                "offset": resume,
+                "digest": prefix_digest(source, resume),
+                "path": path,
+                "log_id": log_id,
+            }
+        )
+        for evicted in states[: -self.max_logs_per_user]:
+            _remove(evicted["path"])
+        self._states[user_id] = states[-self.max_logs_per_user :]
+
+        while len(self._states) > self.max_users:
+            _, evicted = self._states.popitem(last=False)
+            for other in evicted:
+                _remove(other["path"])
+
+    def discard(self, path: str) -> None:
+        """Удаляет файл строк неудачного или отмененного разбора"""
+        _remove(path)
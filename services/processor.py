@@ -1,113 +1,725 @@
-from typing import Dict, Any, List
-import pandas as pd
-from parsers import get_parser, detect_parser_type
+"""
+Сервис обработки benchmark файлов.
 
+Ресурсоемкая часть (определение формата, разбор, обработка данных и генерация
+отчетов) выполняется в пуле процессов функциями run_file_pipeline,
+run_parse_pipeline и run_batch_report_pipeline, поэтому цикл событий бота
+продолжает отвечать на команды, пока обрабатываются тяжелые файлы. Файлы пакета
+разбираются параллельно, данные пакета обрабатываются и сводятся в отчет
+одной задачей. В основной процесс возвращаются только готовые отчеты (bytes),
+статистика и счетчики. Число процессов и максимум
+одновременно выполняемых задач задаются PIPELINE_WORKERS и PIPELINE_MAX_IN_FLIGHT.
+Результаты кэшируются по содержимому файлов (см. services.result_cache).
+pandas и модули обработки данных импортируются в функциях рабочих процессов,
+поэтому импорт сервиса при запуске бота их не загружает.
+"""
 
-class BenchmarkProcessor:
-    """Сервис для обработки benchmark файлов"""
+import asyncio
+import functools
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, timedelta
+from typing import TYPE_CHECKING, Dict, Any, List, Optional, Sequence, Tuple
+from parsers import get_parser, detect_file, load_parser_class
+from parsers.source import as_buffer, is_path
+from services.log_history import AppendedLogStore
+from services.history_store import HistoryStore
+from services.result_cache import ResultCache, batch_digest, content_digest, result_key
+from config.settings import (
+    PIPELINE_WORKERS,
+    PIPELINE_MAX_IN_FLIGHT,
+    RESULT_CACHE_MEMORY_BYTES,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_DISK_BYTES,
+    HISTORY_DB_PATH,
+    APPENDED_LOG_DIR,
+    APPENDED_LOG_MAX_USERS,
+    TEMP_DIR,
+)
 
-    async def process_files(
-        self, file_paths: List[str], parser_type: str = None
-    ) -> Dict[str, Any]:
-        """
-        Обработка нескольких benchmark файлов и объединение результатов
-        """
-        try:
-            all_dataframes = []
-            parser_types = []
+if TYPE_CHECKING:
+    import pandas as pd
 
-            # Обрабатываем все файлы
-            for file_path in file_paths:
-                # Определяем тип парсера если не указан
-                if not parser_type:
-                    with open(file_path, "r", encoding="utf-8") as f:
-                        content = f.read()
-                    detected_parser_type = detect_parser_type(content)
-                else:
-                    detected_parser_type = parser_type
+logger = logging.getLogger(__name__)
 
-                parser_types.append(detected_parser_type)
 
-                # Получаем парсер
-                parser = get_parser(detected_parser_type)
+def save_history(
+    history: Optional[Dict[str, Any]], groups: List[Tuple[str, Dict[str, Any]]]
+) -> None:
+    """
+    Сохранение обработанных данных в историю (см. services.history_store).
+    history - {"path", "user_id", "content_hash"} и необязательный "log_id"
+    (см. HistoryStore.save) или None. Ошибка записи истории не прерывает обработку.
+    """
+    if history is None:
+        return
+    try:
+        HistoryStore(history["path"]).save(
+            history["user_id"],
+            history["content_hash"],
+            groups,
+            log_id=history.get("log_id"),
+        )
+    except Exception as e:
+        logger.warning(f"Не удалось сохранить историю: {e}")
 
-                # Парсим файл
-                df = parser.parse_file(file_path)
-                all_dataframes.append(df)
 
-            if not all_dataframes:
-                raise ValueError("Не удалось извлечь данные из файлов")
+def run_file_pipeline(
+    file_path,
+    parser_type: str = None,
+    metrics: str = None,
+    schema: Dict[str, str] = None,
+    prefix: Optional[bytes] = None,
+    appended: Optional[Dict[str, Any]] = None,
+    history: Optional[Dict[str, Any]] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Обработка одного файла в рабочем процессе (параметры см. BenchmarkProcessor.process_file).
+    appended - {"start", "previous", "path"}: разобрать журнал с байта start
+    и дополнить ранее разобранными строками из файла previous (None - строк нет);
+    все завершенные строки записываются в файл path, в результате есть ключ
+    "appended" {"resume"} для обновления AppendedLogStore в основном процессе
+    (см. services.log_history).
+    history - куда сохранить обработанные данные (см. save_history).
+    workers - сколько процессов парсер может занять для параллельного разбора
+    (см. BaseParser.parallel_workers).
+    """
+    import pandas as pd
 
-            # Объединяем все данные в один DataFrame
-            combined_df = pd.concat(all_dataframes, ignore_index=True)
+    from parsers.canonical import concat_frames
+    from services.log_history import append_rows, resume_rows
 
-            # Используем парсер первого файла для дальнейшей обработки
-            first_parser_type = parser_types[0] if parser_types else "custom"
-            parser = get_parser(first_parser_type)
+    try:
+        # Определяем тип парсера по началу файла, если он не указан
+        if not parser_type:
+            parser_type, prefix = detect_file(file_path)
 
-            # Обрабатываем объединенные данные
-            processed_data = parser.process_data(combined_df)
+        # Получаем парсер
+        parser = get_parser(
+            parser_type, metrics=metrics, schema=schema, workers=workers
+        )
 
-            # Генерируем отчеты
-            reports = parser.generate_reports(processed_data)
+        # Парсим файл
+        new_count = None
+        if appended is not None:
+            start = appended["start"]
+            rows = resume_rows(appended["path"], appended["previous"])
+            if rows is None:
+                # Ранее разобранных строк уже нет: журнал разбирается целиком
+                rows, start = pd.DataFrame(), 0
+            completed, pending, resume = parser.parse_appended(file_path, start)
+            append_rows(appended["path"], completed)
+            df = concat_frames([rows, completed, pending])
+            new_count = len(completed) + len(pending)
+        else:
+            df = parser.parse_file(file_path, prefix=prefix)
 
-            return {
-                "success": True,
-                "parser_type": first_parser_type,
-                "reports": reports,
+        if df.empty:
+            raise ValueError("Не удалось извлечь данные из файла")
+
+        # Обрабатываем данные
+        processed_data = parser.process_data(df)
+        save_history(history, [(parser_type, processed_data)])
+
+        # Генерируем отчеты
+        reports = parser.generate_reports(processed_data)
+
+        result = {
+            "success": True,
+            "parser_type": parser_type,
+            "reports": reports,
+            "stats": processed_data["stats"],
+            "raw_count": len(processed_data["raw_data"]),
+            "processed_count": len(processed_data["processed_data"]),
+            "new_count": new_count,
+            "dialect": getattr(parser, "dialect_description", None),
+            "mapping": getattr(parser, "mapping", None),
+            "xlsx_filename": f"benchmark_{parser_type}_results.xlsx",
+            "csv_filename": f"benchmark_{parser_type}_results.csv",
+        }
+        if appended is not None:
+            result["appended"] = {"resume": resume}
+        return result
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "parser_type": parser_type or "unknown",
+        }
+
+
+def run_parse_pipeline(
+    file_path,
+    parser_type: str = None,
+    metrics: str = None,
+    schema: Dict[str, str] = None,
+    data_path: str = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Разбор одного файла пакета в рабочем процессе без обработки и отчетов.
+    Разобранные данные записываются в файл data_path, откуда их читает задача
+    отчета пакета (run_batch_report_pipeline): в основной процесс они не передаются.
+    workers - как в run_file_pipeline.
+    Возвращает {"success", "parser_type", "path", "rows"}
+    или {"success": False, "error"}.
+    """
+    try:
+        # Определяем тип парсера по началу файла, если он не указан
+        prefix = None
+        if not parser_type:
+            parser_type, prefix = detect_file(file_path)
+
+        parser = get_parser(
+            parser_type, metrics=metrics, schema=schema, workers=workers
+        )
+        df = parser.parse_file(file_path, prefix=prefix)
+        if df.empty:
+            raise ValueError("Не удалось извлечь данные из файла")
+
+        with open(data_path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        return {
+            "success": True,
+            "parser_type": parser_type,
+            "path": data_path,
+            "rows": len(df),
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "parser_type": parser_type or "unknown",
+        }
+
+
+def _load_frames(paths: List[str]) -> List["pd.DataFrame"]:
+    """Данные файлов пакета, записанные run_parse_pipeline"""
+    frames = []
+    for path in paths:
+        with open(path, "rb") as f:
+            frames.append(pickle.load(f))
+    return frames
+
+
+def _process_group(
+    parser_type: str,
+    paths: List[str],
+    metrics: Optional[str],
+    schema: Optional[Dict[str, str]],
+) -> Dict[str, Any]:
+    """Обработка объединенных данных файлов одного формата пакета"""
+    from parsers.canonical import concat_frames
+
+    parser = get_parser(parser_type, metrics=metrics, schema=schema)
+    return {
+        "parser": parser,
+        "parser_type": parser_type,
+        "files_count": len(paths),
+        "processed_data": parser.process_data(concat_frames(_load_frames(paths))),
+    }
+
+
+def _combined_result(groups: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Отчеты и сводка пакета из файлов разных форматов (см. parsers.combined_report)"""
+    from parsers.combined_report import generate_combined_reports
+
+    reports = generate_combined_reports(
+        groups, {group["parser_type"]: group["parser"] for group in groups}
+    )
+    summary = [
+        {
+            "parser_type": group["parser_type"],
+            "files_count": group["files_count"],
+            "raw_count": len(group["processed_data"]["raw_data"]),
+            "processed_count": len(group["processed_data"]["processed_data"]),
+            "stats": group["processed_data"]["stats"],
+        }
+        for group in groups
+    ]
+    # Средний FPS пакета - среднее по форматам, взвешенное числом обработанных записей
+    weighted = [
+        (group["stats"]["avg_framerate"], group["processed_count"])
+        for group in summary
+        if group["stats"].get("avg_framerate") is not None
+    ]
+    total_weight = sum(weight for _, weight in weighted)
+    stats = {
+        "total_records": sum(group["raw_count"] for group in summary),
+        "avg_framerate": sum(value * weight for value, weight in weighted)
+        / total_weight
+        if total_weight
+        else 0,
+    }
+    return {
+        "parser_type": "mixed",
+        "reports": reports,
+        "stats": stats,
+        "groups": summary,
+        "raw_count": stats["total_records"],
+        "processed_count": sum(group["processed_count"] for group in summary),
+    }
+
+
+def run_batch_report_pipeline(
+    groups: List[Tuple[str, List[str]]],
+    metrics: str = None,
+    schema: Dict[str, str] = None,
+    history: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """
+    Обработка данных пакета и генерация отчетов в одном рабочем процессе:
+    в основной процесс возвращаются только отчеты, статистика и счетчики.
+    groups - (формат, файлы данных run_parse_pipeline) в порядке загрузки.
+    Для одного формата строится отчет этого формата, для нескольких - общий отчет
+    (parser_type "mixed", сведения по форматам в "groups"). Форматы, которые
+    не удалось обработать, перечисляются в "failures" и не прерывают
+    обработку остальных.
+    """
+    failures = []
+    parser_type = groups[0][0] if len(groups) == 1 else "mixed"
+    try:
+        if len(groups) == 1:
+            ((group_type, paths),) = groups
+            group = _process_group(group_type, paths, metrics, schema)
+            processed_data = group["processed_data"]
+            save_history(history, [(group_type, processed_data)])
+            result = {
+                "parser_type": group_type,
+                "reports": group["parser"].generate_reports(processed_data),
                 "stats": processed_data["stats"],
                 "raw_count": len(processed_data["raw_data"]),
                 "processed_count": len(processed_data["processed_data"]),
-                "xlsx_filename": f"benchmark_combined_results.xlsx",
-                "csv_filename": f"benchmark_combined_results.csv",
             }
+        else:
+            processed = []
+            for group_type, paths in groups:
+                try:
+                    processed.append(
+                        _process_group(group_type, paths, metrics, schema)
+                    )
+                except Exception as e:
+                    failures.append(
+                        {"file": f"{group_type} ({len(paths)})", "error": str(e)}
+                    )
+            if not processed:
+                raise ValueError("Не удалось обработать данные ни одного формата")
+            save_history(
+                history,
+                [
+                    (group["parser_type"], group["processed_data"])
+                    for group in processed
+                ],
+            )
+            result = _combined_result(processed)
 
-        except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "parser_type": parser_type or "unknown",
-            }
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "parser_type": parser_type,
+            "failures": failures,
+        }
 
-    async def process_file(
-        self, file_path: str, parser_type: str = None
+    result.update(
+        success=True,
+        failures=failures,
+        xlsx_filename="benchmark_combined_results.xlsx",
+        csv_filename="benchmark_combined_results.csv",
+    )
+    return result
+
+
+def run_history_report_pipeline(
+    path: str,
+    user_id: int,
+    application: Optional[str] = None,
+    date_from: Optional[str] = None,
+    metrics: str = None,
+) -> Dict[str, Any]:
+    """
+    Отчет по сохраненной истории пользователя без разбора файлов: разобранные строки
+    за период заново усредняются (aggregate_benchmarks) отдельно для каждого формата.
+    """
+    import pandas as pd
+
+    from parsers.aggregation import aggregate_benchmarks, benchmark_stats
+    from parsers.combined_report import generate_combined_reports
+
+    try:
+        started = time.perf_counter()
+        rows = HistoryStore(path).query(user_id, application, date_from)
+        query_ms = (time.perf_counter() - started) * 1000
+        if rows.empty:
+            raise ValueError("В истории нет данных за выбранный период")
+
+        groups = []
+        for parser_type, frame in rows.groupby("parser_type", sort=False):
+            raw = frame.drop(columns="parser_type").reset_index(drop=True)
+            processed = aggregate_benchmarks(raw)
+            groups.append(
+                {
+                    "parser_type": parser_type,
+                    "files_count": 0,
+                    "processed_data": {
+                        "raw_data": raw,
+                        "processed_data": processed,
+                        "stats": benchmark_stats(processed),
+                    },
+                }
+            )
+
+        parsers = {
+            group["parser_type"]: get_parser(group["parser_type"], metrics=metrics)
+            for group in groups
+        }
+        if len(groups) == 1:
+            group = groups[0]
+            reports = parsers[group["parser_type"]].generate_reports(
+                group["processed_data"]
+            )
+        else:
+            reports = generate_combined_reports(groups, parsers)
+
+        return {
+            "success": True,
+            "parser_type": "+".join(group["parser_type"] for group in groups),
+            "reports": reports,
+            "stats": benchmark_stats(
+                pd.concat(
+                    [group["processed_data"]["processed_data"] for group in groups],
+                    ignore_index=True,
+                )
+            ),
+            "raw_count": len(rows),
+            "processed_count": sum(
+                len(group["processed_data"]["processed_data"]) for group in groups
+            ),
+            "query_ms": query_ms,
+            "xlsx_filename": "benchmark_history_results.xlsx",
+            "csv_filename": "benchmark_history_results.csv",
+        }
+
+    except Exception as e:
+        return {"success": False, "error": str(e), "parser_type": "history"}
+
+
+def _source_name(source, index: int) -> str:
+    """Имя файла пакета для сообщений об ошибках"""
+    if is_path(source):
+        return os.path.basename(source)
+    return f"файл {index + 1}"
+
+
+def _transferable(source):
+    """Источник, который можно передать в рабочий процесс: путь или bytes"""
+    source = as_buffer(source)
+    if is_path(source) or isinstance(source, bytes):
+        return source
+    return bytes(source)
+
+
+class BenchmarkProcessor:
+    """Сервис для обработки benchmark файлов"""
+
+    def __init__(
+        self,
+        workers: int = PIPELINE_WORKERS,
+        max_in_flight: int = PIPELINE_MAX_IN_FLIGHT,
+        cache: Optional[ResultCache] = None,
+        history_path: Optional[str] = HISTORY_DB_PATH,
+    ):
+        # Ранее обработанные дописываемые журналы пользователей
+        self.log_history = AppendedLogStore(
+            APPENDED_LOG_DIR, max_users=APPENDED_LOG_MAX_USERS
+        )
+        # Готовые результаты по содержимому файлов
+        self.cache = cache or ResultCache(
+            RESULT_CACHE_MEMORY_BYTES, RESULT_CACHE_DIR, RESULT_CACHE_DISK_BYTES
+        )
+        # История обработанных данных; рабочие процессы пишут в ту же базу
+        self.history = HistoryStore(history_path) if history_path else None
+        # Схемы колонок пользователей; хранятся в базе истории, если она ведется,
+        # здесь - прочитанные из базы (None - схемы нет)
+        self._schemas: Dict[int, Optional[Dict[str, str]]] = {}
+        # Пул процессов создается при первой задаче; при workers <= 0 задачи
+        # выполняются в стандартном пуле потоков цикла событий
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # Ограничение числа задач, одновременно отправленных в пул
+        self._in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        # Число задач, отправленных в пул и еще не завершенных
+        self._active = 0
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def _free_workers(self) -> int:
+        """
+        Сколько процессов может занять парсер задачи, которая сейчас запускается:
+        ее место в пуле и места, не занятые другими задачами. Одиночный большой
+        файл разбирается параллельно, а при загруженном пуле - последовательно
+        """
+        if self.workers <= 0:
+            return 1
+        return max(1, self.workers - self._active)
+
+    async def _run(
+        self, func, *args, parallel: bool = False, **kwargs
     ) -> Dict[str, Any]:
         """
-        Обработка одного benchmark файла
+        Выполнение функции обработки в пуле, не блокируя цикл событий.
+        parallel - функция принимает workers (см. _free_workers).
+        Отмена не останавливает уже начатую работу в процессе пула, поэтому
+        место в пуле освобождается (и отмена передается дальше) только после
+        ее завершения: иначе отмененные задачи превышали бы лимит _in_flight,
+        а вызывающий удалял бы файлы, которые рабочий процесс еще пишет
         """
-        try:
-            # Определяем тип парсера если не указан
-            if not parser_type:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                parser_type = detect_parser_type(content)
+        async with self._in_flight:
+            if parallel:
+                kwargs["workers"] = self._free_workers()
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._get_pool(), functools.partial(func, *args, **kwargs)
+            )
+            self._active += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                while not future.done():
+                    try:
+                        await asyncio.wait((future,))
+                    except asyncio.CancelledError:
+                        pass
+                if not future.cancelled():
+                    # Результат отмененной работы не нужен
+                    future.exception()
+                raise
+            except BrokenProcessPool:
+                # Рабочий процесс аварийно завершился; следующая задача создаст новый пул
+                self._pool = None
+                return {
+                    "success": False,
+                    "error": "Процесс обработки аварийно завершился",
+                    "parser_type": kwargs.get("parser_type") or "unknown",
+                }
+            finally:
+                self._active -= 1
 
-            # Получаем парсер
-            parser = get_parser(parser_type)
+    async def _cache_key(
+        self,
+        sources: List[Any],
+        parser_type: Optional[str],
+        metrics: Optional[str],
+        schema: Optional[Dict[str, str]],
+    ) -> Tuple[str, str]:
+        """
+        Ключ кэша результатов и отпечаток содержимого загрузки;
+        отпечатки файлов вычисляются вне цикла событий
+        """
+        digests = await asyncio.to_thread(
+            lambda: [content_digest(source) for source in sources]
+        )
+        return result_key(digests, parser_type, metrics, schema), batch_digest(digests)
 
-            # Парсим файл
-            df = parser.parse_file(file_path)
+    def _history_target(
+        self, user_id: Optional[int], content_hash: str
+    ) -> Optional[Dict[str, Any]]:
+        """Куда рабочему процессу сохранить данные загрузки (см. save_history)"""
+        if self.history is None or user_id is None:
+            return None
+        return {
+            "path": self.history.path,
+            "user_id": user_id,
+            "content_hash": content_hash,
+        }
 
-            if df.empty:
-                raise ValueError("Не удалось извлечь данные из файла")
+    async def _cached(
+        self,
+        key: str,
+        user_id: Optional[int],
+        content_hash: str,
+        log_id: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Результат из кэша; если загрузку уже обработал другой пользователь,
+        ее строки копируются в историю этого пользователя (log_id - см.
+        HistoryStore.save).
+        В цикле событий выполняется только поиск в памяти, диск читается в потоке
+        """
+        cached = self.cache.get_memory(key)
+        if cached is None:
+            cached = await asyncio.to_thread(self.cache.get_disk, key)
+        if cached is not None and self._history_target(user_id, content_hash):
+            await asyncio.to_thread(
+                self.history.copy_upload, user_id, content_hash, log_id
+            )
+        return cached
 
-            # Обрабатываем данные
-            processed_data = parser.process_data(df)
+    async def _cache_put(self, key: str, result: Dict[str, Any]) -> None:
+        """Сохранение результата: в память сразу, на диск - в потоке"""
+        self.cache.remember(key, result)
+        await asyncio.to_thread(self.cache.store, key, result)
 
-            # Генерируем отчеты
-            reports = parser.generate_reports(processed_data)
+    def shutdown(self) -> None:
+        """Останавливает пул процессов"""
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
 
+    async def process_files(
+        self,
+        file_paths: Sequence[str],
+        parser_type: str = None,
+        metrics: str = None,
+        schema: Dict[str, str] = None,
+        user_id: int = None,
+    ) -> Dict[str, Any]:
+        """
+        Обработка нескольких benchmark файлов и объединение результатов.
+        Файлы разбираются параллельно в пуле, данные объединяются в порядке загрузки.
+        Если в пакете несколько форматов, каждый формат обрабатывается отдельно,
+        а отчет содержит листы каждого формата и сводный лист (parser_type "mixed",
+        сведения по форматам в "groups").
+        Файлы, которые не удалось разобрать, перечисляются в "failures"
+        ({"file", "error"}) и не прерывают обработку остальных.
+        metrics - имя набора перцентильных метрик отчета (см. parsers.percentiles)
+        schema - сохраненная схема колонок пользовательских файлов (см. parsers.schema)
+        user_id - если задан, обработанные данные сохраняются в историю пользователя
+        """
+        file_paths = [_transferable(file_path) for file_path in file_paths]
+        key, content_hash = await self._cache_key(
+            file_paths, parser_type, metrics, schema
+        )
+        history = self._history_target(user_id, content_hash)
+        cached = await self._cached(key, user_id, content_hash)
+        if cached is not None:
+            return dict(cached, cached=True)
+
+        # Разобранные данные файлов передаются между задачами через временный каталог
+        batch_dir = tempfile.mkdtemp(prefix="batch-", dir=TEMP_DIR)
+        try:
+            result = await self._process_batch(
+                file_paths, batch_dir, parser_type, metrics, schema, history
+            )
+        finally:
+            await asyncio.to_thread(shutil.rmtree, batch_dir, True)
+
+        if result["success"]:
+            await self._cache_put(key, result)
+        return result
+
+    async def _process_batch(
+        self,
+        file_paths: List[Any],
+        batch_dir: str,
+        parser_type: Optional[str],
+        metrics: Optional[str],
+        schema: Optional[Dict[str, str]],
+        history: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Параллельный разбор файлов пакета с записью данных в batch_dir и отчет
+        по записанным данным; в основном процессе остаются только пути и счетчики
+        """
+        parsed = await asyncio.gather(
+            *(
+                self._run(
+                    run_parse_pipeline,
+                    file_path,
+                    parallel=True,
+                    parser_type=parser_type,
+                    metrics=metrics,
+                    schema=schema,
+                    data_path=os.path.join(batch_dir, f"{index}.pickle"),
+                )
+                for index, file_path in enumerate(file_paths)
+            )
+        )
+
+        failures = [
+            {"file": _source_name(file_path, index), "error": result["error"]}
+            for index, (file_path, result) in enumerate(zip(file_paths, parsed))
+            if not result["success"]
+        ]
+        succeeded = [result for result in parsed if result["success"]]
+        if not succeeded:
+            errors = "; ".join(f"{f['file']}: {f['error']}" for f in failures)
             return {
-                "success": True,
-                "parser_type": parser_type,
-                "reports": reports,
-                "stats": processed_data["stats"],
-                "raw_count": len(processed_data["raw_data"]),
-                "processed_count": len(processed_data["processed_data"]),
-                "xlsx_filename": f"benchmark_{parser_type}_results.xlsx",
-                "csv_filename": f"benchmark_{parser_type}_results.csv",
+                "success": False,
+                "error": f"Не удалось извлечь данные из файлов ({errors})"
+                if errors
+                else "Не удалось извлечь данные из файлов",
+                "parser_type": parser_type or "unknown",
+                "failures": failures,
             }
 
+        # Группируем файлы данных по форматам в порядке загрузки
+        groups: Dict[str, List[str]] = {}
+        for result in succeeded:
+            groups.setdefault(result["parser_type"], []).append(result["path"])
+
+        result = await self._run(
+            run_batch_report_pipeline,
+            list(groups.items()),
+            metrics=metrics,
+            schema=schema,
+            history=history,
+        )
+        result["failures"] = failures + result.get("failures", [])
+        result["files_count"] = len(succeeded)
+        return result
+
+    async def process_file(
+        self,
+        file_path: str,
+        parser_type: str = None,
+        metrics: str = None,
+        user_id: int = None,
+        schema: Dict[str, str] = None,
+        prefix: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        """
+        Обработка одного benchmark файла.
+        metrics - имя набора перцентильных метрик отчета (см. parsers.percentiles)
+        schema - сохраненная схема колонок пользовательских файлов (см. parsers.schema)
+        user_id - если задан, повторно загруженный дописанный журнал разбирается
+        только с места, где закончилась прошлая загрузка этого пользователя,
+        а обработанные данные сохраняются в историю пользователя
+        prefix - начало файла, прочитанное при определении формата (см. parsers.detect_file)
+        """
+        file_path = _transferable(file_path)
+        key, content_hash = await self._cache_key(
+            [file_path], parser_type, metrics, schema
+        )
+        try:
+            # Состояние дописываемых журналов хранится в основном процессе:
+            # в рабочий процесс передаются смещение и файлы строк журнала
+            state, appended = None, None
+            if user_id is not None:
+                if not parser_type:
+                    parser_type, prefix = detect_file(file_path)
+                if hasattr(load_parser_class(parser_type), "parse_appended"):
+                    state, start = self.log_history.lookup(user_id, file_path)
+                    appended = {
+                        "start": start,
+                        "previous": state["path"] if state is not None else None,
+                        "path": self.log_history.new_path(user_id),
+                        "log_id": self.log_history.log_id(state),
+                    }
         except Exception as e:
             return {
                 "success": False,
@@ -115,10 +727,111 @@ class BenchmarkProcessor:
                 "parser_type": parser_type or "unknown",
             }
 
+        # Загрузка дописанного журнала заменяет в истории прежние загрузки журнала
+        log_id = appended["log_id"] if appended is not None else None
+        cached = await self._cached(key, user_id, content_hash, log_id)
+        if cached is not None:
+            # Файл уже обрабатывался: разбор пропускается
+            if appended is not None:
+                self.log_history.discard(appended["path"])
+            return dict(cached, cached=True, new_count=None)
+
+        history = self._history_target(user_id, content_hash)
+        if history is not None and log_id is not None:
+            history["log_id"] = log_id
+
+        committed = False
+        try:
+            result = await self._run(
+                run_file_pipeline,
+                file_path,
+                parallel=True,
+                parser_type=parser_type,
+                metrics=metrics,
+                schema=schema,
+                prefix=prefix,
+                appended=appended,
+                history=history,
+            )
+            if "appended" in result:
+                self.log_history.commit(
+                    user_id,
+                    file_path,
+                    state,
+                    appended["path"],
+                    result.pop("appended")["resume"],
+                    appended["log_id"],
+                )
+                committed = True
+        finally:
+            # Файл строк неудачного или отмененного разбора не нужен
+            if appended is not None and not committed:
+                self.log_history.discard(appended["path"])
+
+        if result["success"]:
+            await self._cache_put(key, result)
+        return result
+
+    async def history_report(
+        self,
+        user_id: int,
+        application: Optional[str] = None,
+        days: Optional[int] = None,
+        metrics: str = None,
+    ) -> Dict[str, Any]:
+        """
+        Отчет по истории пользователя за последние days дней (все время, если не задано)
+        без повторного разбора файлов
+        """
+        if self.history is None:
+            return {
+                "success": False,
+                "error": "История не ведется (HISTORY_DB_PATH не задан)",
+                "parser_type": "history",
+            }
+        date_from = None
+        if days is not None:
+            date_from = (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+        return await self._run(
+            run_history_report_pipeline,
+            self.history.path,
+            user_id,
+            application,
+            date_from,
+            metrics=metrics,
+        )
+
+    async def history_applications(self, user_id: int) -> List[Dict[str, Any]]:
+        """Приложения в истории пользователя (см. HistoryStore.applications)"""
+        if self.history is None:
+            return []
+        return await asyncio.to_thread(self.history.applications, user_id)
+
+    async def get_schema(self, user_id: int) -> Optional[Dict[str, str]]:
+        """Сохраненная схема колонок пользователя (см. parsers.schema) или None"""
+        if user_id not in self._schemas and self.history is not None:
+            self._schemas[user_id] = await asyncio.to_thread(
+                self.history.load_schema, user_id
+            )
+        return self._schemas.get(user_id)
+
+    async def set_schema(
+        self, user_id: int, mapping: Optional[Dict[str, str]]
+    ) -> None:
+        """
+        Сохраняет схему колонок пользователя (None - сбросить). Без базы истории
+        схема хранится только до перезапуска бота
+        """
+        if self.history is not None:
+            await asyncio.to_thread(self.history.save_schema, user_id, mapping)
+        self._schemas[user_id] = mapping
+
+    async def cache_stats(self) -> Dict[str, int]:
+        """Счетчики кэша результатов (см. ResultCache.stats), вне цикла событий"""
+        return await asyncio.to_thread(self.cache.stats)
+
     def get_available_parsers(self) -> Dict[str, str]:
-        """Получение списка доступных парсеров"""
+        """Получение списка доступных парсеров (модули парсеров не импортируются)"""
         from parsers import PARSER_REGISTRY
 
-        return {
-            name: parser.__doc__ or name for name, parser in PARSER_REGISTRY.items()
-        }
+        return PARSER_REGISTRY.descriptions()
@@ -0,0 +1,210 @@
+"""
+Кэш результатов обработки по содержимому файлов.
+
+Ключ строится из SHA-256 содержимого файла (для пакета - из отсортированных
+отпечатков файлов, поэтому порядок загрузки не важен) и параметров обработки.
+Результаты хранятся в памяти (LRU, ограничение по объему отчетов) и копируются
+на диск (LRU по времени последнего обращения, ограничение по объему каталога).
+Повторно присланные файлы не разбираются заново.
+
+Поиск в памяти (get_memory) быстрый и выполняется в цикле событий; обращения
+к диску (get_disk, store, stats) выполняются в отдельном потоке, поэтому
+изменения словаря в памяти защищены блокировкой.
+"""
+
+import hashlib
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from parsers.source import as_buffer, is_path, open_source
+
+# Размер блока при вычислении отпечатка файла
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+
+def content_digest(source) -> str:
+    """SHA-256 содержимого файла или данных в памяти"""
+    source = as_buffer(source)
+    if not is_path(source):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open_source(source) as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def batch_digest(digests: Iterable[str]) -> str:
+    """Отпечаток пакета файлов без учета порядка загрузки"""
+    digests = sorted(digests)
+    if len(digests) == 1:
+        return digests[0]
+    return hashlib.sha256(",".join(digests).encode("ascii")).hexdigest()
+
+
+def result_key(
+    digests: Iterable[str],
+    parser_type: Optional[str] = None,
+    metrics: Optional[str] = None,
+    schema: Optional[Mapping[str, str]] = None,
+) -> str:
+    """Ключ результата: отпечатки файлов без учета порядка и параметры обработки"""
+    parts = [
+        ",".join(sorted(digests)),
+        parser_type or "",
+        metrics or "",
+        ";".join(f"{k}={v}" for k, v in sorted((schema or {}).items())),
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+
+def result_size(result: Dict[str, Any]) -> int:
+    """Объем результата в байтах (учитываются отчеты)"""
+    return sum(len(data) for data in result.get("reports", {}).values())
+
+
+class ResultCache:
+    """Двухуровневый LRU кэш результатов: память и каталог на диске"""
+
+    def __init__(
+        self,
+        memory_max_bytes: int,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.memory_max_bytes = memory_max_bytes
+        self.disk_dir = disk_dir if disk_max_bytes > 0 else None
+        self.disk_max_bytes = disk_max_bytes
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Результат по ключу или None; найденный на диске результат поднимается в память"""
+        result = self.get_memory(key)
+        if result is None:
+            result = self.get_disk(key)
+        return result
+
+    def get_memory(self, key: str) -> Optional[Dict[str, Any]]:
+        """Результат из памяти или None (диск не читается, промах не учитывается)"""
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+            return result
+
+    def get_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        """Результат с диска или None; найденный результат поднимается в память"""
+        result = self._load(key)
+        with self._lock:
+            if result is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, result)
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Сохраняет результат в памяти и на диске"""
+        self.remember(key, result)
+        self.store(key, result)
+
+    def remember(self, key: str, result: Dict[str, Any]) -> None:
+        """Сохраняет результат только в памяти"""
+        with self._lock:
+            self._remember(key, result)
+
+    def store(self, key: str, result: Dict[str, Any]) -> None:
+        """Сохраняет результат только на диске (сериализация и запись файла)"""
+        self._store(key, result)
+
+    def stats(self) -> Dict[str, int]:
+        """Счетчики попаданий и промахов и занятый объем (просматривает каталог)"""
+        disk_bytes = sum(size for _, size, _ in self._disk_entries())
+        with self._lock:
+            return {
+                "hits": self.memory_hits + self.disk_hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_bytes": disk_bytes,
+            }
+
+    def _remember(self, key: str, result: Dict[str, Any]) -> None:
+        size = result_size(result)
+        if size > self.memory_max_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= result_size(self._memory.pop(key))
+        self._memory[key] = result
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= result_size(evicted)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.pickle")
+
+    def _load(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            # Время изменения служит временем последнего обращения для LRU
+            os.utime(path)
+            return result
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+
+    def _store(self, key: str, result: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        data = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) > self.disk_max_bytes:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            return
+        self._evict_disk()
+
+    def _disk_entries(self):
+        """Файлы кэша на диске: (путь, размер, время последнего обращения)"""
+        if not self.disk_dir:
+            return []
+        entries = []
+        for entry in os.scandir(self.disk_dir):
+            if entry.name.endswith(".pickle"):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def _evict_disk(self) -> None:
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
@@ -0,0 +1,201 @@
+"""
+Планировщик задач обработки файлов.
+
+Задачи ставятся в очереди по приоритетам, внутри приоритета у каждого
+пользователя своя очередь, и пользователи обслуживаются по кругу: пользователь,
+приславший сто файлов, не задерживает остальных больше чем на одну задачу.
+Одновременно выполняется не больше max_running задач, суммарный размер
+выполняемых файлов ограничен max_bytes (крупный файл занимает больше).
+Файл крупнее max_bytes запускается, только когда других задач нет.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+# Приоритеты: меньшее значение обслуживается раньше
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+
+# Сколько раз задачу в начале очереди можно обойти ради задач меньшего размера;
+# после этого новые задачи не запускаются, пока она не поместится
+MAX_SKIPS = 8
+
+
+class Job:
+    """Задача планировщика"""
+
+    def __init__(
+        self,
+        user_id: int,
+        factory: Callable[[], Awaitable[Any]],
+        size: int,
+        priority: int,
+    ):
+        self.user_id = user_id
+        self.factory = factory
+        self.size = size
+        self.priority = priority
+        self.submitted = time.monotonic()
+        self.started: Optional[float] = None
+        self.skipped = 0
+        self.cancelled = False
+        self.task: Optional[asyncio.Task] = None
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+    async def wait(self) -> Any:
+        """Результат задачи; None, если задача отменена"""
+        return await self.future
+
+
+class JobScheduler:
+    """Справедливая очередь задач с ограничением числа и размера выполняемых задач"""
+
+    def __init__(self, max_running: int, max_bytes: int):
+        self.max_running = max(1, max_running)
+        self.max_bytes = max_bytes
+        # Приоритет -> пользователь -> очередь задач; порядок пользователей - порядок обхода
+        self._queues: Dict[int, "OrderedDict[int, Deque[Job]]"] = {}
+        self._running: List[Job] = []
+        self._running_bytes = 0
+        self.started_count = 0
+        self.completed_count = 0
+        self.cancelled_count = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def submit(
+        self,
+        user_id: int,
+        factory: Callable[[], Awaitable[Any]],
+        size: int = 0,
+        priority: int = PRIORITY_NORMAL,
+    ) -> Job:
+        """
+        Ставит задачу в очередь. factory - функция без аргументов, возвращающая корутину.
+        Результат ожидается через Job.wait().
+        """
+        job = Job(user_id, factory, size, priority)
+        users = self._queues.setdefault(priority, OrderedDict())
+        users.setdefault(user_id, deque()).append(job)
+        self._dispatch()
+        return job
+
+    def position(self, job: Job) -> int:
+        """Место задачи в очереди (1 - следующая), 0 - задача уже выполняется или завершена"""
+        for index, queued in enumerate(self._order(), start=1):
+            if queued is job:
+                return index
+        return 0
+
+    def cancel(self, user_id: int) -> int:
+        """
+        Отменяет задачи пользователя в очереди и выполняемые; возвращает их число.
+        Ожидающие отмененную задачу сразу получают None, но место выполняемой
+        задачи освобождается, только когда ее корутина действительно завершится
+        """
+        count = 0
+        for users in self._queues.values():
+            for job in users.pop(user_id, ()):
+                self._finish_cancelled(job)
+                count += 1
+        for job in self._running:
+            if job.user_id == user_id and not job.cancelled:
+                self._finish_cancelled(job)
+                job.task.cancel()
+                count += 1
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди, выполняемые задачи и время ожидания"""
+        now = time.monotonic()
+        queued = self._order()
+        return {
+            "queued": len(queued),
+            "queued_users": len({job.user_id for job in queued}),
+            "running": len(self._running),
+            "running_bytes": self._running_bytes,
+            "started": self.started_count,
+            "completed": self.completed_count,
+            "cancelled": self.cancelled_count,
+            "avg_wait": self.total_wait / self.started_count if self.started_count else 0.0,
+            "max_wait": self.max_wait,
+            "oldest_wait": max((now - job.submitted for job in queued), default=0.0),
+        }
+
+    def _order(self) -> List[Job]:
+        """Очередь в порядке запуска без учета ограничений по размеру"""
+        order = []
+        for priority in sorted(self._queues):
+            queues = [list(queue) for queue in self._queues[priority].values()]
+            for depth in range(max((len(queue) for queue in queues), default=0)):
+                order.extend(queue[depth] for queue in queues if depth < len(queue))
+        return order
+
+    def _fits(self, job: Job) -> bool:
+        if len(self._running) >= self.max_running:
+            return False
+        return not self._running or self._running_bytes + job.size <= self.max_bytes
+
+    def _dispatch(self) -> None:
+        """Запускает задачи, пока позволяют ограничения"""
+        while len(self._running) < self.max_running:
+            job = self._next_job()
+            if job is None:
+                return
+            self._start(job)
+
+    def _next_job(self) -> Optional[Job]:
+        """Следующая задача по приоритету и по кругу пользователей, которая помещается"""
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            for user_id, queue in list(users.items()):
+                job = queue[0]
+                if self._fits(job):
+                    queue.popleft()
+                    # Пользователь уходит в конец круга
+                    if queue:
+                        users.move_to_end(user_id)
+                    else:
+                        del users[user_id]
+                    return job
+                job.skipped += 1
+                if job.skipped > MAX_SKIPS:
+                    # Задача слишком долго ждет места: остальные не запускаются
+                    return None
+        return None
+
+    def _start(self, job: Job) -> None:
+        job.started = time.monotonic()
+        wait = job.started - job.submitted
+        self.started_count += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self._running.append(job)
+        self._running_bytes += job.size
+        job.task = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: Job) -> None:
+        try:
+            result = await job.factory()
+        except asyncio.CancelledError:
+            self._finish_cancelled(job)
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            if not job.cancelled:
+                job.future.set_result(result)
+                self.completed_count += 1
+            else:
+                self._finish_cancelled(job)
+        finally:
+            self._running.remove(job)
+            self._running_bytes -= job.size
+            self._dispatch()
+
+    def _finish_cancelled(self, job: Job) -> None:
+        job.cancelled = True
+        if not job.future.done():
+            job.future.set_result(None)
+            self.cancelled_count += 1
@@ -0,0 +1,37 @@
+"""Усреднение прогонов в канонической схеме"""
+
+import pandas as pd
+
+from benchmarks.bench_aggregation import pandas_aggregate, synthetic_runs
+from parsers.aggregation import aggregate_benchmarks
+
+
+def test_matches_pandas_baseline():
+    df = synthetic_runs(20_000)
+    expected = pandas_aggregate(df).reset_index(drop=True)
+    pd.testing.assert_frame_equal(aggregate_benchmarks(df), expected)
+
+
+def test_categorical_keys_match_string_keys():
+    df = synthetic_runs(5_000, seed=7)
+    categorical = df.astype({"Time": "category", "Application": "category"})
+    pd.testing.assert_frame_equal(
+        aggregate_benchmarks(categorical), aggregate_benchmarks(df)
+    )
+
+
+def test_equal_run_times_are_kept():
+    # Все прогоны одинаковой длины: выбросов нет, группы не теряются
+    df = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2024-03-01"] * 3),
+            "Time": ["21:00:00", "21:05:00", "22:00:00"],
+            "Application": ["Game"] * 3,
+            "Frames": [6000, 6200, 6400],
+            "TimeTaken": [60.0, 60.0, 60.0],
+            "AverageFramerate": [100.0, 104.0, 110.0],
+        }
+    )
+    result = aggregate_benchmarks(df)
+    assert result["Time"].tolist() == ["21 h", "22 h"]
+    assert result["AverageFramerate"].tolist() == [102, 110]
@@ -0,0 +1,75 @@
+"""Потоковое чтение CapFrameX JSON"""
+
+import json
+
+import numpy as np
+import pytest
+
+from parsers.capframe_reader import CapFrameReader
+
+
+def capframe_json(runs: int = 2, frames: int = 50) -> bytes:
+    document = {
+        "Hash": "abc",
+        "Info": {"ProcessName": "Game.exe", "CreationDate": "2024-03-01T21:15:00Z"},
+        "Runs": [
+            {
+                "CaptureData": {
+                    "TimeInSeconds": [index / 100 for index in range(frames)],
+                    "MsBetweenPresents": [10.0 + run] * frames,
+                    "Dropped": [False] * frames,
+                    "Comments": ["text"],
+                },
+                "SensorData": {"Nested": [[1, 2], [3]]},
+            }
+            for run in range(runs)
+        ],
+    }
+    return json.dumps(document).encode("utf-8")
+
+
+def read_runs(data: bytes, **options):
+    reader = CapFrameReader(data, **options)
+    runs = list(reader.iter_runs())
+    return reader, runs
+
+
+def test_runs_and_info():
+    reader, runs = read_runs(capframe_json())
+    assert len(runs) == 2
+    assert reader.hash == "abc"
+    assert reader.info["ProcessName"] == "Game.exe"
+    # Нечисловые и вложенные массивы каналами не считаются
+    assert set(runs[0].channels) == {"TimeInSeconds", "MsBetweenPresents", "Dropped"}
+    assert np.array_equal(runs[1].get("MsBetweenPresents"), np.full(50, 11.0))
+    assert runs[0].last("TimeInSeconds") == 0.49
+
+
+def test_bom():
+    _, expected = read_runs(capframe_json())
+    _, runs = read_runs(b"\xef\xbb\xbf" + capframe_json())
+    assert len(runs) == len(expected)
+    assert np.array_equal(
+        runs[0].get("TimeInSeconds"), expected[0].get("TimeInSeconds")
+    )
+
+
+@pytest.mark.parametrize("cut", [0.3, 0.6, 0.99])
+def test_truncated_json(cut):
+    data = capframe_json()
+    with pytest.raises(ValueError):
+        read_runs(data[: int(len(data) * cut)])
+
+
+@pytest.mark.parametrize("chunk_size", [7, 64, 1 << 20])
+def test_decode_while_scanning(chunk_size):
+    data = capframe_json(runs=3, frames=500)
+    _, lazy = read_runs(data, chunk_size=chunk_size)
+    _, decoded = read_runs(
+        data, chunk_size=chunk_size, decode=("MsBetweenPresents",)
+    )
+    for expected, run in zip(lazy, decoded):
+        assert run.spans == expected.spans
+        assert np.array_equal(
+            run.get("MsBetweenPresents"), expected.get("MsBetweenPresents")
+        )
@@ -0,0 +1,104 @@
+"""Разбор журналов MSI Afterburner: восстановление после испорченных блоков,
+параллельный разбор и разбор дописанной части журнала"""
+
+import pandas as pd
+
+from parsers.msi_afterburner_parser import MSIAfterburnerParser
+
+APPLICATIONS = ["Cyberpunk2077.exe", "eldenring.exe", "RDR2.exe"]
+
+
+def msi_block(index: int) -> str:
+    """Блок журнала: заголовок и пять строк статистики"""
+    day = 1 + index // 1440
+    hour, minute = divmod(index % 1440, 60)
+    average = 100 + index % 40
+    return (
+        f"{day:02d}-03-2024, {hour:02d}:{minute:02d}:00 "
+        f"{APPLICATIONS[index % len(APPLICATIONS)]} benchmark completed, "
+        f"{average * 60} frames rendered in {60 + index % 3}.5 s\n"
+        f"                     Average framerate  :  {average}.0 FPS\n"
+        f"                     Minimum framerate  :  {average - 20}.0 FPS\n"
+        f"                     Maximum framerate  :  {average + 20}.0 FPS\n"
+        f"                     1% low framerate   :  {average - 30}.0 FPS\n"
+        f"                     0.1% low framerate :  {average - 40}.0 FPS\n"
+    )
+
+
+def msi_log(count: int, start: int = 0) -> str:
+    return "".join(msi_block(index) for index in range(start, start + count))
+
+
+def parse(tmp_path, text: str, name: str = "benchmark.txt") -> pd.DataFrame:
+    path = tmp_path / name
+    path.write_text(text, encoding="utf-8")
+    return MSIAfterburnerParser(workers=1).parse_file(str(path))
+
+
+def test_parse_blocks(tmp_path):
+    df = parse(tmp_path, msi_log(5))
+    assert len(df) == 5
+    assert df["Application"].astype(str).tolist()[:3] == [
+        "Cyberpunk2077",
+        "eldenring",
+        "RDR2",
+    ]
+    assert df["AverageFramerate"].tolist() == [100, 101, 102, 103, 104]
+    assert df["TimeTaken"].tolist()[:2] == [60.5, 61.5]
+
+
+def test_resync_after_broken_block(tmp_path):
+    # Во втором блоке нет строки статистики, в четвертом - лишняя строка
+    blocks = [msi_block(index) for index in range(6)]
+    lines = blocks[1].splitlines(keepends=True)
+    blocks[1] = "".join(lines[:3] + lines[4:])
+    lines = blocks[3].splitlines(keepends=True)
+    blocks[3] = "".join(lines[:2] + ["garbage line\n"] + lines[2:])
+
+    df = parse(tmp_path, "".join(blocks))
+    assert df["AverageFramerate"].tolist() == [100, 102, 104, 105]
+
+
+def test_small_chunks_match_single_chunk(tmp_path):
+    from parsers.msi_afterburner_parser import read_benchmark_blocks
+
+    data = msi_log(50).encode("utf-8")
+    expected = read_benchmark_blocks([data]).to_frame()
+    chunks = [data[offset : offset + 97] for offset in range(0, len(data), 97)]
+    pd.testing.assert_frame_equal(read_benchmark_blocks(chunks).to_frame(), expected)
+    assert len(expected) == 50
+
+
+def test_parallel_matches_serial(tmp_path):
+    path = tmp_path / "benchmark.txt"
+    path.write_text(msi_log(300), encoding="utf-8")
+    parser = MSIAfterburnerParser(workers=1)
+    serial = parser.parse_file(str(path))
+    parallel = parser._parse_parallel(str(path), workers=2)
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert len(serial) == 300
+
+
+def test_parse_appended_counts(tmp_path):
+    path = tmp_path / "benchmark.txt"
+    parser = MSIAfterburnerParser(workers=1)
+
+    # Последний блок еще дописывается: заголовок и две строки статистики
+    partial = msi_block(10).splitlines(keepends=True)[:3]
+    path.write_text(msi_log(10) + "".join(partial), encoding="utf-8")
+    completed, pending, resume = parser.parse_appended(str(path), 0)
+    assert len(completed) == 10
+    assert len(pending) == 0
+
+    # Блок завершен и дописаны еще пять блоков: разбираются только новые строки
+    path.write_text(msi_log(16), encoding="utf-8")
+    completed, pending, resume = parser.parse_appended(str(path), resume)
+    assert len(completed) == 6
+    assert len(pending) == 0
+    assert completed["AverageFramerate"].tolist()[0] == 110
+    assert resume == path.stat().st_size
+
+    # Без новых данных новых строк нет
+    completed, pending, resume_again = parser.parse_appended(str(path), resume)
+    assert completed.empty and pending.empty
+    assert resume_again == resume
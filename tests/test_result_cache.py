@@ -0,0 +1,59 @@
+"""Двухуровневый кэш результатов: вытеснение из памяти и с диска"""
+
+import os
+import pickle
+
+from services.result_cache import ResultCache
+
+
+def result(size: int) -> dict:
+    return {"reports": {"report.png": b"x" * size}, "summary": "ok"}
+
+
+def test_memory_lru_by_bytes():
+    cache = ResultCache(memory_max_bytes=250)
+    cache.put("a", result(100))
+    cache.put("b", result(100))
+    assert cache.get("a") is not None
+    # "b" давно не запрашивали: он вытесняется первым
+    cache.put("c", result(100))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["memory_bytes"] == 200
+
+
+def test_memory_skips_oversized_result():
+    cache = ResultCache(memory_max_bytes=50)
+    cache.put("a", result(100))
+    assert cache.get("a") is None
+    assert cache.stats()["memory_items"] == 0
+
+
+def test_disk_eviction(tmp_path):
+    # На диске помещаются ровно два результата
+    limit = 2 * len(pickle.dumps(result(300), protocol=pickle.HIGHEST_PROTOCOL))
+    cache = ResultCache(
+        memory_max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=limit
+    )
+    cache.put("a", result(300))
+    cache.put("b", result(300))
+    # Время изменения - время последнего обращения: "a" старше "b"
+    os.utime(tmp_path / "a.pickle", (1, 1))
+    os.utime(tmp_path / "b.pickle", (2, 2))
+
+    cache.put("c", result(300))
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+    assert cache.stats()["disk_bytes"] == limit
+
+
+def test_disk_hit_is_promoted_to_memory(tmp_path):
+    cache = ResultCache(
+        memory_max_bytes=1000, disk_dir=str(tmp_path), disk_max_bytes=1000
+    )
+    cache.store("a", result(100))
+    assert cache.get_memory("a") is None
+    assert cache.get("a") == result(100)
+    assert cache.get_memory("a") == result(100)
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
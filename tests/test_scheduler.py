@@ -0,0 +1,97 @@
+"""Очередь задач: справедливый порядок запуска и отмена"""
+
+import asyncio
+
+from services.scheduler import PRIORITY_HIGH, JobScheduler
+
+
+def test_round_robin_and_priority():
+    async def main():
+        scheduler = JobScheduler(max_running=2, max_bytes=1 << 30)
+        started = []
+
+        def factory(name):
+            async def run():
+                started.append(name)
+                await asyncio.sleep(0.01)
+                return name
+
+            return run
+
+        jobs = [scheduler.submit(1, factory(f"A{index}")) for index in range(6)]
+        jobs += [scheduler.submit(2, factory(f"B{index}")) for index in range(2)]
+        jobs.append(scheduler.submit(3, factory("C0"), priority=PRIORITY_HIGH))
+        # Срочная задача стоит первой, затем пользователи по кругу
+        assert [scheduler.position(job) for job in jobs[2:]][-1] == 1
+        results = await asyncio.gather(*(job.wait() for job in jobs))
+        return started, results, scheduler.stats()
+
+    started, results, stats = asyncio.run(main())
+    assert started == ["A0", "A1", "C0", "A2", "B0", "A3", "B1", "A4", "A5"]
+    assert results[-1] == "C0"
+    assert stats["completed"] == 9 and stats["queued"] == 0
+
+
+def test_size_limit():
+    async def main():
+        scheduler = JobScheduler(max_running=4, max_bytes=100)
+        running = []
+        peak = []
+
+        def factory():
+            async def run():
+                running.append(1)
+                peak.append(len(running))
+                await asyncio.sleep(0.01)
+                running.pop()
+
+            return run
+
+        jobs = [scheduler.submit(user, factory(), size=60) for user in range(4)]
+        await asyncio.gather(*(job.wait() for job in jobs))
+        return max(peak)
+
+    # Две задачи по 60 байт вместе не помещаются в 100 байт
+    assert asyncio.run(main()) == 1
+
+
+def test_cancel_keeps_slot_until_coroutine_ends():
+    async def main():
+        scheduler = JobScheduler(max_running=1, max_bytes=1 << 30)
+        release = asyncio.Event()
+        started = []
+
+        async def stubborn():
+            started.append("A")
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                # Работа в пуле не прерывается: корутина ждет ее завершения
+                await release.wait()
+                raise
+
+        async def quick():
+            started.append("B")
+            return "B"
+
+        first = scheduler.submit(1, stubborn)
+        queued = scheduler.submit(1, stubborn)
+        other = scheduler.submit(2, quick)
+        await asyncio.sleep(0)
+
+        assert scheduler.cancel(1) == 2
+        assert await first.wait() is None
+        assert await queued.wait() is None
+        await asyncio.sleep(0.01)
+        # Место еще занято отмененной задачей
+        assert started == ["A"]
+        assert scheduler.stats()["running"] == 1
+
+        release.set()
+        assert await other.wait() == "B"
+        return started, scheduler.stats()
+
+    started, stats = asyncio.run(main())
+    assert started == ["A", "B"]
+    assert stats["cancelled"] == 2 and stats["completed"] == 1
+    assert stats["running"] == 0
@@ -1,8 +1,9 @@
 import os
 import uuid
+from typing import Union
 from aiogram.types import Document
 from aiogram import Bot
-from config.settings import TEMP_DIR
+from config.settings import TEMP_DIR, MEMORY_UPLOAD_MAX_BYTES
 
 
 async def save_uploaded_file(document: Document, bot: Bot) -> str:
@@ -33,6 +34,58 @@ async def save_uploaded_file(document: Document, bot: Bot) -> str:
     return file_path
 
 
+async def download_to_memory(document: Document, bot: Bot) -> bytes:
+    """
+    Скачивает загруженный файл в память без записи на диск
+
+    Args:
+        document: Документ от Telegram
+        bot: Экземпляр бота
+
+    Returns:
+        bytes: Содержимое файла
+    """
+    buffer = await bot.download(document)
+    # getvalue() отдает внутренний буфер BytesIO без копирования
+    return buffer.getvalue()
+
+
+async def fetch_uploaded_file(document: Document, bot: Bot) -> Union[str, bytes]:
+    """
+    Получает загруженный файл: в локальном режиме - путь к файлу сервера,
+    файлы не больше MEMORY_UPLOAD_MAX_BYTES - содержимое в памяти,
+    более крупные - путь к временному файлу в TEMP_DIR
+
+    Args:
+        document: Документ от Telegram
+        bot: Экземпляр бота
+
+    Returns:
+        Union[str, bytes]: Путь к файлу или содержимое файла
+    """
+    file_info = await bot.get_file(document.file_id)
+
+    # В локальном режиме file_path уже содержит абсолютный путь к файлу
+    if os.path.isabs(file_info.file_path):
+        return file_info.file_path
+
+    if document.file_size is not None and document.file_size <= MEMORY_UPLOAD_MAX_BYTES:
+        return await download_to_memory(document, bot)
+
+    return await save_uploaded_file(document, bot)
+
+
+def cleanup_upload(source: Union[str, bytes]) -> None:
+    """
+    Удаляет временный файл загрузки; файлы локального сервера и данные в памяти не трогаются
+
+    Args:
+        source: Путь к файлу или содержимое файла
+    """
+    if isinstance(source, str) and os.path.dirname(source) == TEMP_DIR:
+        cleanup_temp_files(source)
+
+
 def cleanup_temp_files(*file_paths: str) -> None:
     """
     Удаляет временные файлы
@@ -9,10 +9,12 @@ from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.client.telegram import TelegramAPIServer
 
 from config.settings import (
+    APPENDED_LOG_DIR,
     BOT_TOKEN,
     CUSTOM_API_SERVER
 )
 from handlers import start, file_processing
+from services.log_history import remove_stale_rows
 
 # Включаем логирование
 logging.basicConfig(level=logging.INFO)
@@ -50,6 +52,9 @@ async def start_polling():
 
         dp = Dispatcher()
 
+        # Файлы строк дописываемых журналов прошлого запуска больше не нужны
+        remove_stale_rows(APPENDED_LOG_DIR)
+
         # Регистрируем обработчики
         start.register_start_handlers(dp)
         file_processing.register_file_handlers(dp)